@@ -0,0 +1,26 @@
+"""Add partial index on unanalyzed review_history rows
+
+Revision ID: 36acc900757b
+Revises: 4adfda50d64e
+Create Date: 2026-10-18 19:02:41.517306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '36acc900757b'
+down_revision: Union[str, None] = '4adfda50d64e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_review_history_unanalyzed', 'review_history', ['id'], unique=False, postgresql_where=sa.text('tone IS NULL OR sentiment IS NULL'), sqlite_where=sa.text('tone IS NULL OR sentiment IS NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_review_history_unanalyzed', table_name='review_history', postgresql_where=sa.text('tone IS NULL OR sentiment IS NULL'), sqlite_where=sa.text('tone IS NULL OR sentiment IS NULL'))
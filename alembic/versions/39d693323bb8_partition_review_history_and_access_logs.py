@@ -0,0 +1,129 @@
+"""Partition review_history and access_logs by month
+
+Revision ID: 39d693323bb8
+Revises: a8f8829c562a
+Create Date: 2026-10-18 17:41:09.552830
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '39d693323bb8'
+down_revision: Union[str, None] = 'a8f8829c562a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months after the current one that get a partition up front; the
+# maintain_partitions task keeps extending this
+PREMAKE_MONTHS = 3
+
+REVIEW_HISTORY_COLUMNS = """
+    id BIGINT NOT NULL DEFAULT nextval('{sequence}'::regclass),
+    text VARCHAR,
+    stars INTEGER NOT NULL,
+    review_id VARCHAR(255) NOT NULL,
+    tone VARCHAR(255),
+    sentiment VARCHAR(255),
+    analysis_status VARCHAR(20),
+    analysis_requested_at TIMESTAMP WITH TIME ZONE,
+    category_id BIGINT NOT NULL REFERENCES categories (id),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+    CONSTRAINT check_stars_range CHECK (stars >= 1 AND stars <= 10)
+"""
+
+ACCESS_LOGS_COLUMNS = """
+    id BIGINT NOT NULL DEFAULT nextval('{sequence}'::regclass),
+    text VARCHAR NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL
+"""
+
+TABLES = {
+    'review_history': (
+        REVIEW_HISTORY_COLUMNS,
+        ['id', 'text', 'stars', 'review_id', 'tone', 'sentiment', 'analysis_status',
+         'analysis_requested_at', 'category_id', 'created_at', 'updated_at'],
+        {
+            'ix_review_history_id': ['id'],
+            'ix_review_history_review_id': ['review_id'],
+            'ix_review_history_updated_at': ['updated_at'],
+        },
+    ),
+    'access_logs': (
+        ACCESS_LOGS_COLUMNS,
+        ['id', 'text', 'created_at'],
+        {'ix_access_logs_id': ['id']},
+    ),
+}
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _months(first: date, last: date):
+    month = first
+    while month <= last:
+        yield month
+        month = _add_months(month, 1)
+
+
+def _bound(month: date) -> str:
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def _copy_table(table: str, columns_sql: str, columns, indexes, partitioned: bool) -> None:
+    bind = op.get_bind()
+    old_table = f'{table}_old'
+    sequence = bind.execute(sa.text(f"SELECT pg_get_serial_sequence('{table}', 'id')")).scalar()
+
+    for index in indexes:
+        op.execute(f'DROP INDEX IF EXISTS {index}')
+    op.execute(f'ALTER TABLE {table} RENAME TO {old_table}')
+    op.execute(f'ALTER TABLE {old_table} RENAME CONSTRAINT {table}_pkey TO {old_table}_pkey')
+
+    columns_sql = columns_sql.format(sequence=sequence)
+    if partitioned:
+        op.execute(f'CREATE TABLE {table} ({columns_sql}, PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)')
+
+        oldest = bind.execute(sa.text(f'SELECT min(created_at) FROM {old_table}')).scalar()
+        current = datetime.now(timezone.utc).date().replace(day=1)
+        first = min(oldest.astimezone(timezone.utc).date().replace(day=1), current) if oldest else current
+        for month in _months(first, _add_months(current, PREMAKE_MONTHS)):
+            op.execute(
+                f'CREATE TABLE {table}_y{month.year}m{month.month:02d} PARTITION OF {table} '
+                f'FOR VALUES FROM ({_bound(month)}) TO ({_bound(_add_months(month, 1))})'
+            )
+        # Catches rows outside every monthly range, e.g. far-future timestamps
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+    else:
+        op.execute(f'CREATE TABLE {table} ({columns_sql}, PRIMARY KEY (id))')
+
+    column_list = ', '.join(columns)
+    op.execute(f'INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {old_table}')
+    for index, index_columns in indexes.items():
+        op.execute(f'CREATE INDEX {index} ON {table} ({", ".join(index_columns)})')
+
+    # Keep the id sequence when the old table is dropped
+    op.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+    op.execute(f'DROP TABLE {old_table}')
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, (columns_sql, columns, indexes) in TABLES.items():
+        _copy_table(table, columns_sql, columns, indexes, partitioned=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, (columns_sql, columns, indexes) in TABLES.items():
+        _copy_table(table, columns_sql, columns, indexes, partitioned=False)
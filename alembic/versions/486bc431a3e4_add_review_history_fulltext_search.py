@@ -0,0 +1,59 @@
+"""Add full-text search over review_history.text
+
+Revision ID: 486bc431a3e4
+Revises: 36acc900757b
+Create Date: 2026-10-18 19:47:12.083154
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '486bc431a3e4'
+down_revision: Union[str, None] = '36acc900757b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Added on the partitioned parent, so every partition gets the column and the index
+        op.execute(
+            "ALTER TABLE review_history ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('english', coalesce(text, ''))) STORED"
+        )
+        op.create_index('ix_review_history_search_vector', 'review_history', ['search_vector'], unique=False, postgresql_using='gin')
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE review_history_fts "
+            "USING fts5(text, content='review_history', content_rowid='id', tokenize='porter unicode61')"
+        )
+        op.execute(
+            "CREATE TRIGGER review_history_fts_insert AFTER INSERT ON review_history BEGIN "
+            "INSERT INTO review_history_fts(rowid, text) VALUES (new.id, new.text); END"
+        )
+        op.execute(
+            "CREATE TRIGGER review_history_fts_delete AFTER DELETE ON review_history BEGIN "
+            "INSERT INTO review_history_fts(review_history_fts, rowid, text) VALUES ('delete', old.id, old.text); END"
+        )
+        op.execute(
+            "CREATE TRIGGER review_history_fts_update AFTER UPDATE OF text ON review_history BEGIN "
+            "INSERT INTO review_history_fts(review_history_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+            "INSERT INTO review_history_fts(rowid, text) VALUES (new.id, new.text); END"
+        )
+        op.execute("INSERT INTO review_history_fts(review_history_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_review_history_search_vector', table_name='review_history', postgresql_using='gin')
+        op.drop_column('review_history', 'search_vector')
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER review_history_fts_update")
+        op.execute("DROP TRIGGER review_history_fts_delete")
+        op.execute("DROP TRIGGER review_history_fts_insert")
+        op.execute("DROP TABLE review_history_fts")
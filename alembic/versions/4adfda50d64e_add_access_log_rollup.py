@@ -0,0 +1,36 @@
+"""Add access_log_rollup
+
+Revision ID: 4adfda50d64e
+Revises: 39d693323bb8
+Create Date: 2026-10-18 18:26:53.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4adfda50d64e'
+down_revision: Union[str, None] = '39d693323bb8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('access_log_rollup',
+    sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('endpoint', sa.String(length=255), nullable=False),
+    sa.Column('category_id', sa.BigInteger(), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('bucket', 'endpoint', 'category_id')
+    )
+    op.create_index('ix_access_log_rollup_category_bucket', 'access_log_rollup', ['category_id', 'bucket'], unique=False)
+    op.create_index(op.f('ix_access_logs_created_at'), 'access_logs', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_access_logs_created_at'), table_name='access_logs')
+    op.drop_index('ix_access_log_rollup_category_bucket', table_name='access_log_rollup')
+    op.drop_table('access_log_rollup')
@@ -0,0 +1,51 @@
+"""Add review_latest projection
+
+Revision ID: 53343b0ae91c
+Revises: ce9f21600cfd
+Create Date: 2026-10-18 09:02:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '53343b0ae91c'
+down_revision: Union[str, None] = 'ce9f21600cfd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('review_latest',
+    sa.Column('review_id', sa.String(length=255), nullable=False),
+    sa.Column('review_history_id', sa.BigInteger(), nullable=False),
+    sa.Column('category_id', sa.BigInteger(), nullable=False),
+    sa.Column('stars', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.PrimaryKeyConstraint('review_id'),
+    sa.UniqueConstraint('review_history_id')
+    )
+    op.create_index(op.f('ix_review_latest_category_id'), 'review_latest', ['category_id'], unique=False)
+
+    # Backfill from the existing edit history
+    op.execute("""
+        INSERT INTO review_latest (review_id, review_history_id, category_id, stars, created_at)
+        SELECT review_id, id, category_id, stars, created_at
+        FROM (
+            SELECT id, review_id, category_id, stars, created_at,
+                   row_number() OVER (
+                       PARTITION BY review_id ORDER BY created_at DESC, id DESC
+                   ) AS revision_rank
+            FROM review_history
+        ) ranked
+        WHERE revision_rank = 1
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_review_latest_category_id'), table_name='review_latest')
+    op.drop_table('review_latest')
@@ -0,0 +1,33 @@
+"""Add analysis status to review_history
+
+Revision ID: 7f4a464234f2
+Revises: 88e03df5d4d6
+Create Date: 2026-10-18 13:48:22.301576
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f4a464234f2'
+down_revision: Union[str, None] = '88e03df5d4d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('review_history', sa.Column('analysis_status', sa.String(length=20), nullable=True))
+    op.add_column('review_history', sa.Column('analysis_requested_at', sa.DateTime(timezone=True), nullable=True))
+
+    op.execute("""
+        UPDATE review_history SET analysis_status = 'completed'
+        WHERE tone IS NOT NULL AND sentiment IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('review_history', 'analysis_requested_at')
+    op.drop_column('review_history', 'analysis_status')
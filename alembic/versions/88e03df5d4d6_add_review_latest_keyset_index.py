@@ -0,0 +1,28 @@
+"""Add keyset pagination index on review_latest
+
+Revision ID: 88e03df5d4d6
+Revises: d529620a0f24
+Create Date: 2026-10-18 11:32:54.870416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '88e03df5d4d6'
+down_revision: Union[str, None] = 'd529620a0f24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_review_latest_category_created', 'review_latest', ['category_id', 'created_at', 'review_history_id'], unique=False)
+    # Covered by the leading column of the composite index
+    op.drop_index('ix_review_latest_category_id', table_name='review_latest')
+
+
+def downgrade() -> None:
+    op.create_index('ix_review_latest_category_id', 'review_latest', ['category_id'], unique=False)
+    op.drop_index('ix_review_latest_category_created', table_name='review_latest')
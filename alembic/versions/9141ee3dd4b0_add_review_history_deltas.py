@@ -0,0 +1,35 @@
+"""Add delta-encoded review_history text and a per-review history index
+
+Revision ID: 9141ee3dd4b0
+Revises: 486bc431a3e4
+Create Date: 2026-10-18 20:31:05.227419
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9141ee3dd4b0'
+down_revision: Union[str, None] = '486bc431a3e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('review_history', sa.Column('text_delta', sa.LargeBinary(), nullable=True))
+    op.add_column('review_history', sa.Column('text_delta_base_id', sa.BigInteger(), nullable=True))
+    # Leads with review_id, so it also serves every lookup the old index did
+    op.create_index('ix_review_history_review_id_created_at', 'review_history', ['review_id', sa.text('created_at DESC')], unique=False)
+    op.drop_index('ix_review_history_review_id', table_name='review_history')
+
+
+def downgrade() -> None:
+    op.create_index('ix_review_history_review_id', 'review_history', ['review_id'], unique=False)
+    op.drop_index('ix_review_history_review_id_created_at', table_name='review_history')
+    # Rebuilding the text of delta-encoded revisions needs app code; run this
+    # only on a database where REVIEW_HISTORY_DELTA_STORAGE was never enabled
+    op.drop_column('review_history', 'text_delta_base_id')
+    op.drop_column('review_history', 'text_delta')
@@ -0,0 +1,31 @@
+"""Leave completed and failed rows out of ix_review_history_unanalyzed
+
+Revision ID: 98fa8f9ff918
+Revises: 9141ee3dd4b0
+Create Date: 2026-10-18 21:12:40.518377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '98fa8f9ff918'
+down_revision: Union[str, None] = '9141ee3dd4b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OLD_PREDICATE = 'tone IS NULL OR sentiment IS NULL'
+NEW_PREDICATE = "(tone IS NULL OR sentiment IS NULL) AND (analysis_status IS NULL OR analysis_status = 'pending')"
+
+
+def upgrade() -> None:
+    op.drop_index('ix_review_history_unanalyzed', table_name='review_history')
+    op.create_index('ix_review_history_unanalyzed', 'review_history', ['id'], unique=False, postgresql_where=sa.text(NEW_PREDICATE), sqlite_where=sa.text(NEW_PREDICATE))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_review_history_unanalyzed', table_name='review_history')
+    op.create_index('ix_review_history_unanalyzed', 'review_history', ['id'], unique=False, postgresql_where=sa.text(OLD_PREDICATE), sqlite_where=sa.text(OLD_PREDICATE))
@@ -0,0 +1,60 @@
+"""Add category_daily_rollup and job_checkpoints
+
+Revision ID: a8f8829c562a
+Revises: 7f4a464234f2
+Create Date: 2026-10-18 16:52:40.118273
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8f8829c562a'
+down_revision: Union[str, None] = '7f4a464234f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('category_daily_rollup',
+    sa.Column('category_id', sa.BigInteger(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('sum_stars', sa.BigInteger(), nullable=False),
+    sa.Column('review_count', sa.Integer(), nullable=False),
+    sa.Column('stars_1', sa.Integer(), nullable=False),
+    sa.Column('stars_2', sa.Integer(), nullable=False),
+    sa.Column('stars_3', sa.Integer(), nullable=False),
+    sa.Column('stars_4', sa.Integer(), nullable=False),
+    sa.Column('stars_5', sa.Integer(), nullable=False),
+    sa.Column('stars_6', sa.Integer(), nullable=False),
+    sa.Column('stars_7', sa.Integer(), nullable=False),
+    sa.Column('stars_8', sa.Integer(), nullable=False),
+    sa.Column('stars_9', sa.Integer(), nullable=False),
+    sa.Column('stars_10', sa.Integer(), nullable=False),
+    sa.Column('positive_count', sa.Integer(), nullable=False),
+    sa.Column('neutral_count', sa.Integer(), nullable=False),
+    sa.Column('negative_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.PrimaryKeyConstraint('category_id', 'day')
+    )
+    op.create_index(op.f('ix_category_daily_rollup_day'), 'category_daily_rollup', ['day'], unique=False)
+    op.create_table('job_checkpoints',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('watermark', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('position', sa.BigInteger(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_index(op.f('ix_review_history_updated_at'), 'review_history', ['updated_at'], unique=False)
+    op.create_index('ix_review_latest_created_at', 'review_latest', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_review_latest_created_at', table_name='review_latest')
+    op.drop_index(op.f('ix_review_history_updated_at'), table_name='review_history')
+    op.drop_table('job_checkpoints')
+    op.drop_index(op.f('ix_category_daily_rollup_day'), table_name='category_daily_rollup')
+    op.drop_table('category_daily_rollup')
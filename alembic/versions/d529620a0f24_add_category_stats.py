@@ -0,0 +1,43 @@
+"""Add category_stats aggregates
+
+Revision ID: d529620a0f24
+Revises: 53343b0ae91c
+Create Date: 2026-10-18 10:15:07.402913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd529620a0f24'
+down_revision: Union[str, None] = '53343b0ae91c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('category_stats',
+    sa.Column('category_id', sa.BigInteger(), nullable=False),
+    sa.Column('sum_stars', sa.BigInteger(), nullable=False),
+    sa.Column('review_count', sa.BigInteger(), nullable=False),
+    sa.Column('average_stars', sa.Float(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.PrimaryKeyConstraint('category_id')
+    )
+    op.create_index(op.f('ix_category_stats_average_stars'), 'category_stats', ['average_stars'], unique=False)
+
+    op.execute("""
+        INSERT INTO category_stats (category_id, sum_stars, review_count, average_stars)
+        SELECT category_id, sum(stars), count(*), avg(stars)
+        FROM review_latest
+        GROUP BY category_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_category_stats_average_stars'), table_name='category_stats')
+    op.drop_table('category_stats')
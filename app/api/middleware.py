@@ -0,0 +1,54 @@
+"""Per-route request metrics.
+
+Requests are labelled by their route template (``/reviews/``, not the raw
+URL) so label cardinality stays bounded; anything that matches no route is
+labelled ``unmatched``. Besides latency and in-flight counts, each request
+records how many queries it ran and how long they took in total.
+"""
+import time
+
+from starlette.routing import Match
+
+from app.database.instrumentation import QueryStats, current_query_stats
+from app.services.metrics import COUNT_BUCKETS, registry as metrics
+
+
+def route_template(scope) -> str:
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        labels = {"method": scope["method"], "route": route_template(scope)}
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        metrics.incr("http_requests_in_flight", 1, **labels)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_query_stats.reset(token)
+            metrics.incr("http_requests_in_flight", -1, **labels)
+            metrics.observe("http_request_duration_seconds", elapsed, status=status, **labels)
+            metrics.observe("http_request_db_queries", stats.count, buckets=COUNT_BUCKETS, **labels)
+            metrics.observe("http_request_db_seconds", stats.seconds, **labels)
@@ -1,52 +1,108 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List, Optional
-from app.database.config import get_db
-from app.models.models import ReviewHistory, Category
-from app.schemas.schemas import CategoryTrend, ReviewListResponse, ReviewResponse
-from app.tasks.tasks import log_access, analyze_sentiment_and_tone
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, select, tuple_
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Literal, Optional, Tuple
+from app.database.config import get_async_db, settings
+from app.models.models import ReviewHistory, Category, ReviewLatest, CategoryStats
+from app.schemas.schemas import (
+    BulkIngestResponse,
+    CategoryTrend,
+    ReviewHistoryResponse,
+    ReviewListResponse,
+    ReviewResponse,
+    ReviewSearchResponse,
+    ReviewStatsResponse,
+    TrafficEntry,
+    TrafficResponse,
+)
+from app.services.access_log import access_log_buffer
+from app.services.analysis import claim_statement, needs_analysis
+from app.services.export import MEDIA_TYPES, stream_export
+from app.services.ingest import ingest, iter_csv_records, iter_ndjson_records
+from app.services.metrics import registry as metrics
+from app.services.pagination import decode_cursor, decode_rank_cursor, encode_cursor, encode_rank_cursor
+from app.services.projections import latest_revision_join
+from app.services.response_cache import ALL_CATEGORIES, STATS, mark_status_changed, response_cache
+from app.services.revisions import history_query, reconstruct
+from app.services.rollups import windowed_trends_query
+from app.services.search import search_query
+from app.services.stats import collect_stats
+from app.services.traffic import NO_CATEGORY, traffic_query
+from app.tasks.tasks import analyze_sentiment_batch
 
 router = APIRouter()
 
+category_trends_adapter = TypeAdapter(List[CategoryTrend])
+
+TREND_WINDOW_DAYS = {"7d": 7, "30d": 30, "90d": 90}
+DEFAULT_PAGE_SIZE = 15
+
+REVIEW_FIELDS = tuple(ReviewResponse.model_fields)
+REVIEW_COLUMNS = [getattr(ReviewHistory, field) for field in REVIEW_FIELDS]
+
 
 @router.get("/reviews/trends", response_model=List[CategoryTrend])
-async def get_review_trends(db: Session = Depends(get_db)):
-    log_access.delay("GET /reviews/trends")
+async def get_review_trends(
+    window: Optional[Literal["7d", "30d", "90d"]] = Query(
+        None, description="Only count reviews whose current revision is from the last 7, 30 or 90 days"
+    ),
+    limit: int = Query(5, ge=1, le=50, description="Number of categories"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    access_log_buffer.record("GET /reviews/trends")
 
-    latest_reviews_subquery = (
-        db.query(
-            ReviewHistory.review_id,
-            func.max(ReviewHistory.created_at).label("max_created_at")
-        )
-        .group_by(ReviewHistory.review_id)
-        .subquery()
+    if window is None:
+        async def compute() -> bytes:
+            return category_trends_adapter.dump_json(await _review_trends(db, limit))
+
+        return await response_cache.respond("trends", ALL_CATEGORIES, (limit,), if_none_match, compute)
+
+    # The window ends today (UTC), so the day is part of the cache key
+    start_day = datetime.now(timezone.utc).date() - timedelta(days=TREND_WINDOW_DAYS[window] - 1)
+
+    async def compute() -> bytes:
+        return category_trends_adapter.dump_json(await _windowed_trends(db, start_day, limit))
+
+    return await response_cache.respond(
+        "trends_window", ALL_CATEGORIES, (start_day.isoformat(), limit), if_none_match, compute
     )
 
-    latest_reviews = (
-        db.query(ReviewHistory)
-        .join(
-            latest_reviews_subquery,
-            (ReviewHistory.review_id == latest_reviews_subquery.c.review_id) &
-            (ReviewHistory.created_at == latest_reviews_subquery.c.max_created_at)
+
+async def _windowed_trends(db: AsyncSession, start_day: date, limit: int) -> List[CategoryTrend]:
+    result = await db.execute(windowed_trends_query(start_day, limit))
+    return [
+        CategoryTrend(
+            id=row.id,
+            name=row.name,
+            description=row.description,
+            average_stars=float(row.average_stars),
+            total_reviews=row.total_reviews
         )
-        .subquery()
-    )
+        for row in result.all()
+    ]
 
-    results = (
-        db.query(
+
+async def _review_trends(db: AsyncSession, limit: int) -> List[CategoryTrend]:
+    result = await db.execute(
+        select(
             Category.id,
             Category.name,
             Category.description,
-            func.avg(latest_reviews.c.stars).label("average_stars"),
-            func.count(latest_reviews.c.id).label("total_reviews")
+            CategoryStats.average_stars,
+            CategoryStats.review_count.label("total_reviews")
         )
-        .join(latest_reviews, Category.id == latest_reviews.c.category_id)
-        .group_by(Category.id, Category.name, Category.description)
-        .order_by(desc("average_stars"))
-        .limit(5)
-        .all()
+        .join(CategoryStats, Category.id == CategoryStats.category_id)
+        .where(CategoryStats.review_count > 0)
+        .order_by(desc(CategoryStats.average_stars))
+        .limit(limit)
     )
+    results = result.all()
 
     return [
         CategoryTrend(
@@ -60,61 +116,263 @@ async def get_review_trends(db: Session = Depends(get_db)):
     ]
 
 
+@router.get("/reviews/stats", response_model=ReviewStatsResponse)
+async def get_review_stats(
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    access_log_buffer.record("GET /reviews/stats")
+
+    async def compute() -> bytes:
+        stats = await db.run_sync(collect_stats)
+        return stats.model_dump_json().encode()
+
+    return await response_cache.respond("stats", STATS, (), if_none_match, compute)
+
+
 @router.get("/reviews/", response_model=ReviewListResponse)
 async def get_reviews_by_category(
     category_id: int = Query(..., description="Category ID to filter reviews"),
-    cursor: Optional[int] = Query(None, description="Cursor for pagination (review history id)"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque pagination cursor from a previous page's next_cursor"),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=100, description="Number of reviews per page"),
+    direction: Literal["desc", "asc"] = Query("desc", description="Sort direction on (created_at, id)"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    log_access.delay(f"GET /reviews/?category_id={category_id}")
+    access_log_buffer.record(f"GET /reviews/?category_id={category_id}")
+
+    cursor_key = None
+    if cursor:
+        try:
+            cursor_key = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    page_size = 15
+    async def compute() -> Tuple[bytes, List[int]]:
+        return await _render_reviews_page(db, category_id, cursor_key, page_size, direction)
 
-    latest_reviews_subquery = (
-        db.query(
-            ReviewHistory.review_id,
-            func.max(ReviewHistory.created_at).label("max_created_at")
-        )
-        .filter(ReviewHistory.category_id == category_id)
-        .group_by(ReviewHistory.review_id)
-        .subquery()
+    async def claim(unanalyzed_ids: List[int]) -> None:
+        await _enqueue_analysis(db, unanalyzed_ids)
+
+    params = (category_id, cursor, page_size, direction)
+    return await response_cache.respond(
+        "reviews_by_category", category_id, params, if_none_match, compute, claim=claim
     )
 
+
+async def prewarm_reviews_page(db: AsyncSession, category_id: int) -> bool:
+    """Cache the page ``GET /reviews/?category_id=...`` returns without further parameters.
+
+    Only renders: the ids of its unanalyzed reviews are stored with the
+    entry and claimed by the first reader it is served to, so warming the
+    cache does not spend LLM calls on pages nobody reads.
+    """
+    async def compute() -> Tuple[bytes, List[int]]:
+        return await _render_reviews_page(db, category_id, None, DEFAULT_PAGE_SIZE, "desc")
+
+    params = (category_id, None, DEFAULT_PAGE_SIZE, "desc")
+    return await response_cache.prewarm("reviews_by_category", category_id, params, compute, with_pending=True)
+
+
+async def _render_reviews_page(
+    db: AsyncSession, category_id: int, cursor_key, page_size: int, direction: str
+) -> Tuple[bytes, List[int]]:
+    """Encoded ``ReviewListResponse`` for one page, and the ids of its reviews that need analysis.
+
+    Selects plain column tuples rather than ORM objects and encodes dicts
+    with orjson, skipping pydantic validation; the shape must stay in line
+    with ``ReviewResponse``.
+    """
     query = (
-        db.query(ReviewHistory)
-        .join(
-            latest_reviews_subquery,
-            (ReviewHistory.review_id == latest_reviews_subquery.c.review_id) &
-            (ReviewHistory.created_at == latest_reviews_subquery.c.max_created_at)
-        )
-        .filter(ReviewHistory.category_id == category_id)
+        select(*REVIEW_COLUMNS, ReviewHistory.analysis_status)
+        .join(ReviewLatest, latest_revision_join())
+        .where(ReviewLatest.category_id == category_id)
     )
 
-    if cursor:
-        query = query.filter(ReviewHistory.id < cursor)
+    sort_key = tuple_(ReviewLatest.created_at, ReviewLatest.review_history_id)
+    if cursor_key:
+        cursor_key = tuple_(*cursor_key)
+        query = query.where(sort_key < cursor_key if direction == "desc" else sort_key > cursor_key)
 
-    reviews = (
+    if direction == "desc":
+        order_by = (desc(ReviewLatest.created_at), desc(ReviewLatest.review_history_id))
+    else:
+        order_by = (ReviewLatest.created_at, ReviewLatest.review_history_id)
+
+    result = await db.execute(
         query
-        .order_by(desc(ReviewHistory.created_at))
-        .limit(page_size + 1)  
-        .all()
+        .order_by(*order_by)
+        .limit(page_size + 1)
     )
+    reviews = result.all()
 
     has_more = len(reviews) > page_size
     if has_more:
         reviews = reviews[:page_size]
 
-    next_cursor = reviews[-1].id if has_more and reviews else None
+    next_cursor = encode_cursor(reviews[-1].created_at, reviews[-1].id) if has_more and reviews else None
+
+    body = orjson.dumps(
+        {
+            "reviews": [dict(zip(REVIEW_FIELDS, review)) for review in reviews],
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+        },
+        option=orjson.OPT_UTC_Z,
+    )
+    return body, [review.id for review in reviews if needs_analysis(review)]
+
+
+async def _enqueue_analysis(db: AsyncSession, unanalyzed_ids: List[int]) -> None:
+    """Claim the reviews nobody is analyzing yet and enqueue their analysis."""
+    result = await db.execute(claim_statement(unanalyzed_ids, settings.analysis_pending_timeout))
+    claimed_ids = result.scalars().all()
+    if claimed_ids:
+        await db.run_sync(mark_status_changed)
+    await db.commit()
+
+    if claimed_ids:
+        # Publishing to the broker is a blocking Redis call
+        await run_in_threadpool(analyze_sentiment_batch.delay, claimed_ids)
+        metrics.incr("analysis_enqueued_total", len(claimed_ids))
+    if len(claimed_ids) < len(unanalyzed_ids):
+        metrics.incr("analysis_enqueue_suppressed_total", len(unanalyzed_ids) - len(claimed_ids))
+
+
+@router.get("/reviews/search", response_model=ReviewSearchResponse)
+async def search_reviews(
+    q: str = Query(..., min_length=1, max_length=500, description="Words to search for in the latest revision's text"),
+    category_id: Optional[int] = Query(None, description="Only reviews in this category"),
+    sentiment: Optional[str] = Query(None, description='Only reviews with this sentiment, e.g. "Negative"'),
+    cursor: Optional[str] = Query(None, description="Opaque pagination cursor from a previous page's next_cursor"),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=100, description="Number of reviews per page"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # The search terms are left out of the access log
+    access_log_buffer.record("GET /reviews/search" if category_id is None else f"GET /reviews/search?category_id={category_id}")
+
+    cursor_key = None
+    if cursor:
+        try:
+            cursor_key = decode_rank_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def compute() -> bytes:
+        query = search_query(
+            db.bind.dialect.name, q, REVIEW_COLUMNS, category_id, sentiment, cursor_key, page_size + 1
+        )
+        reviews = (await db.execute(query)).all() if query is not None else []
+
+        has_more = len(reviews) > page_size
+        if has_more:
+            reviews = reviews[:page_size]
+        return orjson.dumps(
+            {
+                "reviews": [dict(zip(REVIEW_FIELDS + ("rank",), review)) for review in reviews],
+                "next_cursor": encode_rank_cursor(reviews[-1].rank, reviews[-1].id) if has_more else None,
+                "has_more": has_more,
+            },
+            option=orjson.OPT_UTC_Z,
+        )
+
+    scope = ALL_CATEGORIES if category_id is None else category_id
+    params = (q, category_id, sentiment, cursor, page_size)
+    return await response_cache.respond("search_reviews", scope, params, if_none_match, compute)
+
+
+@router.get("/reviews/export")
+async def export_reviews(
+    category_id: int = Query(..., description="Category ID to export"),
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="Output format"),
+    include_history: bool = Query(False, description="Export every revision instead of only the latest ones")
+):
+    access_log_buffer.record(f"GET /reviews/export?category_id={category_id}")
+
+    extension = "csv" if export_format == "csv" else "ndjson"
+    return StreamingResponse(
+        stream_export(category_id, export_format, include_history),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="reviews_category_{category_id}.{extension}"'},
+    )
+
+
+@router.get("/reviews/{review_id}/history", response_model=ReviewHistoryResponse)
+async def get_review_history(
+    review_id: str,
+    limit: int = Query(100, ge=1, le=1000, description="Number of revisions, newest first"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    access_log_buffer.record("GET /reviews/{review_id}/history")
+
+    result = await db.execute(history_query(review_id, REVIEW_COLUMNS, limit))
+    revisions = result.all()
+    if not revisions:
+        raise HTTPException(status_code=404, detail="Review not found")
+
+    texts = reconstruct(revisions)
+    content = orjson.dumps(
+        {
+            "review_id": review_id,
+            "revisions": [
+                {**dict(zip(REVIEW_FIELDS, revision)), "text": texts[revision.id]}
+                for revision in revisions
+            ],
+        },
+        option=orjson.OPT_UTC_Z,
+    )
+    return Response(content=content, media_type="application/json")
 
-    review_responses = []
-    for review in reviews:
-        if (review.tone is None or review.sentiment is None) and review.text:
-            analyze_sentiment_and_tone.delay(review.id, review.text, review.stars)
 
-        review_responses.append(ReviewResponse.model_validate(review))
+def _as_utc(value: datetime) -> datetime:
+    # Timestamps without an offset are taken as UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
 
-    return ReviewListResponse(
-        reviews=review_responses,
-        next_cursor=next_cursor,
-        has_more=has_more
+
+@router.get("/traffic", response_model=TrafficResponse)
+async def get_traffic(
+    start: Optional[datetime] = Query(None, description="Start of the time range (inclusive); defaults to an hour before end"),
+    end: Optional[datetime] = Query(None, description="End of the time range (exclusive); defaults to now"),
+    endpoint: Optional[str] = Query(None, description='Only this endpoint, e.g. "GET /reviews/"'),
+    category_id: Optional[int] = Query(None, description="Only requests for this category"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of endpoint and category pairs"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    access_log_buffer.record("GET /traffic")
+
+    end = _as_utc(end) if end else datetime.now(timezone.utc)
+    start = _as_utc(start) if start else end - timedelta(hours=1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    result = await db.execute(traffic_query(start, end, endpoint, category_id, limit))
+    return TrafficResponse(
+        start=start,
+        end=end,
+        entries=[
+            TrafficEntry(
+                endpoint=row.endpoint,
+                category_id=None if row.category_id == NO_CATEGORY else row.category_id,
+                requests=row.requests,
+            )
+            for row in result.all()
+        ],
     )
+
+
+@router.post("/reviews/bulk", response_model=BulkIngestResponse)
+async def bulk_ingest_reviews(
+    request: Request,
+    body_format: Optional[Literal["ndjson", "csv"]] = Query(
+        None, alias="format", description="Body format; defaults to csv for text/csv bodies, ndjson otherwise"
+    ),
+    db: AsyncSession = Depends(get_async_db)
+):
+    access_log_buffer.record("POST /reviews/bulk")
+
+    if body_format is None:
+        body_format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    parse_records = iter_csv_records if body_format == "csv" else iter_ndjson_records
+
+    return await ingest(db, parse_records(request.stream()))
@@ -1,22 +1,95 @@
 import platform
+import time
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import before_task_publish
+from kombu import Queue
 from app.database.config import settings
 
 celery_app = Celery(
     "reviews_app",
     broker=settings.redis_url,
     backend=settings.redis_url,
-    include=["app.tasks.tasks"]
+    include=["app.tasks.tasks", "app.tasks.worker"]
 )
 
+# Analysis a reader is waiting on, bulk analysis and backfills, and periodic
+# maintenance each get their own queue, so a burst on one cannot hold up the
+# others
+QUEUE_INTERACTIVE = "interactive"
+QUEUE_BULK = "bulk"
+QUEUE_MAINTENANCE = "maintenance"
+
+TASK_ROUTES = {
+    "app.tasks.tasks.analyze_sentiment_and_tone": {"queue": QUEUE_INTERACTIVE},
+    "app.tasks.tasks.analyze_sentiment_batch": {"queue": QUEUE_INTERACTIVE},
+    "app.tasks.tasks.refresh_access_log_rollup": {"queue": QUEUE_MAINTENANCE},
+    "app.tasks.tasks.backfill_analysis": {"queue": QUEUE_MAINTENANCE},
+    "app.tasks.tasks.reconcile_category_stats": {"queue": QUEUE_MAINTENANCE},
+    "app.tasks.tasks.refresh_category_daily_rollup": {"queue": QUEUE_MAINTENANCE},
+    "app.tasks.tasks.maintain_partitions": {"queue": QUEUE_MAINTENANCE},
+}
+
+# Worker pools started by run_workers.py. Analysis tasks are long and uneven,
+# so their workers reserve one message per process at a time. Maintenance
+# tasks are short but must not wait behind a backfill's analysis batches,
+# so they get a process of their own.
+WORKER_POOLS = {
+    "interactive": {"queues": [QUEUE_INTERACTIVE], "concurrency": 4, "prefetch_multiplier": 1},
+    "bulk": {"queues": [QUEUE_BULK], "concurrency": 2, "prefetch_multiplier": 1},
+    "maintenance": {"queues": [QUEUE_MAINTENANCE], "concurrency": 1, "prefetch_multiplier": 1},
+}
+
 celery_app.conf.update(
     task_serializer="json",
     accept_content=["json"],
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    task_queues=[
+        Queue(QUEUE_INTERACTIVE, routing_key=QUEUE_INTERACTIVE),
+        Queue(QUEUE_BULK, routing_key=QUEUE_BULK),
+        Queue(QUEUE_MAINTENANCE, routing_key=QUEUE_MAINTENANCE),
+    ],
+    task_default_queue=QUEUE_BULK,
+    task_routes=TASK_ROUTES,
+    # Tasks are acknowledged only after they finish, so a crashed worker's
+    # tasks are redelivered
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    beat_schedule={
+        "backfill-analysis": {
+            "task": "app.tasks.tasks.backfill_analysis",
+            "schedule": crontab(),
+        },
+        "reconcile-category-stats": {
+            "task": "app.tasks.tasks.reconcile_category_stats",
+            "schedule": crontab(minute=0),
+        },
+        "refresh-category-daily-rollup": {
+            "task": "app.tasks.tasks.refresh_category_daily_rollup",
+            "schedule": crontab(minute="*/5"),
+        },
+        "refresh-access-log-rollup": {
+            "task": "app.tasks.tasks.refresh_access_log_rollup",
+            "schedule": crontab(),
+        },
+        "maintain-partitions": {
+            "task": "app.tasks.tasks.maintain_partitions",
+            "schedule": crontab(hour=0, minute=15),
+        },
+    },
 )
 
+
+@before_task_publish.connect
+def stamp_enqueue_time(headers=None, **kwargs):
+    # Read back by the worker as task.request.enqueued_at to measure queue wait
+    if headers is not None:
+        headers["enqueued_at"] = time.time()
+
+
 # Automatically switch to solo pool on Windows
 if platform.system() == "Windows":
     celery_app.conf.worker_pool = "solo"
@@ -1,15 +1,109 @@
+import redis
+import redis.asyncio
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
+from app.database.instrumentation import instrument_engine
+from app.database.pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool
 from functools import lru_cache
+from typing import Optional
+
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
 
 class Settings(BaseSettings):
     database_url: str
+    async_database_url: Optional[str] = None
+    # False runs the route handlers' queries on the sync engine, blocking the event loop; for comparison only
+    api_async_db: bool = True
     redis_url: str
     anthropic_api_key: str
 
+    # Connection pools: API processes and Celery worker processes are sized separately
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    worker_db_pool_size: int = 2
+    worker_db_max_overflow: int = 0
+    db_pool_timeout: float = 30.0
+    metrics_publish_interval: float = 15.0
+    metrics_publish_ttl: int = 600
+    # Log queries slower than this many seconds; None disables the slow query log
+    slow_query_threshold: Optional[float] = None
+    slow_query_explain: bool = False
+
+    access_log_buffer_size: int = 100_000
+    access_log_batch_size: int = 500
+    access_log_flush_interval: float = 1.0
+    # False counts entries straight into access_log_rollup without writing access_logs rows
+    access_log_store_raw: bool = True
+    # How far the access log rollup watermark trails now(); must cover the buffer's flush delay
+    access_log_rollup_lag: float = 60.0
+
+    llm_backend: str = "anthropic"
+    llm_model: str = "claude-3-5-sonnet-20241022"
+    fake_llm_latency: float = 0.0
+    fake_llm_failure_rate: float = 0.0
+    # Analysis dispatcher, per worker process: concurrent LLM calls, rate limits
+    # (None disables a limit), retries on 429/5xx and the circuit breaker
+    llm_concurrency: int = 8
+    llm_requests_per_minute: Optional[float] = 50
+    llm_tokens_per_minute: Optional[float] = 40_000
+    llm_max_retries: int = 4
+    llm_retry_base_delay: float = 1.0
+    llm_retry_max_delay: float = 30.0
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_reset_timeout: float = 30.0
+    analysis_task_max_retries: int = 5
+    analysis_batch_size: int = 20
+    analysis_pending_timeout: float = 600.0
+    # Backfill of never-analyzed rows, run every minute: rows enqueued per run
+    # at most, less analyses still pending (0 disables it), and rows per scan query
+    backfill_rows_per_minute: int = 600
+    backfill_chunk_size: int = 1000
+    analysis_cache_enabled: bool = True
+    analysis_cache_ttl: int = 30 * 24 * 3600
+
+    response_cache_enabled: bool = True
+    response_cache_ttl: int = 24 * 3600
+    response_cache_local_size: int = 256
+    # Seconds between prewarming the first review page of the busiest categories; 0 disables it
+    cache_prewarm_interval: float = 60.0
+    cache_prewarm_categories: int = 10
+    cache_prewarm_window: int = 3600
+
+    # Store superseded review revisions as compressed deltas against the next revision
+    review_history_delta_storage: bool = False
+
+    bulk_ingest_chunk_size: int = 1000
+    bulk_ingest_max_errors: int = 1000
+    export_batch_size: int = 1000
+
+    # How far the daily rollup watermark trails now(), so slow transactions are not skipped
+    rollup_watermark_lag: float = 60.0
+
+    # PostgreSQL monthly partitions: months created ahead of time, and how long
+    # access_logs partitions are kept (None keeps them forever)
+    partition_premake_months: int = 3
+    access_log_retention_days: Optional[int] = 90
+    access_log_retention_detach_only: bool = False
+
+    @field_validator(
+        "slow_query_threshold", "llm_requests_per_minute", "llm_tokens_per_minute", "access_log_retention_days",
+        mode="before",
+    )
+    @classmethod
+    def empty_as_none(cls, value):
+        # LLM_REQUESTS_PER_MINUTE= in the environment turns the limit off
+        return None if value == "" else value
+
     class Config:
         env_file = ".env"
 
@@ -19,16 +113,122 @@ def get_settings():
     return Settings()
 
 
+def get_async_database_url(settings: Settings) -> str:
+    if settings.async_database_url:
+        return settings.async_database_url
+
+    url = make_url(settings.database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}; set ASYNC_DATABASE_URL")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
 settings = get_settings()
 
-engine = create_engine(settings.database_url)
+
+def _pool_options(url: str, pool_name: str, pool_size: int, max_overflow: int, poolclass) -> dict:
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_pre_ping": True,
+        "pool_logging_name": pool_name,
+    }
+
+
+def create_sync_engine(pool_name: str, pool_size: int, max_overflow: int):
+    sync_engine = create_engine(
+        settings.database_url,
+        **_pool_options(settings.database_url, pool_name, pool_size, max_overflow, InstrumentedQueuePool),
+    )
+    instrument_engine(sync_engine, settings.slow_query_threshold, settings.slow_query_explain)
+    return sync_engine
+
+
+def reconfigure_engine(pool_name: str, pool_size: int, max_overflow: int) -> None:
+    """Replace the sync engine, e.g. in a freshly forked Celery worker process.
+
+    The inherited pool is discarded without closing its connections, which
+    still belong to the parent process.
+    """
+    global engine
+    engine.dispose(close=False)
+    engine = create_sync_engine(pool_name, pool_size, max_overflow)
+    SessionLocal.configure(bind=engine)
+
+
+# Sync engine for Celery workers, Alembic and the maintenance scripts
+engine = create_sync_engine("api", settings.db_pool_size, settings.db_max_overflow)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine for the API route handlers
+_async_database_url = get_async_database_url(settings)
+async_engine = create_async_engine(
+    _async_database_url,
+    **_pool_options(
+        _async_database_url, "api_async", settings.db_pool_size, settings.db_max_overflow,
+        InstrumentedAsyncAdaptedQueuePool,
+    ),
+)
+instrument_engine(async_engine.sync_engine, settings.slow_query_threshold, settings.slow_query_explain)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+@lru_cache()
+def get_redis() -> redis.Redis:
+    return redis.Redis.from_url(settings.redis_url)
+
+
+@lru_cache()
+def get_async_redis() -> redis.asyncio.Redis:
+    return redis.asyncio.Redis.from_url(settings.redis_url)
+
+
+class SyncSessionAdapter:
+    """The parts of ``AsyncSession`` the route handlers use, over a sync ``Session``.
+
+    With ``API_ASYNC_DB=false`` handlers get this instead of an
+    ``AsyncSession``. Every query then runs inline and blocks the event loop,
+    as the routes did before the async engine, so benchmarks/concurrency.py
+    can measure the difference.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.bind = session.get_bind()
+
+    @property
+    def info(self) -> dict:
+        return self.session.info
+
+    async def execute(self, statement, *args, **kwargs):
+        return self.session.execute(statement, *args, **kwargs)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.session, *args, **kwargs)
+
+    async def commit(self) -> None:
+        self.session.commit()
+
+    async def rollback(self) -> None:
+        self.session.rollback()
+
+
+async def get_async_db():
+    if not settings.api_async_db:
+        db = SessionLocal()
+        try:
+            yield SyncSessionAdapter(db)
+        finally:
+            db.close()
+        return
+
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
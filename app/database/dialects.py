@@ -0,0 +1,47 @@
+from sqlalchemy import Date, DateTime
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+def upsert(bind, table):
+    """Return a dialect-specific INSERT that supports ``on_conflict_do_update``."""
+    if bind.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    if bind.dialect.name == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"Upserts are not supported on {bind.dialect.name}")
+
+
+class utc_date(FunctionElement):
+    """Calendar day (UTC) of a timestamp column."""
+
+    type = Date()
+    inherit_cache = True
+
+
+@compiles(utc_date)
+def _utc_date(element, compiler, **kw):
+    return f"date({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(utc_date, "postgresql")
+def _utc_date_postgresql(element, compiler, **kw):
+    return f"CAST(({compiler.process(element.clauses, **kw)}) AT TIME ZONE 'UTC' AS DATE)"
+
+
+class utc_minute(FunctionElement):
+    """Timestamp column truncated to the minute."""
+
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utc_minute)
+def _utc_minute(element, compiler, **kw):
+    return f"strftime('%Y-%m-%d %H:%M:00', {compiler.process(element.clauses, **kw)})"
+
+
+@compiles(utc_minute, "postgresql")
+def _utc_minute_postgresql(element, compiler, **kw):
+    return f"date_trunc('minute', {compiler.process(element.clauses, **kw)})"
@@ -0,0 +1,53 @@
+"""Full-text index over ``review_history.text``.
+
+PostgreSQL gets a stored generated ``tsvector`` column, ``search_vector``,
+with a GIN index. SQLite, for local use, gets an external-content FTS5
+table, ``review_history_fts``, kept in sync with ``review_history`` by
+triggers. Both are created and dropped with the table by ``create_all``
+and ``drop_all``, and by the Alembic migration; ``create_fulltext_index``
+also adds them to an existing table.
+"""
+from sqlalchemy import text
+
+TEXT_SEARCH_CONFIG = "english"
+SEARCH_VECTOR = "search_vector"
+FTS_TABLE = "review_history_fts"
+
+POSTGRESQL_DDL = [
+    f"ALTER TABLE review_history ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR} tsvector"
+    f" GENERATED ALWAYS AS (to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(text, ''))) STORED",
+    f"CREATE INDEX IF NOT EXISTS ix_review_history_search_vector ON review_history USING gin ({SEARCH_VECTOR})",
+]
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}"
+    f" USING fts5(text, content='review_history', content_rowid='id', tokenize='porter unicode61')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON review_history BEGIN"
+    f" INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON review_history BEGIN"
+    f" INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF text ON review_history BEGIN"
+    f" INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) VALUES ('delete', old.id, old.text);"
+    f" INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END",
+]
+
+
+def create_fulltext_index(connection) -> None:
+    if connection.dialect.name == "postgresql":
+        for statement in POSTGRESQL_DDL:
+            connection.execute(text(statement))
+    elif connection.dialect.name == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": FTS_TABLE}
+        ).first()
+        for statement in SQLITE_DDL:
+            connection.execute(text(statement))
+        if not exists:
+            # Index the rows that are already there
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def drop_fulltext_index(connection) -> None:
+    # review_history's triggers go with it, but the FTS5 table would be left behind
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
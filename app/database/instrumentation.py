@@ -0,0 +1,90 @@
+"""Query counting, timing and slow-query logging through cursor-execute hooks.
+
+Every statement is timed into ``db_query_duration_seconds``. While a request
+is being served, ``current_query_stats`` also accumulates its query count
+and time so the request middleware can report them per route. Statements
+slower than the configured threshold are logged, optionally together with
+their ``EXPLAIN`` plan.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.services.metrics import registry as metrics
+
+logger = logging.getLogger(__name__)
+
+_START_TIMES = "query_start_times"
+_OPERATIONS = {"select", "insert", "update", "delete", "with"}
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def _operation(statement: str) -> str:
+    words = statement.split(None, 1)
+    operation = words[0].lower() if words else ""
+    if operation == "with":
+        return "select"
+    return operation if operation in _OPERATIONS else "other"
+
+
+def explain(conn, statement: str, parameters) -> str:
+    """Plan of ``statement`` from a separate cursor, without executing it again."""
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return "\n".join(str(row[-1]) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def instrument_engine(engine, slow_query_threshold: Optional[float] = None, explain_slow_queries: bool = False) -> None:
+    pool = getattr(engine.pool, "name", "default")
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_START_TIMES, []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info[_START_TIMES].pop()
+        operation = _operation(statement)
+        metrics.observe("db_query_duration_seconds", elapsed, operation=operation, pool=pool)
+
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+
+        if slow_query_threshold is None or elapsed < slow_query_threshold:
+            return
+        metrics.incr("db_slow_queries_total", operation=operation, pool=pool)
+        plan = None
+        if explain_slow_queries and operation == "select" and not executemany and not context.execution_options.get("stream_results"):
+            try:
+                plan = explain(conn, statement, parameters)
+            except Exception:
+                logger.warning("Could not explain slow query", exc_info=True)
+        logger.warning(
+            "Slow query (%.3fs, pool %s): %s\nParameters: %r%s",
+            elapsed, pool, statement, parameters, f"\nPlan:\n{plan}" if plan else "",
+        )
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get(_START_TIMES):
+            conn.info[_START_TIMES].pop()
@@ -0,0 +1,46 @@
+"""Connection pools that record checkout wait time and utilization.
+
+Pools are named through ``create_engine(pool_logging_name=...)`` so the
+``api`` and ``worker`` pools can be sized separately from their metrics.
+"""
+import time
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.services.metrics import registry as metrics
+
+
+class _InstrumentedPoolMixin:
+    def __init__(self, creator, pool_size=5, max_overflow=10, **kw):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kw)
+        self.name = kw.get("logging_name") or "default"
+        self.capacity = pool_size + max(max_overflow, 0)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        connection = super()._do_get()
+        metrics.incr("db_pool_checkouts_total", pool=self.name)
+        metrics.incr("db_pool_checkout_wait_seconds_total", time.perf_counter() - started, pool=self.name)
+        return connection
+
+    def record_gauges(self) -> None:
+        checked_out = self.checkedout()
+        metrics.set("db_pool_size", self.size(), pool=self.name)
+        metrics.set("db_pool_checked_out", checked_out, pool=self.name)
+        metrics.set("db_pool_overflow", max(self.overflow(), 0), pool=self.name)
+        metrics.set("db_pool_utilization", checked_out / self.capacity if self.capacity else 0.0, pool=self.name)
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def record_pool_gauges(*engines) -> None:
+    for engine in engines:
+        pool = getattr(engine, "sync_engine", engine).pool
+        if isinstance(pool, _InstrumentedPoolMixin):
+            pool.record_gauges()
@@ -1,6 +1,18 @@
+import logging
+
+import redis
 from fastapi import FastAPI
-from app.api.routes import router
-from app.database.config import engine, Base
+from fastapi.responses import PlainTextResponse
+from app.api.middleware import RequestMetricsMiddleware
+from app.api.routes import prewarm_reviews_page, router
+from app.database.config import engine, Base, async_engine, get_async_redis, settings
+from app.database.pool import record_pool_gauges
+from app.services.access_log import access_log_buffer
+from app.services import analysis_cache, response_cache
+from app.services.metrics import collect_published, registry as metrics, render_prometheus
+from app.services.prewarm import CachePrewarmer
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Reviews API",
@@ -8,13 +20,29 @@ app = FastAPI(
     version="1.0.0"
 )
 
+app.add_middleware(RequestMetricsMiddleware)
 
 app.include_router(router)
 
+cache_prewarmer = CachePrewarmer(
+    prewarm_reviews_page,
+    interval=settings.cache_prewarm_interval,
+    categories=settings.cache_prewarm_categories,
+    window=settings.cache_prewarm_window,
+)
+
 
 @app.on_event("startup")
 async def startup_event():
-    pass
+    access_log_buffer.start()
+    cache_prewarmer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await cache_prewarmer.stop()
+    await access_log_buffer.stop()
+    await async_engine.dispose()
 
 
 @app.get("/")
@@ -31,3 +59,24 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    record_pool_gauges(engine, async_engine)
+    values = metrics.snapshot()
+    cache_hit_ratio = response_cache.hit_ratio(values)
+    if cache_hit_ratio is not None:
+        values["response_cache_hit_ratio"] = cache_hit_ratio
+    try:
+        cache_stats = await analysis_cache.read_stats(get_async_redis())
+    except redis.RedisError:
+        logger.warning("Could not read analysis cache stats from Redis", exc_info=True)
+    else:
+        values["analysis_cache_hits_total"] = cache_stats.get("hits", 0)
+        values["analysis_cache_misses_total"] = cache_stats.get("misses", 0)
+    try:
+        values.update(await collect_published(get_async_redis()))
+    except redis.RedisError:
+        logger.warning("Could not read worker metrics from Redis", exc_info=True)
+    return render_prometheus(values)
@@ -1,3 +1,22 @@
-from app.models.models import ReviewHistory, Category, AccessLog
+from app.models.models import (
+    ReviewHistory,
+    Category,
+    AccessLog,
+    AccessLogRollup,
+    ReviewLatest,
+    CategoryStats,
+    CategoryDailyRollup,
+    JobCheckpoint,
+)
+from app.services import projections  # noqa: F401  registers projection maintenance listeners
 
-__all__ = ["ReviewHistory", "Category", "AccessLog"]
+__all__ = [
+    "ReviewHistory",
+    "Category",
+    "AccessLog",
+    "AccessLogRollup",
+    "ReviewLatest",
+    "CategoryStats",
+    "CategoryDailyRollup",
+    "JobCheckpoint",
+]
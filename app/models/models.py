@@ -1,13 +1,22 @@
-from sqlalchemy import Column, BigInteger, String, Integer, Text, DateTime, ForeignKey, CheckConstraint
+from sqlalchemy import Column, BigInteger, String, Integer, Float, Text, Date, DateTime, LargeBinary, ForeignKey, CheckConstraint, Index, and_, event, or_
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.config import Base
+from app.database.fulltext import create_fulltext_index, drop_fulltext_index
+
+# SQLite only autoincrements INTEGER PRIMARY KEY columns
+BigIntegerPK = BigInteger().with_variant(Integer, "sqlite")
+
+# Values of ReviewHistory.analysis_status; NULL means the review was never claimed
+STATUS_PENDING = "pending"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
 
 
 class Category(Base):
     __tablename__ = "categories"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True, index=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True, index=True)
     name = Column(String(255), unique=True, nullable=False)
     description = Column(Text, nullable=True)
 
@@ -16,27 +25,130 @@ class Category(Base):
 
 class ReviewHistory(Base):
     __tablename__ = "review_history"
+    # On PostgreSQL this table is partitioned by month on created_at with
+    # primary key (id, created_at); see app/services/partitions.py
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True, index=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True, index=True)
     text = Column(String, nullable=True)
     stars = Column(Integer, nullable=False)
-    review_id = Column(String(255), nullable=False, index=True)
+    review_id = Column(String(255), nullable=False)
     tone = Column(String(255), nullable=True)
     sentiment = Column(String(255), nullable=True)
+    analysis_status = Column(String(20), nullable=True)
+    analysis_requested_at = Column(DateTime(timezone=True), nullable=True)
     category_id = Column(BigInteger, ForeignKey("categories.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, index=True)
+    # With REVIEW_HISTORY_DELTA_STORAGE, a superseded revision's text is NULL and
+    # rebuilt from this delta against revision text_delta_base_id; see app/services/revisions.py
+    text_delta = Column(LargeBinary, nullable=True)
+    text_delta_base_id = Column(BigInteger, nullable=True)
 
     __table_args__ = (
         CheckConstraint('stars >= 1 AND stars <= 10', name='check_stars_range'),
+        Index("ix_review_history_review_id_created_at", review_id, created_at.desc()),
+        # Rows still to analyze, walked in id order by the analysis backfill;
+        # completed and failed rows drop out even if tone or sentiment stayed NULL
+        Index(
+            "ix_review_history_unanalyzed",
+            "id",
+            postgresql_where=and_(or_(tone.is_(None), sentiment.is_(None)), or_(analysis_status.is_(None), analysis_status == STATUS_PENDING)),
+            sqlite_where=and_(or_(tone.is_(None), sentiment.is_(None)), or_(analysis_status.is_(None), analysis_status == STATUS_PENDING)),
+        ),
     )
 
     category = relationship("Category", back_populates="review_histories")
 
 
+# The full-text index is not mapped: a generated tsvector column on
+# PostgreSQL, an FTS5 table on SQLite
+event.listen(
+    ReviewHistory.__table__,
+    "after_create",
+    lambda target, connection, **kw: create_fulltext_index(connection),
+)
+event.listen(
+    ReviewHistory.__table__,
+    "after_drop",
+    lambda target, connection, **kw: drop_fulltext_index(connection),
+)
+
+
 class AccessLog(Base):
     __tablename__ = "access_logs"
+    # On PostgreSQL this table is partitioned by month on created_at with
+    # primary key (id, created_at); see app/services/partitions.py
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True, index=True)
+    id = Column(BigIntegerPK, primary_key=True, autoincrement=True, index=True)
     text = Column(String, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+
+class AccessLogRollup(Base):
+    __tablename__ = "access_log_rollup"
+
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    endpoint = Column(String(255), primary_key=True)
+    # 0 for requests that are not about a single category
+    category_id = Column(BigInteger, primary_key=True)
+    count = Column(BigInteger, nullable=False)
+
+    __table_args__ = (
+        Index("ix_access_log_rollup_category_bucket", "category_id", "bucket"),
+    )
+
+
+class ReviewLatest(Base):
+    __tablename__ = "review_latest"
+
+    review_id = Column(String(255), primary_key=True)
+    review_history_id = Column(BigInteger, nullable=False, unique=True)
+    category_id = Column(BigInteger, ForeignKey("categories.id"), nullable=False)
+    stars = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_review_latest_category_created", "category_id", "created_at", "review_history_id"),
+        Index("ix_review_latest_created_at", "created_at"),
+    )
+
+
+class CategoryStats(Base):
+    __tablename__ = "category_stats"
+
+    category_id = Column(BigInteger, ForeignKey("categories.id"), primary_key=True)
+    sum_stars = Column(BigInteger, nullable=False, default=0)
+    review_count = Column(BigInteger, nullable=False, default=0)
+    average_stars = Column(Float, nullable=True, index=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class CategoryDailyRollup(Base):
+    __tablename__ = "category_daily_rollup"
+
+    category_id = Column(BigInteger, ForeignKey("categories.id"), primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    sum_stars = Column(BigInteger, nullable=False)
+    review_count = Column(Integer, nullable=False)
+    stars_1 = Column(Integer, nullable=False)
+    stars_2 = Column(Integer, nullable=False)
+    stars_3 = Column(Integer, nullable=False)
+    stars_4 = Column(Integer, nullable=False)
+    stars_5 = Column(Integer, nullable=False)
+    stars_6 = Column(Integer, nullable=False)
+    stars_7 = Column(Integer, nullable=False)
+    stars_8 = Column(Integer, nullable=False)
+    stars_9 = Column(Integer, nullable=False)
+    stars_10 = Column(Integer, nullable=False)
+    positive_count = Column(Integer, nullable=False)
+    neutral_count = Column(Integer, nullable=False)
+    negative_count = Column(Integer, nullable=False)
+
+
+class JobCheckpoint(Base):
+    __tablename__ = "job_checkpoints"
+
+    name = Column(String(100), primary_key=True)
+    watermark = Column(DateTime(timezone=True), nullable=True)
+    position = Column(BigInteger, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -1,3 +1,31 @@
-from app.schemas.schemas import CategoryTrend, ReviewResponse, ReviewListResponse
+from app.schemas.schemas import (
+    CategoryTrend,
+    ReviewResponse,
+    ReviewListResponse,
+    ReviewIngestRow,
+    BulkIngestError,
+    BulkIngestResponse,
+    SentimentCounts,
+    AnalysisBacklog,
+    ReviewStats,
+    CategoryReviewStats,
+    ReviewStatsResponse,
+    TrafficEntry,
+    TrafficResponse,
+)
 
-__all__ = ["CategoryTrend", "ReviewResponse", "ReviewListResponse"]
+__all__ = [
+    "CategoryTrend",
+    "ReviewResponse",
+    "ReviewListResponse",
+    "ReviewIngestRow",
+    "BulkIngestError",
+    "BulkIngestResponse",
+    "SentimentCounts",
+    "AnalysisBacklog",
+    "ReviewStats",
+    "CategoryReviewStats",
+    "ReviewStatsResponse",
+    "TrafficEntry",
+    "TrafficResponse",
+]
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Dict, Optional, List
 from datetime import datetime
 
 
@@ -30,5 +30,93 @@ class ReviewResponse(BaseModel):
 
 class ReviewListResponse(BaseModel):
     reviews: List[ReviewResponse]
-    next_cursor: Optional[int]
+    next_cursor: Optional[str]
     has_more: bool
+
+
+class ReviewSearchResult(ReviewResponse):
+    rank: float
+
+
+class ReviewSearchResponse(BaseModel):
+    reviews: List[ReviewSearchResult]
+    next_cursor: Optional[str]
+    has_more: bool
+
+
+class ReviewHistoryResponse(BaseModel):
+    review_id: str
+    revisions: List[ReviewResponse]
+
+
+class ReviewIngestRow(BaseModel):
+    review_id: str = Field(..., min_length=1, max_length=255)
+    text: Optional[str] = None
+    stars: int = Field(..., ge=1, le=10)
+    category_id: int
+    created_at: Optional[datetime] = None
+    tone: Optional[str] = Field(None, max_length=255)
+    sentiment: Optional[str] = Field(None, max_length=255)
+
+
+class BulkIngestError(BaseModel):
+    line: int
+    error: str
+
+
+class BulkIngestResponse(BaseModel):
+    accepted: int
+    rejected: int
+    analysis_enqueued: int
+    errors: List[BulkIngestError]
+    errors_truncated: bool
+
+
+class SentimentCounts(BaseModel):
+    positive: int
+    neutral: int
+    negative: int
+    other: int
+    missing: int
+
+
+class AnalysisBacklog(BaseModel):
+    unanalyzed: int
+    pending: int
+    failed: int
+    missing_tone: int
+    missing_sentiment: int
+
+
+class ReviewStats(BaseModel):
+    history_entries: int
+    unique_reviews: int
+    edits: int
+    average_stars: Optional[float]
+    current_average_stars: Optional[float]
+    star_histogram: Dict[int, int]
+    sentiments: SentimentCounts
+    analysis: AnalysisBacklog
+
+
+class CategoryReviewStats(ReviewStats):
+    id: int
+    name: str
+    description: Optional[str]
+
+
+class ReviewStatsResponse(BaseModel):
+    overall: ReviewStats
+    categories: List[CategoryReviewStats]
+
+
+class TrafficEntry(BaseModel):
+    endpoint: str
+    category_id: Optional[int]
+    requests: int
+
+
+class TrafficResponse(BaseModel):
+    start: datetime
+    end: datetime
+    entries: List[TrafficEntry]
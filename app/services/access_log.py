@@ -0,0 +1,116 @@
+"""In-process access-log buffer flushed to ``access_logs`` in bulk.
+
+Request handlers append entries to a bounded ring buffer without any I/O.
+A background task drains it every ``access_log_flush_interval`` seconds, or
+as soon as ``access_log_batch_size`` entries are waiting, with one
+multi-row INSERT per batch. ``stop()`` drains whatever is left, so a
+graceful shutdown does not lose entries. When raw rows are not stored, each
+batch is counted straight into ``access_log_rollup`` instead. Entries lost
+to a full buffer are counted in ``access_log_dropped_total``.
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from app.database.config import async_engine, settings
+from app.models.models import AccessLog
+from app.services.metrics import registry as metrics
+from app.services.traffic import add_counts, count_entries
+
+logger = logging.getLogger(__name__)
+
+
+class AccessLogBuffer:
+    def __init__(self, max_size: int, batch_size: int, flush_interval: float, store_raw: bool = True):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.store_raw = store_raw
+        self.dropped = 0
+        self._entries = deque(maxlen=max_size)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _drop(self, count: int) -> None:
+        self.dropped += count
+        metrics.incr("access_log_dropped_total", count)
+
+    def record(self, text: str) -> None:
+        if len(self._entries) == self._entries.maxlen:
+            self._drop(1)
+        self._entries.append({"text": text, "created_at": datetime.now(timezone.utc)})
+        if self._wakeup is not None and len(self._entries) >= self.batch_size:
+            self._wakeup.set()
+
+    def _take_batch(self) -> List[dict]:
+        batch = []
+        while self._entries and len(batch) < self.batch_size:
+            batch.append(self._entries.popleft())
+        return batch
+
+    async def flush(self) -> int:
+        written = 0
+        while self._entries:
+            batch = self._take_batch()
+            try:
+                async with async_engine.begin() as conn:
+                    if self.store_raw:
+                        await conn.execute(insert(AccessLog).values(batch))
+                    else:
+                        counts = count_entries((entry["text"], entry["created_at"], 1) for entry in batch)
+                        await conn.run_sync(add_counts, counts)
+            except BaseException:
+                # Put the batch back in order (also on cancellation); the next flush retries it.
+                # Entries recorded meanwhile may have filled the buffer, and extendleft then
+                # evicts the newest ones from the right.
+                overflow = len(batch) + len(self._entries) - self._entries.maxlen
+                if overflow > 0:
+                    self._drop(overflow)
+                self._entries.extendleft(reversed(batch))
+                raise
+            written += len(batch)
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush %d access log entries", len(self._entries))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+        await self.flush()
+        if self.dropped:
+            logger.warning("Access log buffer overflowed; %d entries were dropped", self.dropped)
+
+
+access_log_buffer = AccessLogBuffer(
+    max_size=settings.access_log_buffer_size,
+    batch_size=settings.access_log_batch_size,
+    flush_interval=settings.access_log_flush_interval,
+    store_raw=settings.access_log_store_raw,
+)
@@ -0,0 +1,269 @@
+"""Prompt construction, response parsing and persistence for tone/sentiment analysis."""
+import asyncio
+import json
+import logging
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, case, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models.models import STATUS_COMPLETED, STATUS_FAILED, STATUS_PENDING, ReviewHistory
+from app.services.dispatcher import LLMUnavailable
+from app.services.response_cache import mark_changed, mark_status_changed
+
+logger = logging.getLogger(__name__)
+
+SINGLE_MAX_TOKENS = 100
+BATCH_MAX_TOKENS_PER_REVIEW = 40
+
+
+class ReviewInput(NamedTuple):
+    id: int
+    text: str
+    stars: int
+
+
+Analysis = Tuple[Optional[str], Optional[str]]
+
+
+class AnalysisOutcome(NamedTuple):
+    results: Dict[int, Analysis]
+    # The LLM was unavailable or its reply lacked a tone or sentiment; worth retrying later
+    deferred: List[int]
+    failed: List[int]
+
+
+def build_review_prompt(text: str, stars: int) -> str:
+    return f"""Analyze the following review and provide both the tone and sentiment.
+
+Review Text: "{text}"
+Star Rating: {stars}/10
+
+Please respond in the following exact format:
+Tone: [one word describing the tone, e.g., Professional, Casual, Enthusiastic, Disappointed, Angry, Happy, Neutral]
+Sentiment: [one word: Positive, Negative, or Neutral]
+
+Keep your response concise with just these two lines."""
+
+
+def parse_review_response(response_text: str) -> Analysis:
+    tone = None
+    sentiment = None
+
+    for line in response_text.strip().split('\n'):
+        if line.startswith('Tone:'):
+            tone = line.split(':', 1)[1].strip()
+        elif line.startswith('Sentiment:'):
+            sentiment = line.split(':', 1)[1].strip()
+
+    return tone, sentiment
+
+
+def build_batch_prompt(reviews: Sequence[ReviewInput]) -> str:
+    entries = "\n\n".join(
+        f"Review {review.id}:\nText: {json.dumps(review.text)}\nStar Rating: {review.stars}/10"
+        for review in reviews
+    )
+    return f"""Analyze each of the following reviews and provide both the tone and sentiment.
+
+{entries}
+
+Respond with only a JSON array containing one object per review, in this exact format:
+[{{"id": <review number>, "tone": "<one word describing the tone, e.g., Professional, Casual, Enthusiastic, Disappointed, Angry, Happy, Neutral>", "sentiment": "<one word: Positive, Negative, or Neutral>"}}]"""
+
+
+def parse_batch_response(response_text: str, expected_ids: Iterable[int]) -> Dict[int, Analysis]:
+    text = response_text.strip()
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end < start:
+        raise ValueError("Batch response does not contain a JSON array")
+
+    expected_ids = set(expected_ids)
+    results = {}
+    for item in json.loads(text[start:end + 1]):
+        review_id = int(item["id"])
+        if review_id in expected_ids:
+            results[review_id] = (item.get("tone"), item.get("sentiment"))
+    return results
+
+
+def chunked(items: Sequence, size: int) -> Iterable[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def group_by_content(reviews: Sequence[ReviewInput], known: Dict[int, Analysis]) -> List[List[ReviewInput]]:
+    """Group the reviews not in ``known`` by normalized text and stars; each group needs one analysis."""
+    groups: Dict[Tuple[str, int], List[ReviewInput]] = {}
+    for review in reviews:
+        if review.id not in known:
+            groups.setdefault((normalize_text(review.text), review.stars), []).append(review)
+    return list(groups.values())
+
+
+async def analyze_review_async(dispatcher, text: str, stars: int) -> Analysis:
+    return parse_review_response(await dispatcher.complete(build_review_prompt(text, stars), SINGLE_MAX_TOKENS))
+
+
+async def analyze_batch_async(dispatcher, reviews: Sequence[ReviewInput]) -> AnalysisOutcome:
+    """Classify ``reviews`` with one LLM call, falling back to concurrent per-review calls for anything it misses.
+
+    A per-review call that fails only affects its own review, which is
+    ``deferred`` when the LLM is unavailable and ``failed`` otherwise. If the
+    batch call itself finds the LLM unavailable, ``LLMUnavailable`` is raised.
+    """
+    results = {}
+    if len(reviews) > 1:
+        try:
+            response_text = await dispatcher.complete(
+                build_batch_prompt(reviews),
+                BATCH_MAX_TOKENS_PER_REVIEW * len(reviews) + SINGLE_MAX_TOKENS,
+            )
+            results = parse_batch_response(response_text, (review.id for review in reviews))
+        except LLMUnavailable:
+            raise
+        except Exception:
+            logger.warning("Batch analysis of %d reviews failed; falling back to per-review calls", len(reviews), exc_info=True)
+
+    missing = [review for review in reviews if review.id not in results]
+    analyses = await asyncio.gather(
+        *(analyze_review_async(dispatcher, review.text, review.stars) for review in missing),
+        return_exceptions=True,
+    )
+    deferred, failed = [], []
+    for review, analysis in zip(missing, analyses):
+        if isinstance(analysis, LLMUnavailable):
+            deferred.append(review.id)
+        elif isinstance(analysis, BaseException):
+            logger.warning("Analysis of review %d failed", review.id, exc_info=analysis)
+            failed.append(review.id)
+        else:
+            results[review.id] = analysis
+    return AnalysisOutcome(results, deferred, failed)
+
+
+async def run_analysis_async(dispatcher, reviews: Sequence[ReviewInput], batch_size: int, cache=None) -> AnalysisOutcome:
+    """Analyze ``reviews`` in concurrent batches, serving repeats from ``cache`` and analyzing identical content once.
+
+    A batch that fails only affects its own reviews: they are ``deferred``
+    when the LLM is unavailable and ``failed`` on any other error. Reviews
+    whose reply lacks a tone or sentiment are ``deferred`` too, rather than
+    saved as completed with blanks.
+    """
+    results = cache.get_many(reviews) if cache is not None else {}
+
+    groups = {group[0].id: group for group in group_by_content(reviews, results)}
+    unique = [group[0] for group in groups.values()]
+    chunks = list(chunked(unique, batch_size))
+    outcomes = await asyncio.gather(
+        *(analyze_batch_async(dispatcher, chunk) for chunk in chunks),
+        return_exceptions=True,
+    )
+
+    analyzed, deferred, failed = {}, [], []
+    for chunk, outcome in zip(chunks, outcomes):
+        if not isinstance(outcome, BaseException):
+            analyzed.update(outcome.results)
+            deferred.extend(review.id for first_id in outcome.deferred for review in groups[first_id])
+            failed.extend(review.id for first_id in outcome.failed for review in groups[first_id])
+            continue
+        review_ids = [review.id for first in chunk for review in groups[first.id]]
+        if isinstance(outcome, LLMUnavailable):
+            deferred.extend(review_ids)
+        else:
+            logger.warning("Analysis of %d reviews failed", len(review_ids), exc_info=outcome)
+            failed.extend(review_ids)
+    if cache is not None:
+        cache.set_many(unique, analyzed)
+
+    for first_id, group in groups.items():
+        if first_id not in analyzed:
+            continue
+        if not all(analyzed[first_id]):
+            logger.warning("Analysis of review %d returned %r; deferring it", first_id, analyzed[first_id])
+            deferred.extend(review.id for review in group)
+            continue
+        for review in group:
+            results[review.id] = analyzed[first_id]
+    return AnalysisOutcome(results, deferred, failed)
+
+
+def needs_analysis(review: ReviewHistory) -> bool:
+    return (
+        (review.tone is None or review.sentiment is None)
+        and bool(review.text)
+        and review.analysis_status not in (STATUS_COMPLETED, STATUS_FAILED)
+    )
+
+
+def claim_statement(review_history_ids: Iterable[int], pending_timeout: float):
+    """UPDATE ... RETURNING that marks rows pending and returns only the ids this caller now owns.
+
+    Rows already pending are skipped unless their request is older than
+    ``pending_timeout`` seconds, which covers tasks lost by a crashed worker.
+    """
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=pending_timeout)
+    return (
+        update(ReviewHistory)
+        .where(
+            ReviewHistory.id.in_(list(review_history_ids)),
+            or_(
+                ReviewHistory.analysis_status.is_(None),
+                and_(
+                    ReviewHistory.analysis_status == STATUS_PENDING,
+                    ReviewHistory.analysis_requested_at < stale_before,
+                ),
+            ),
+        )
+        .values(analysis_status=STATUS_PENDING, analysis_requested_at=datetime.now(timezone.utc))
+        .returning(ReviewHistory.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def save_analysis(db: Session, results: Dict[int, Analysis]) -> None:
+    """Save complete analyses; one missing its tone or sentiment is left for a later analysis."""
+    results = {review_id: analysis for review_id, analysis in results.items() if all(analysis)}
+    if not results:
+        return
+    # One UPDATE with CASE id WHEN ... rather than an executemany of one UPDATE per row
+    db.execute(
+        update(ReviewHistory)
+        .where(ReviewHistory.id.in_(list(results)))
+        .values(
+            tone=case({review_id: tone for review_id, (tone, _) in results.items()}, value=ReviewHistory.id),
+            sentiment=case({review_id: sentiment for review_id, (_, sentiment) in results.items()}, value=ReviewHistory.id),
+            analysis_status=STATUS_COMPLETED,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    category_ids = db.execute(
+        select(ReviewHistory.category_id).where(ReviewHistory.id.in_(list(results))).distinct()
+    ).scalars()
+    mark_changed(db, category_ids)
+
+
+def mark_failed(db: Session, review_history_ids: Iterable[int]) -> None:
+    mark_status_changed(db)
+    db.execute(
+        update(ReviewHistory)
+        .where(ReviewHistory.id.in_(list(review_history_ids)))
+        .values(analysis_status=STATUS_FAILED)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def load_review_inputs(db: Session, review_history_ids: Iterable[int]) -> List[ReviewInput]:
+    rows = (
+        db.query(ReviewHistory.id, ReviewHistory.text, ReviewHistory.stars)
+        .filter(ReviewHistory.id.in_(list(review_history_ids)), ReviewHistory.text.isnot(None))
+        .order_by(ReviewHistory.id)
+        .all()
+    )
+    return [ReviewInput(*row) for row in rows]
@@ -0,0 +1,84 @@
+"""Content-addressed cache of tone/sentiment results in Redis.
+
+Keys hash the normalized review text, the star rating, the model name and
+a fingerprint of the prompt templates, so changing either the prompt or
+the model starts a fresh key space. Entries expire after
+``analysis_cache_ttl`` seconds; Redis evicts least-recently-used keys under
+memory pressure (see ``maxmemory-policy`` in docker-compose.yml).
+"""
+import hashlib
+import json
+import logging
+from typing import Dict, Iterable, Optional
+
+import redis
+
+from app.database.config import get_redis, settings
+from app.services.analysis import Analysis, ReviewInput, build_batch_prompt, build_review_prompt, normalize_text
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "analysis_cache"
+STATS_KEY = f"{KEY_PREFIX}:stats"
+
+PROMPT_FINGERPRINT = hashlib.sha256(
+    (build_review_prompt("", 0) + build_batch_prompt([])).encode()
+).hexdigest()[:12]
+
+
+def cache_key(model: str, text: str, stars: int) -> str:
+    digest = hashlib.sha256(f"{model}\0{stars}\0{normalize_text(text)}".encode()).hexdigest()
+    return f"{KEY_PREFIX}:{PROMPT_FINGERPRINT}:{digest}"
+
+
+class AnalysisCache:
+    def __init__(self, client: redis.Redis, model: str, ttl: int):
+        self.client = client
+        self.model = model
+        self.ttl = ttl
+
+    def key(self, review: ReviewInput) -> str:
+        return cache_key(self.model, review.text, review.stars)
+
+    def get_many(self, reviews: Iterable[ReviewInput]) -> Dict[int, Analysis]:
+        reviews = list(reviews)
+        if not reviews:
+            return {}
+
+        try:
+            values = self.client.mget([self.key(review) for review in reviews])
+            results = {}
+            for review, value in zip(reviews, values):
+                if value is not None:
+                    tone, sentiment = json.loads(value)
+                    results[review.id] = (tone, sentiment)
+
+            pipe = self.client.pipeline(transaction=False)
+            pipe.hincrby(STATS_KEY, "hits", len(results))
+            pipe.hincrby(STATS_KEY, "misses", len(reviews) - len(results))
+            pipe.execute()
+        except redis.RedisError:
+            logger.warning("Analysis cache lookup failed; treating %d reviews as misses", len(reviews), exc_info=True)
+            return {}
+        return results
+
+    def set_many(self, reviews: Iterable[ReviewInput], results: Dict[int, Analysis]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for review in reviews:
+            if review.id in results and all(results[review.id]):
+                pipe.set(self.key(review), json.dumps(results[review.id]), ex=self.ttl)
+        try:
+            pipe.execute()
+        except redis.RedisError:
+            logger.warning("Analysis cache fill failed", exc_info=True)
+
+
+def get_analysis_cache(model: str) -> Optional[AnalysisCache]:
+    if not settings.analysis_cache_enabled:
+        return None
+    return AnalysisCache(get_redis(), model=model, ttl=settings.analysis_cache_ttl)
+
+
+async def read_stats(client: redis.asyncio.Redis) -> Dict[str, int]:
+    stats = await client.hgetall(STATS_KEY)
+    return {key.decode(): int(value) for key, value in stats.items()}
@@ -0,0 +1,129 @@
+"""Chunked backfill of review history rows that were never analyzed.
+
+Analysis otherwise starts only when a page is read, so rows nobody reads
+would stay unanalyzed forever. ``run_backfill`` walks rows with ``tone`` or
+``sentiment`` missing in ``id`` order, ``chunk_size`` at a time through the
+partial index ``ix_review_history_unanalyzed``, and claims them like a page
+read does. Each run claims at most ``rows_per_run`` rows, less the analyses
+still pending, so it never gets ahead of the workers. It also runs at most
+``rows_per_run // chunk_size + EXTRA_SCANS`` chunk queries, so a stretch of
+rows that cannot be claimed is walked over several runs rather than in one
+long transaction. The last id scanned is
+stored in ``job_checkpoints`` with the run's time, and the walk resumes there
+after a restart. Once it reaches the end it starts over, picking up rows
+whose analysis was lost or that were skipped while pending.
+
+Progress is measured against the previous run: ``rows_per_second`` counts
+the analyses saved since then for rows the backfill claimed, which the
+analysis tasks add up under ``SAVED``, and ``eta_seconds`` divides the
+remaining backlog by that rate. Rows without text, empty or not, are never
+claimed and do not count towards the backlog.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import and_, func, or_, select
+
+from app.models.models import ReviewHistory
+from app.services.analysis import STATUS_PENDING, claim_statement
+from app.services.checkpoints import add_to_position, load_checkpoint, save_checkpoint, take_position
+from app.services.metrics import registry as metrics
+
+CHECKPOINT = "analysis_backfill"
+# Counter of analyses saved for rows the backfill claimed, since its previous run
+SAVED = "analysis_backfill_saved"
+# Chunk queries per run beyond those needed to fill the budget, for chunks whose rows are mostly claimed elsewhere
+EXTRA_SCANS = 4
+
+
+class BackfillProgress(NamedTuple):
+    claimed: List[int]
+    position: int
+    backlog: int
+    rows_per_second: Optional[float]
+    eta_seconds: Optional[float]
+
+
+def unanalyzed():
+    # Matches the partial index's predicate, so queries that include it can use the index
+    return and_(
+        or_(ReviewHistory.tone.is_(None), ReviewHistory.sentiment.is_(None)),
+        or_(ReviewHistory.analysis_status.is_(None), ReviewHistory.analysis_status == STATUS_PENDING),
+    )
+
+
+def has_text():
+    return and_(ReviewHistory.text.isnot(None), ReviewHistory.text != "")
+
+
+def backlog_query():
+    """Rows the backfill still has to analyze: text present, not completed or given up on."""
+    return select(func.count()).select_from(ReviewHistory).where(unanalyzed(), has_text())
+
+
+def in_flight_query(pending_timeout: float):
+    stale_before = datetime.now(timezone.utc) - timedelta(seconds=pending_timeout)
+    return (
+        select(func.count())
+        .select_from(ReviewHistory)
+        .where(
+            unanalyzed(),
+            ReviewHistory.analysis_status == STATUS_PENDING,
+            ReviewHistory.analysis_requested_at >= stale_before,
+        )
+    )
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def run_backfill(connection, rows_per_run: int, chunk_size: int, pending_timeout: float) -> BackfillProgress:
+    """Claim the next unanalyzed rows and advance the checkpoint; the caller enqueues ``claimed`` after committing."""
+    now = datetime.now(timezone.utc)
+    checkpoint = load_checkpoint(connection, CHECKPOINT)
+    position = checkpoint.position if checkpoint is not None and checkpoint.position is not None else 0
+
+    claimed: List[int] = []
+    budget = max(0, rows_per_run - connection.execute(in_flight_query(pending_timeout)).scalar())
+    scans_left = rows_per_run // chunk_size + EXTRA_SCANS
+    while len(claimed) < budget and scans_left:
+        scans_left -= 1
+        ids = connection.execute(
+            select(ReviewHistory.id)
+            .where(ReviewHistory.id > position, unanalyzed(), has_text())
+            .order_by(ReviewHistory.id)
+            .limit(min(chunk_size, budget - len(claimed)))
+        ).scalars().all()
+        if not ids:
+            # Reached the end; the next run starts a new pass
+            position = 0
+            break
+        claimed += connection.execute(claim_statement(ids, pending_timeout)).scalars().all()
+        position = ids[-1]
+
+    backlog = connection.execute(backlog_query()).scalar()
+    saved = take_position(connection, SAVED)
+    rows_per_second = eta_seconds = None
+    if checkpoint is not None and checkpoint.watermark is not None:
+        since = _as_utc(checkpoint.watermark)
+        elapsed = (now - since).total_seconds()
+        if elapsed > 0:
+            rows_per_second = saved / elapsed
+            eta_seconds = backlog / rows_per_second if rows_per_second else (0.0 if not backlog else None)
+
+    save_checkpoint(connection, CHECKPOINT, watermark=now, position=position)
+
+    metrics.incr("analysis_backfill_enqueued_total", len(claimed))
+    metrics.set("analysis_backfill_backlog_rows", backlog)
+    if rows_per_second is not None:
+        metrics.set("analysis_backfill_rows_per_second", rows_per_second)
+    if eta_seconds is not None:
+        metrics.set("analysis_backfill_eta_seconds", eta_seconds)
+    return BackfillProgress(claimed, position, backlog, rows_per_second, eta_seconds)
+
+
+def record_saved(connection, count: int) -> None:
+    """Count ``count`` analyses saved for rows the backfill claimed, towards its next ``rows_per_second``."""
+    if count:
+        add_to_position(connection, SAVED, count)
@@ -0,0 +1,60 @@
+"""Progress markers for incremental background jobs, stored in ``job_checkpoints``.
+
+A job keeps a ``watermark`` timestamp, a ``position`` (e.g. the last id it
+processed) or both under its own name, and saves them in the same
+transaction as the work they describe. A counter keeps only a
+``position``: workers add to it with ``add_to_position`` and the job that
+reports on it reads and resets it with ``take_position``.
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, select, update
+
+from app.database.dialects import upsert
+from app.models.models import JobCheckpoint
+
+
+def load_checkpoint(connection, name: str):
+    return connection.execute(
+        select(JobCheckpoint.watermark, JobCheckpoint.position, JobCheckpoint.updated_at)
+        .where(JobCheckpoint.name == name)
+    ).first()
+
+
+def save_checkpoint(connection, name: str, watermark: Optional[datetime] = None, position: Optional[int] = None) -> None:
+    stmt = upsert(connection, JobCheckpoint.__table__).values(name=name, watermark=watermark, position=position)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[JobCheckpoint.name],
+        set_={
+            "watermark": stmt.excluded.watermark,
+            "position": stmt.excluded.position,
+            "updated_at": func.now(),
+        },
+    )
+    connection.execute(stmt)
+
+
+def add_to_position(connection, name: str, amount: int) -> None:
+    stmt = upsert(connection, JobCheckpoint.__table__).values(name=name, position=amount)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[JobCheckpoint.name],
+        set_={
+            "position": func.coalesce(JobCheckpoint.position, 0) + stmt.excluded.position,
+            "updated_at": func.now(),
+        },
+    )
+    connection.execute(stmt)
+
+
+def take_position(connection, name: str) -> int:
+    """Return the counter ``name`` and reset it to 0, locking it until the transaction ends."""
+    taken = connection.execute(
+        select(JobCheckpoint.position).where(JobCheckpoint.name == name).with_for_update()
+    ).scalar()
+    if not taken:
+        return 0
+    connection.execute(
+        update(JobCheckpoint).where(JobCheckpoint.name == name).values(position=0, updated_at=func.now())
+    )
+    return taken
@@ -0,0 +1,261 @@
+"""Concurrent, rate-limited LLM calls for the analysis tasks.
+
+``AnalysisDispatcher`` runs up to ``concurrency`` calls at once on an asyncio
+client from ``create_llm_client``. Each call first takes one request
+and its estimated tokens from two token buckets. Failures with 408, 409, 429,
+a 5xx status or a connection error are retried with full-jitter exponential
+backoff, or after ``Retry-After`` when the backend sends one. The same
+failures feed a circuit breaker: after ``failure_threshold`` in a row it
+rejects calls for ``reset_timeout`` seconds, then lets one probe through.
+Any other error status counts as the backend being up. ``LLMUnavailable``
+means a call gave up for one of these reasons and is worth retrying later;
+any other error is raised unchanged, and one that is not an error status,
+such as a bug on this side, leaves the breaker as it was.
+
+Celery tasks are synchronous, so each worker process runs a single event
+loop in a background thread. ``run`` submits work to it, and every task in
+the process shares the one dispatcher, with its buckets and breaker.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import anthropic
+
+from app.database.config import settings
+from app.services.llm import LLMStatusError, create_llm_client
+from app.services.metrics import registry as metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS_CODES = (408, 409, 429)
+
+# Errors carrying an HTTP status: the backend itself answered
+STATUS_ERRORS = (anthropic.APIStatusError, LLMStatusError)
+
+
+class LLMUnavailable(Exception):
+    """The backend kept failing with transient errors, or the circuit breaker is open."""
+
+
+class CircuitOpenError(LLMUnavailable):
+    pass
+
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, anthropic.APIConnectionError):
+        return True
+    status = getattr(exc, "status_code", None)
+    return status is not None and (status in RETRYABLE_STATUS_CODES or status >= 500)
+
+
+def retry_after(exc: Exception) -> Optional[float]:
+    value = getattr(exc, "retry_after", None)
+    if value is not None:
+        return value
+    response = getattr(exc, "response", None)
+    header = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(header) if header else None
+    except ValueError:
+        return None
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    # Roughly four characters per input token, plus the whole output allowance
+    return len(prompt) // 4 + max_tokens
+
+
+class TokenBucket:
+    """Refills ``rate_per_minute`` units per minute, holding at most one minute's worth."""
+
+    def __init__(self, rate_per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60
+        self.clock = clock
+        self.available = rate_per_minute
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float) -> None:
+        amount = min(amount, self.capacity)
+        # Waiters queue on the lock, so they are served in arrival order
+        async with self._lock:
+            self._refill()
+            while self.available < amount:
+                await asyncio.sleep((amount - self.available) / self.rate)
+                self._refill()
+            self.available -= amount
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if self.clock() - self.opened_at < self.reset_timeout else "half_open"
+
+    def before_call(self) -> bool:
+        """Raise ``CircuitOpenError`` if the call may not go ahead; return True if it is the half-open probe."""
+        if self.opened_at is None:
+            return False
+        if self._probing or self.clock() - self.opened_at < self.reset_timeout:
+            raise CircuitOpenError("LLM circuit breaker is open")
+        self._probing = True
+        return True
+
+    def release_probe(self) -> None:
+        """End a probe that finished without an outcome, e.g. when its task was cancelled."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            logger.info("LLM circuit breaker closed")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        metrics.set("llm_circuit_open", 0)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning("LLM circuit breaker opened after %d consecutive failures", self.failures)
+            self.opened_at = self.clock()
+            metrics.set("llm_circuit_open", 1)
+
+
+class AnalysisDispatcher:
+    def __init__(
+        self,
+        client,
+        concurrency: int,
+        requests_per_minute: Optional[float],
+        tokens_per_minute: Optional[float],
+        max_retries: int,
+        retry_base_delay: float,
+        retry_max_delay: float,
+        breaker: CircuitBreaker,
+    ):
+        self.client = client
+        self.model = client.model
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.breaker = breaker
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._random = random.Random()
+
+    def backoff(self, attempt: int, exc: Exception) -> float:
+        delay = retry_after(exc)
+        if delay is None:
+            return self._random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+        # A huge Retry-After would hold a worker slot for as long as it says
+        return min(delay, self.retry_max_delay)
+
+    async def complete(self, prompt: str, max_tokens: int) -> str:
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                probe = self.breaker.before_call()
+                try:
+                    if self.request_bucket is not None:
+                        await self.request_bucket.acquire(1)
+                    if self.token_bucket is not None:
+                        await self.token_bucket.acquire(estimate_tokens(prompt, max_tokens))
+
+                    started = time.perf_counter()
+                    text = await self.client.complete(prompt, max_tokens)
+                except Exception as exc:
+                    if not is_retryable(exc):
+                        if isinstance(exc, STATUS_ERRORS):
+                            # The backend answered, so it is not down
+                            self.breaker.record_success()
+                            metrics.incr("llm_requests_total", outcome="error")
+                        raise
+                    self.breaker.record_failure()
+                    metrics.incr("llm_requests_total", outcome="retryable", status=getattr(exc, "status_code", "connection"))
+                    if attempt == self.max_retries:
+                        raise LLMUnavailable(f"LLM call failed after {attempt + 1} attempts: {exc}") from exc
+                    await asyncio.sleep(self.backoff(attempt, exc))
+                else:
+                    self.breaker.record_success()
+                    metrics.incr("llm_requests_total", outcome="ok")
+                    metrics.observe("llm_request_duration_seconds", time.perf_counter() - started)
+                    return text
+                finally:
+                    if probe:
+                        # Cancellation, and errors that never reached the backend, end
+                        # the probe without an outcome
+                        self.breaker.release_probe()
+
+
+def create_dispatcher(client=None) -> AnalysisDispatcher:
+    return AnalysisDispatcher(
+        client or create_llm_client(),
+        concurrency=settings.llm_concurrency,
+        requests_per_minute=settings.llm_requests_per_minute,
+        tokens_per_minute=settings.llm_tokens_per_minute,
+        max_retries=settings.llm_max_retries,
+        retry_base_delay=settings.llm_retry_base_delay,
+        retry_max_delay=settings.llm_retry_max_delay,
+        breaker=CircuitBreaker(settings.llm_circuit_failure_threshold, settings.llm_circuit_reset_timeout),
+    )
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_dispatcher: Optional[AnalysisDispatcher] = None
+
+
+def run(work: Callable[[AnalysisDispatcher], Awaitable[T]]) -> T:
+    """Run ``work(dispatcher)`` on this process's dispatcher loop and wait for its result."""
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+        threading.Thread(target=_loop.run_forever, name="llm-dispatcher", daemon=True).start()
+
+    async def call():
+        global _dispatcher
+        if _dispatcher is None:
+            _dispatcher = create_dispatcher()
+        return await work(_dispatcher)
+
+    return asyncio.run_coroutine_threadsafe(call(), _loop).result()
+
+
+def close_dispatcher() -> None:
+    global _loop, _dispatcher
+    if _loop is None:
+        return
+    if _dispatcher is not None:
+        asyncio.run_coroutine_threadsafe(_dispatcher.client.close(), _loop).result()
+    _loop.call_soon_threadsafe(_loop.stop)
+    _loop = None
+    _dispatcher = None
+
+
+def reset_dispatcher() -> None:
+    """Forget an inherited loop and dispatcher; their thread does not survive a fork."""
+    global _loop, _dispatcher
+    _loop = None
+    _dispatcher = None
@@ -0,0 +1,118 @@
+"""Streaming export of a category's reviews.
+
+Rows are read through a server-side cursor (``AsyncSession.stream`` with
+``yield_per``) and written out one partition at a time, so memory stays
+constant and a slow client slows down the cursor instead of piling up
+buffered rows.
+"""
+import csv
+import io
+import json
+from typing import AsyncIterator
+
+from sqlalchemy import select
+
+from app.database.config import AsyncSessionLocal, settings
+from app.models.models import ReviewHistory, ReviewLatest
+from app.services.projections import latest_revision_join
+from app.services.revisions import reconstruct
+
+EXPORT_COLUMNS = [
+    ReviewHistory.id,
+    ReviewHistory.review_id,
+    ReviewHistory.text,
+    ReviewHistory.stars,
+    ReviewHistory.tone,
+    ReviewHistory.sentiment,
+    ReviewHistory.category_id,
+    ReviewHistory.created_at,
+    ReviewHistory.updated_at,
+]
+FIELD_NAMES = [column.key for column in EXPORT_COLUMNS]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def export_query(category_id: int, include_history: bool):
+    if include_history:
+        return (
+            select(*EXPORT_COLUMNS, ReviewHistory.text_delta, ReviewHistory.text_delta_base_id)
+            .where(ReviewHistory.category_id == category_id)
+            .order_by(ReviewHistory.review_id, ReviewHistory.created_at, ReviewHistory.id)
+        )
+    return (
+        select(*EXPORT_COLUMNS)
+        .join(ReviewLatest, latest_revision_join())
+        .where(ReviewLatest.category_id == category_id)
+        .order_by(ReviewLatest.created_at.desc(), ReviewLatest.review_history_id.desc())
+    )
+
+
+async def _with_history_texts(partitions) -> AsyncIterator[list]:
+    """Partitions of history rows with the text of delta-encoded revisions rebuilt.
+
+    A revision's delta is based on a newer revision of the same review, which
+    may be in the next partition, so a partition's last review is held back
+    until all its revisions have been read.
+    """
+    held: list = []
+    async for partition in partitions:
+        rows = held + list(partition)
+        split = len(rows)
+        while split and rows[split - 1].review_id == rows[-1].review_id:
+            split -= 1
+        rows, held = rows[:split], rows[split:]
+        if rows:
+            yield _rebuild_texts(rows)
+    if held:
+        yield _rebuild_texts(held)
+
+
+def _rebuild_texts(rows) -> list:
+    texts = reconstruct(rows)
+    text_index = FIELD_NAMES.index("text")
+    return [
+        (*row[:text_index], texts[row.id], *row[text_index + 1:len(FIELD_NAMES)])
+        for row in rows
+    ]
+
+
+def _serializable(row) -> dict:
+    record = dict(zip(FIELD_NAMES, row))
+    for key in ("created_at", "updated_at"):
+        if record[key] is not None:
+            record[key] = record[key].isoformat()
+    return record
+
+
+def _encode_ndjson(rows) -> bytes:
+    return "".join(json.dumps(_serializable(row)) + "\n" for row in rows).encode()
+
+
+def _encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELD_NAMES)
+    writer.writerows(_serializable(row) for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def stream_export(category_id: int, export_format: str, include_history: bool) -> AsyncIterator[bytes]:
+    # The session lives inside the generator: request-scoped dependencies are
+    # closed before a StreamingResponse body is sent.
+    async with AsyncSessionLocal() as db:
+        if export_format == "csv":
+            buffer = io.StringIO()
+            csv.DictWriter(buffer, fieldnames=FIELD_NAMES).writeheader()
+            yield buffer.getvalue().encode()
+
+        encode = _encode_csv if export_format == "csv" else _encode_ndjson
+        query = export_query(category_id, include_history).execution_options(yield_per=settings.export_batch_size)
+        result = await db.stream(query)
+        partitions = result.partitions()
+        if include_history:
+            partitions = _with_history_texts(partitions)
+        async for partition in partitions:
+            yield encode(partition)
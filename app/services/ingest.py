@@ -0,0 +1,190 @@
+"""Streaming bulk ingestion of reviews and edits into ``review_history``.
+
+Request bodies are parsed record by record as they arrive (NDJSON or CSV),
+validated against ``ReviewIngestRow`` and written in chunks of
+``bulk_ingest_chunk_size`` rows with one executemany INSERT per chunk, so
+memory stays bounded by the chunk size rather than the body size. Each
+chunk commits on its own together with its projection updates, and its
+unanalyzed rows are claimed and enqueued in analysis-sized batches.
+"""
+import codecs
+import csv
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.celery_app import QUEUE_BULK
+from app.database.config import settings
+from app.models.models import Category, ReviewHistory
+from app.schemas.schemas import BulkIngestError, BulkIngestResponse, ReviewIngestRow
+from app.services.analysis import chunked, claim_statement
+from app.services.projections import sync_latest
+from app.services.response_cache import mark_changed, wait_for_bumps
+from app.services.revisions import compact_revisions
+from app.tasks.tasks import analyze_sentiment_batch
+
+Record = Tuple[int, Optional[dict], Optional[str]]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, "Expected a JSON object"
+            continue
+        yield line_number, record, None
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """Yield each CSV record with the line of the file it starts on, counting the header as line 1."""
+    header = None
+    line_number = 0
+    record_line = 0
+    pending = ""
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not pending:
+            record_line = line_number
+        pending += line + "\n"
+        # A record is complete once its quotes balance; quoted fields may span lines
+        if pending.count('"') % 2:
+            continue
+        text, pending = pending, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield record_line, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield record_line, {name: value or None for name, value in zip(header, values)}, None
+    if pending.strip():
+        yield record_line, None, "Unterminated quoted field"
+
+
+class BulkIngestor:
+    def __init__(self, db: AsyncSession, chunk_size: int, max_errors: int):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.accepted = 0
+        self.rejected = 0
+        self.analysis_enqueued = 0
+        self.errors: List[BulkIngestError] = []
+        self._category_ids = None
+        self._rows: List[dict] = []
+
+    def reject(self, line: int, error: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(BulkIngestError(line=line, error=error))
+
+    async def add(self, line: int, record: dict) -> None:
+        if self._category_ids is None:
+            self._category_ids = set((await self.db.execute(select(Category.id))).scalars())
+
+        try:
+            row = ReviewIngestRow.model_validate(record)
+        except ValidationError as e:
+            self.reject(line, "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            ))
+            return
+        if row.category_id not in self._category_ids:
+            self.reject(line, f"category_id: unknown category {row.category_id}")
+            return
+
+        values = row.model_dump()
+        if values["created_at"] is None:
+            values["created_at"] = datetime.now(timezone.utc)
+        self._rows.append(values)
+        if len(self._rows) >= self.chunk_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+
+        result = await self.db.execute(
+            insert(ReviewHistory).returning(ReviewHistory.id, sort_by_parameter_order=True),
+            rows,
+        )
+        new_ids = result.scalars().all()
+        review_ids = {row["review_id"] for row in rows}
+        await self.db.run_sync(lambda session: mark_changed(session, sync_latest(session.connection(), review_ids)))
+
+        unanalyzed_ids = [
+            row_id for row_id, row in zip(new_ids, rows)
+            if row["text"] and (row["tone"] is None or row["sentiment"] is None)
+        ]
+        claimed_ids = []
+        if unanalyzed_ids:
+            claimed = await self.db.execute(claim_statement(unanalyzed_ids, settings.analysis_pending_timeout))
+            claimed_ids = claimed.scalars().all()
+        if settings.review_history_delta_storage:
+            # After the claim: revisions still waiting for analysis keep their text
+            await self.db.run_sync(lambda session: compact_revisions(session.connection(), review_ids))
+        await self.db.commit()
+        # The client may read its reviews as soon as the response arrives
+        await wait_for_bumps(self.db)
+        self.accepted += len(rows)
+
+        if claimed_ids:
+            # Publishing to the broker is blocking Redis I/O, kept off the event loop
+            await run_in_threadpool(self._enqueue_analysis, claimed_ids)
+            self.analysis_enqueued += len(claimed_ids)
+
+    @staticmethod
+    def _enqueue_analysis(claimed_ids: List[int]) -> None:
+        for batch in chunked(sorted(claimed_ids), settings.analysis_batch_size):
+            # Nobody is waiting on a bulk load, so it must not delay analysis for page views
+            analyze_sentiment_batch.apply_async(args=[list(batch)], queue=QUEUE_BULK)
+
+    def response(self) -> BulkIngestResponse:
+        return BulkIngestResponse(
+            accepted=self.accepted,
+            rejected=self.rejected,
+            analysis_enqueued=self.analysis_enqueued,
+            errors=self.errors,
+            errors_truncated=self.rejected > len(self.errors),
+        )
+
+
+async def ingest(db: AsyncSession, records: AsyncIterator[Record]) -> BulkIngestResponse:
+    ingestor = BulkIngestor(db, settings.bulk_ingest_chunk_size, settings.bulk_ingest_max_errors)
+    async for line, record, error in records:
+        if error is not None:
+            ingestor.reject(line, error)
+        else:
+            await ingestor.add(line, record)
+    await ingestor.flush()
+    return ingestor.response()
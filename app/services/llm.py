@@ -0,0 +1,102 @@
+"""Asyncio LLM clients used by the analysis dispatcher.
+
+``create_llm_client`` returns the backend selected by ``settings.llm_backend``:
+``anthropic`` for the real API or ``fake`` for a deterministic local
+stand-in used in development, load tests and benchmarks, which can also
+inject 429 and 503 errors. The dispatcher in ``app.services.dispatcher``
+owns the one client per process and closes it at worker shutdown.
+"""
+import asyncio
+import json
+import random
+import re
+from typing import Optional
+
+import anthropic
+
+from app.database.config import settings
+
+_BATCH_ENTRY = re.compile(r"^Review (\d+):\nText: .*\nStar Rating: (\d+)/10$", re.MULTILINE)
+_STAR_RATING = re.compile(r"^Star Rating: (\d+)/10$", re.MULTILINE)
+
+
+class LLMStatusError(Exception):
+    """An HTTP error status from an LLM backend that is not the Anthropic SDK."""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"LLM backend returned HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AnthropicClient:
+    def __init__(self, api_key: str, model: str):
+        self.model = model
+        # Retries are left to the dispatcher, which also applies the circuit breaker
+        self._client = anthropic.AsyncAnthropic(api_key=api_key, max_retries=0)
+
+    async def close(self) -> None:
+        await self._client.close()
+
+    async def complete(self, prompt: str, max_tokens: int) -> str:
+        message = await self._client.messages.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        )
+        return message.content[0].text
+
+
+class FakeLLMClient:
+    """Classifies reviews from their star rating alone, with optional simulated latency and 429/503 failures."""
+
+    model = "fake"
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+
+    @staticmethod
+    def classify(stars: int):
+        if stars >= 8:
+            return "Enthusiastic", "Positive"
+        if stars >= 5:
+            return "Neutral", "Neutral"
+        return "Disappointed", "Negative"
+
+    async def close(self) -> None:
+        pass
+
+    async def complete(self, prompt: str, max_tokens: int) -> str:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            self.failures += 1
+            raise LLMStatusError(self._random.choice((429, 503)))
+        return self.respond(prompt)
+
+    def respond(self, prompt: str) -> str:
+        entries = _BATCH_ENTRY.findall(prompt)
+        if entries:
+            results = []
+            for review_id, stars in entries:
+                tone, sentiment = self.classify(int(stars))
+                results.append({"id": int(review_id), "tone": tone, "sentiment": sentiment})
+            return json.dumps(results)
+
+        tone, sentiment = self.classify(int(_STAR_RATING.search(prompt).group(1)))
+        return f"Tone: {tone}\nSentiment: {sentiment}"
+
+
+def create_llm_client():
+    if settings.llm_backend == "anthropic":
+        return AnthropicClient(api_key=settings.anthropic_api_key, model=settings.llm_model)
+    if settings.llm_backend == "fake":
+        return FakeLLMClient(latency=settings.fake_llm_latency, failure_rate=settings.fake_llm_failure_rate)
+    raise ValueError(f"Unknown LLM backend: {settings.llm_backend}")
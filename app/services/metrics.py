@@ -0,0 +1,163 @@
+"""Process-local counters, gauges and histograms exported in the Prometheus text format.
+
+Celery worker processes publish their snapshot to a Redis hash so the
+API's ``/metrics`` can export them next to its own, labelled by process.
+"""
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Sequence, Set
+
+PUBLISHED_PREFIX = "metrics:process:"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_LE_LABEL = re.compile(r'(?:^|,)le="([^"]*)"')
+_HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+
+# ``# HELP`` text per metric family; a family missing here is exported without one
+DESCRIPTIONS = {
+    "access_log_dropped_total": "Access log entries dropped because the buffer was full",
+    "analysis_backfill_backlog_rows": "Review revisions still waiting for analysis",
+    "analysis_backfill_enqueued_total": "Review revisions enqueued for analysis by the backfill",
+    "analysis_backfill_eta_seconds": "Estimated time until the analysis backlog is drained",
+    "analysis_backfill_rows_per_second": "Rate at which the analysis backlog is drained",
+    "analysis_cache_hits_total": "Analyses served from the analysis cache",
+    "analysis_cache_misses_total": "Analyses that missed the analysis cache",
+    "analysis_enqueue_suppressed_total": "Unanalyzed revisions on a page left alone because their analysis is pending",
+    "analysis_enqueued_total": "Unanalyzed revisions on a page enqueued for analysis",
+    "celery_task_duration_seconds": "Celery task run time, by task and final state",
+    "celery_task_failures_total": "Celery task failures, by task and exception",
+    "celery_task_queue_wait_seconds": "Time from publishing a Celery task to its start",
+    "celery_task_retries_total": "Celery task retries, by task",
+    "db_pool_checked_out": "Connections currently checked out of the pool",
+    "db_pool_checkout_wait_seconds_total": "Time spent waiting for a pool connection",
+    "db_pool_checkouts_total": "Connections checked out of the pool",
+    "db_pool_overflow": "Connections open beyond the pool size",
+    "db_pool_size": "Configured pool size",
+    "db_pool_utilization": "Checked-out connections as a fraction of pool capacity",
+    "db_query_duration_seconds": "Statement run time, by operation and pool",
+    "db_slow_queries_total": "Statements slower than SLOW_QUERY_THRESHOLD",
+    "http_request_db_queries": "Database queries run per HTTP request",
+    "http_request_db_seconds": "Time spent in database queries per HTTP request",
+    "http_request_duration_seconds": "HTTP request latency, by method, route and status",
+    "http_requests_in_flight": "HTTP requests being handled, by method and route",
+    "llm_circuit_open": "1 while the LLM circuit breaker is open",
+    "llm_request_duration_seconds": "Latency of successful LLM calls",
+    "llm_requests_total": "LLM calls, by outcome",
+    "response_cache_db_seconds_saved_total": "Estimated database time saved by response cache hits",
+    "response_cache_hit_ratio": "Response cache hits as a fraction of lookups",
+    "response_cache_hits_total": "Response cache hits, by route and tier",
+    "response_cache_misses_total": "Response cache misses, by route",
+    "response_cache_not_modified_total": "Requests answered 304 Not Modified, by route",
+    "response_cache_prewarmed_total": "Responses written to the cache by the prewarmer",
+}
+
+
+def series_name(name: str, labels: Dict[str, object]) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return f"{name}{{{rendered}}}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = defaultdict(float)
+
+    def incr(self, name: str, amount: float = 1, **labels) -> None:
+        key = series_name(name, labels)
+        with self._lock:
+            self._values[key] += amount
+
+    def set(self, name: str, value: float, **labels) -> None:
+        key = series_name(name, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels) -> None:
+        """Record ``value`` in the cumulative histogram ``name`` (``_bucket``, ``_sum`` and ``_count`` series)."""
+        series = [(series_name(f"{name}_bucket", {**labels, "le": float(bound)}), value <= bound) for bound in buckets]
+        series.append((series_name(f"{name}_bucket", {**labels, "le": "+Inf"}), True))
+        with self._lock:
+            for key, matched in series:
+                self._values[key] += matched
+            self._values[series_name(f"{name}_sum", labels)] += value
+            self._values[series_name(f"{name}_count", labels)] += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+def with_label(series: str, key: str, value: object) -> str:
+    label = f'{key}="{value}"'
+    if series.endswith("}"):
+        return f"{series[:-1]},{label}}}"
+    return f"{series}{{{label}}}"
+
+
+def publish(client, process: str, values: Dict[str, float], ttl: int) -> None:
+    if not values:
+        return
+    key = PUBLISHED_PREFIX + process
+    pipe = client.pipeline(transaction=False)
+    pipe.delete(key)
+    pipe.hset(key, mapping=values)
+    pipe.expire(key, ttl)
+    pipe.execute()
+
+
+async def collect_published(client) -> Dict[str, float]:
+    values = {}
+    async for key in client.scan_iter(match=PUBLISHED_PREFIX + "*"):
+        process = key.decode()[len(PUBLISHED_PREFIX):]
+        for series, value in (await client.hgetall(key)).items():
+            values[with_label(series.decode(), "process", process)] = float(value)
+    return values
+
+
+def _render_order(series: str):
+    # Keep histogram buckets in ascending ``le`` order rather than string order
+    name, _, labels = series.partition("{")
+    match = _LE_LABEL.search(labels)
+    if match is None:
+        return name, labels, 0.0
+    return name, labels[:match.start()] + labels[match.end():], float(match.group(1))
+
+
+def _family(name: str, histograms: Set[str]) -> str:
+    for suffix in _HISTOGRAM_SUFFIXES:
+        if name.endswith(suffix) and name[:-len(suffix)] in histograms:
+            return name[:-len(suffix)]
+    return name
+
+
+def _metric_type(family: str, histograms: Set[str]) -> str:
+    if family in histograms:
+        return "histogram"
+    return "counter" if family.endswith("_total") else "gauge"
+
+
+def render_prometheus(values: Dict[str, float]) -> str:
+    """Series grouped by metric family, each family headed by its ``# HELP`` and ``# TYPE`` lines."""
+    names = {key.partition("{")[0] for key in values}
+    histograms = {name[:-len("_bucket")] for name in names if name.endswith("_bucket")}
+
+    lines = []
+    current = None
+    for key in sorted(values, key=lambda key: (_family(key.partition("{")[0], histograms), *_render_order(key))):
+        family = _family(key.partition("{")[0], histograms)
+        if family != current:
+            current = family
+            if family in DESCRIPTIONS:
+                lines.append(f"# HELP {family} {DESCRIPTIONS[family]}")
+            lines.append(f"# TYPE {family} {_metric_type(family, histograms)}")
+        value = values[key]
+        lines.append(f"{key} {int(value) if float(value).is_integer() else value}")
+    return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,39 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+def _encode(key: list) -> str:
+    raw = json.dumps(key, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    return _encode([created_at.isoformat(), row_id])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, row_id = _decode(cursor)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def encode_rank_cursor(rank: float, row_id: int) -> str:
+    # json.dumps writes the shortest repr that reads back as the same float,
+    # so the next page compares against exactly this rank
+    return _encode([rank, row_id])
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        rank, row_id = _decode(cursor)
+        return float(rank), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
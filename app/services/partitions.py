@@ -0,0 +1,137 @@
+"""Monthly range partitions of ``review_history`` and ``access_logs``.
+
+On PostgreSQL both tables are partitioned by ``created_at``, one partition
+per calendar month (UTC) named ``<table>_yYYYYmMM``, plus a ``<table>_default``
+partition that catches anything outside the monthly ranges.
+``ensure_partitions`` creates the months ahead of time so inserts never land
+in the default partition; ``drop_expired_partitions`` detaches (and by
+default drops) ``access_logs`` months that are older than the retention
+period. Other databases use plain tables and are left alone.
+"""
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+
+PARTITIONED_TABLES = ("review_history", "access_logs")
+
+_PARTITION_SUFFIX = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def month_start(value: datetime) -> date:
+    return value.astimezone(timezone.utc).date().replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    match = _PARTITION_SUFFIX.search(name)
+    if match is None:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def _bound(month: date) -> str:
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def is_partitioned(connection, table: str) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return connection.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"),
+        {"table": table},
+    ).scalar()
+
+
+def list_partitions(connection, table: str) -> List[str]:
+    return list(connection.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits"
+            " JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+            " WHERE pg_inherits.inhparent = to_regclass(:table)"
+            " ORDER BY child.relname"
+        ),
+        {"table": table},
+    ).scalars())
+
+
+def create_partition(connection, table: str, month: date, default_partition: Optional[str] = None) -> str:
+    """Attach the partition for ``month``, moving any rows for it out of the default partition.
+
+    Creating it with ``PARTITION OF`` would fail if the default partition
+    already holds rows in that range, so the table is built standalone,
+    filled from the default partition and then attached.
+    """
+    name = partition_name(table, month)
+    lower, upper = _bound(month), _bound(add_months(month, 1))
+    connection.execute(text(
+        f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED)"
+    ))
+    if default_partition is not None:
+        # Generated columns, such as review_history.search_vector, cannot be inserted into
+        columns = ", ".join(connection.execute(
+            text(
+                "SELECT column_name FROM information_schema.columns"
+                " WHERE table_name = :table AND is_generated = 'NEVER' ORDER BY ordinal_position"
+            ),
+            {"table": table},
+        ).scalars())
+        connection.execute(text(
+            f"WITH moved AS (DELETE FROM {default_partition}"
+            f" WHERE created_at >= {lower} AND created_at < {upper} RETURNING *)"
+            f" INSERT INTO {name} ({columns}) SELECT {columns} FROM moved"
+        ))
+    connection.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ({lower}) TO ({upper})"))
+    return name
+
+
+def ensure_partitions(connection, table: str, months_ahead: int, now: Optional[datetime] = None) -> List[str]:
+    """Create any missing partitions from the current month to ``months_ahead`` months after it."""
+    existing = set(list_partitions(connection, table))
+    default_partition = f"{table}_default" if f"{table}_default" in existing else None
+    current = month_start(now or datetime.now(timezone.utc))
+
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if partition_name(table, month) not in existing:
+            created.append(create_partition(connection, table, month, default_partition))
+    return created
+
+
+def drop_expired_partitions(
+    connection,
+    table: str,
+    retention_days: int,
+    detach_only: bool = False,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """Detach, and unless ``detach_only`` drop, partitions whose whole month is past retention.
+
+    Detached partitions keep their name as standalone tables so they can be
+    archived and dropped by hand.
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+
+    expired = []
+    for name in list_partitions(connection, table):
+        month = partition_month(name)
+        if month is None:
+            continue
+        upper = datetime.combine(add_months(month, 1), datetime.min.time(), tzinfo=timezone.utc)
+        if upper > cutoff:
+            continue
+        connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        if not detach_only:
+            connection.execute(text(f"DROP TABLE {name}"))
+        expired.append(name)
+    return expired
@@ -0,0 +1,67 @@
+"""Keeps the response cache warm for the categories with the most traffic.
+
+Every ``interval`` seconds the busiest categories of the last ``window``
+seconds, according to ``access_log_rollup``, have their cache entries
+rebuilt if the current version is not cached yet. After a write bumps a
+hot category's version, its next reader usually finds the page already
+cached. Redis or database errors are logged and retried on the next run.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.config import AsyncSessionLocal
+from app.services.metrics import registry as metrics
+from app.services.traffic import hot_categories_query
+
+logger = logging.getLogger(__name__)
+
+
+class CachePrewarmer:
+    def __init__(
+        self,
+        warm_category: Callable[[AsyncSession, int], Awaitable[bool]],
+        interval: float,
+        categories: int,
+        window: int,
+    ):
+        self.warm_category = warm_category
+        self.interval = interval
+        self.categories = categories
+        self.window = window
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        since = datetime.now(timezone.utc) - timedelta(seconds=self.window)
+        warmed = 0
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(hot_categories_query(since, self.categories))
+            for category_id in result.scalars().all():
+                if await self.warm_category(db, category_id):
+                    warmed += 1
+        metrics.incr("response_cache_prewarmed_total", warmed)
+        return warmed
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Failed to prewarm the response cache")
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
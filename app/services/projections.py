@@ -0,0 +1,263 @@
+"""Maintenance of the ``review_latest`` and ``category_stats`` projections.
+
+``review_latest`` holds one row per ``review_id`` pointing at its current
+``ReviewHistory`` revision (latest ``created_at``, ties broken by ``id``).
+``category_stats`` keeps running star sums and counts over those current
+revisions. Both are refreshed inside the same transaction as every insert
+into ``review_history``; ``rebuild_latest`` and ``reconcile_category_stats``
+recompute them from scratch.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import Float, and_, cast, event, delete, false, func, insert, inspect, select, text, update
+from sqlalchemy.orm import Session
+
+from app.database.config import settings
+from app.database.dialects import upsert
+from app.models.models import CategoryStats, ReviewHistory, ReviewLatest
+from app.services.response_cache import mark_changed
+from app.services import revisions  # module import: revisions itself loads app.models, which loads this module
+
+_TRACKED_ATTRIBUTES = ("review_id", "category_id", "stars", "created_at")
+
+
+def latest_revisions_query(review_ids: Optional[Iterable[str]] = None):
+    ranked = select(
+        ReviewHistory.review_id,
+        ReviewHistory.id.label("review_history_id"),
+        ReviewHistory.category_id,
+        ReviewHistory.stars,
+        ReviewHistory.created_at,
+        func.row_number().over(
+            partition_by=ReviewHistory.review_id,
+            order_by=(ReviewHistory.created_at.desc(), ReviewHistory.id.desc()),
+        ).label("revision_rank"),
+    )
+    if review_ids is not None:
+        ranked = ranked.where(ReviewHistory.review_id.in_(review_ids))
+    ranked = ranked.subquery()
+
+    return select(
+        ranked.c.review_id,
+        ranked.c.review_history_id,
+        ranked.c.category_id,
+        ranked.c.stars,
+        ranked.c.created_at,
+    ).where(ranked.c.revision_rank == 1)
+
+
+def latest_revision_join():
+    """Join condition from ``review_latest`` to its ``review_history`` row.
+
+    Matching ``created_at`` as well as the id lets PostgreSQL prune the
+    monthly ``review_history`` partitions instead of probing every one.
+    """
+    return and_(
+        ReviewHistory.id == ReviewLatest.review_history_id,
+        ReviewHistory.created_at == ReviewLatest.created_at,
+    )
+
+
+def _lock_latest(connection, review_ids: Iterable[str]) -> Dict[str, tuple]:
+    """``(category_id, stars)`` of the ``review_latest`` rows of ``review_ids``, locked FOR UPDATE.
+
+    SQLite ignores FOR UPDATE; its writers are serialized by the database lock.
+    """
+    rows = connection.execute(
+        select(ReviewLatest.review_id, ReviewLatest.category_id, ReviewLatest.stars)
+        .where(ReviewLatest.review_id.in_(sorted(review_ids)))
+        .order_by(ReviewLatest.review_id)
+        .with_for_update()
+    ).all()
+    return {review_id: (category_id, stars) for review_id, category_id, stars in rows}
+
+
+def sync_latest(connection, review_ids: Iterable[str]) -> Set[int]:
+    """Refresh the projections for ``review_ids`` and return the affected category ids."""
+    review_ids = sorted(set(review_ids))
+    if not review_ids:
+        return set()
+
+    # Lock the current rows until commit, so a concurrent sync of the same
+    # reviews cannot read the same previous values and apply its delta twice
+    previous = _lock_latest(connection, review_ids)
+    rows = connection.execute(latest_revisions_query(review_ids)).mappings().all()
+
+    missing = set(review_ids) - {row["review_id"] for row in rows}
+    if missing:
+        connection.execute(delete(ReviewLatest).where(ReviewLatest.review_id.in_(missing)))
+
+    inserted = set()
+    new_rows = [dict(row) for row in rows if row["review_id"] not in previous]
+    if new_rows:
+        # There was no row to lock for these. One that a concurrent transaction
+        # inserted meanwhile is skipped here and read, locked, as previous.
+        inserted = set(connection.execute(
+            upsert(connection, ReviewLatest.__table__).values(new_rows)
+            .on_conflict_do_nothing(index_elements=[ReviewLatest.review_id])
+            .returning(ReviewLatest.review_id)
+        ).scalars())
+        raced = {row["review_id"] for row in new_rows} - inserted
+        if raced:
+            previous.update(_lock_latest(connection, raced))
+            # The winner may have committed revisions newer than those read
+            # above; with its row locked, read their latest revision again
+            current = {row["review_id"]: row for row in connection.execute(latest_revisions_query(raced)).mappings()}
+            rows = [current.get(row["review_id"], row) for row in rows]
+
+    updated_rows = [dict(row) for row in rows if row["review_id"] not in inserted]
+    if updated_rows:
+        stmt = upsert(connection, ReviewLatest.__table__).values(updated_rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ReviewLatest.review_id],
+            set_={
+                "review_history_id": stmt.excluded.review_history_id,
+                "category_id": stmt.excluded.category_id,
+                "stars": stmt.excluded.stars,
+                "created_at": stmt.excluded.created_at,
+            },
+        )
+        connection.execute(stmt)
+
+    deltas = defaultdict(lambda: [0, 0])
+    for category_id, stars in previous.values():
+        deltas[category_id][0] -= stars
+        deltas[category_id][1] -= 1
+    for row in rows:
+        deltas[row["category_id"]][0] += row["stars"]
+        deltas[row["category_id"]][1] += 1
+    apply_category_deltas(connection, deltas)
+    return set(deltas)
+
+
+def apply_category_deltas(connection, deltas: Dict[int, List[int]]) -> None:
+    for category_id, (sum_delta, count_delta) in sorted(deltas.items()):
+        if not sum_delta and not count_delta:
+            continue
+        stmt = upsert(connection, CategoryStats.__table__).values(
+            category_id=category_id,
+            sum_stars=sum_delta,
+            review_count=count_delta,
+            average_stars=sum_delta / count_delta if count_delta > 0 else None,
+        )
+        sum_stars = CategoryStats.sum_stars + stmt.excluded.sum_stars
+        review_count = CategoryStats.review_count + stmt.excluded.review_count
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CategoryStats.category_id],
+            set_={
+                "sum_stars": sum_stars,
+                "review_count": review_count,
+                "average_stars": cast(sum_stars, Float) / func.nullif(review_count, 0),
+                "updated_at": func.now(),
+            },
+        )
+        connection.execute(stmt)
+
+
+def rebuild_latest(connection) -> int:
+    connection.execute(delete(ReviewLatest))
+    connection.execute(
+        insert(ReviewLatest).from_select(
+            ["review_id", "review_history_id", "category_id", "stars", "created_at"],
+            latest_revisions_query(),
+        )
+    )
+    return connection.execute(select(func.count()).select_from(ReviewLatest)).scalar()
+
+
+def _lock_category_stats(connection) -> None:
+    """Block writes to ``category_stats`` until the transaction ends.
+
+    PostgreSQL's SHARE ROW EXCLUSIVE conflicts with the ROW EXCLUSIVE lock of
+    ``sync_latest``'s upserts, and waits for writers that already hold it.
+    On SQLite an UPDATE that matches nothing takes the database's write
+    lock, which serializes all writers.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("LOCK TABLE category_stats IN SHARE ROW EXCLUSIVE MODE"))
+    else:
+        connection.execute(update(CategoryStats).where(false()).values(sum_stars=CategoryStats.sum_stars))
+
+
+def _expected_category_stats(connection) -> Dict[int, tuple]:
+    latest = latest_revisions_query().subquery()
+    return {
+        row.category_id: (int(row.sum_stars), row.review_count)
+        for row in connection.execute(
+            select(
+                latest.c.category_id,
+                func.sum(latest.c.stars).label("sum_stars"),
+                func.count().label("review_count"),
+            ).group_by(latest.c.category_id)
+        )
+    }
+
+
+def _actual_category_stats(connection) -> Dict[int, tuple]:
+    return {
+        row.category_id: (row.sum_stars, row.review_count)
+        for row in connection.execute(
+            select(CategoryStats.category_id, CategoryStats.sum_stars, CategoryStats.review_count)
+        )
+    }
+
+
+def reconcile_category_stats(connection) -> List[dict]:
+    """Recompute ``category_stats`` from ``review_history`` and return the drift found.
+
+    Writes to ``category_stats`` are locked out until the caller commits, so
+    a review committed between the two reads cannot be taken for drift and
+    subtracted again.
+    """
+    _lock_category_stats(connection)
+    expected = _expected_category_stats(connection)
+    actual = _actual_category_stats(connection)
+
+    drift = []
+    deltas = {}
+    for category_id in sorted(set(expected) | set(actual)):
+        expected_sum, expected_count = expected.get(category_id, (0, 0))
+        actual_sum, actual_count = actual.get(category_id, (0, 0))
+        if (expected_sum, expected_count) != (actual_sum, actual_count):
+            drift.append({
+                "category_id": category_id,
+                "expected_sum_stars": expected_sum,
+                "actual_sum_stars": actual_sum,
+                "expected_review_count": expected_count,
+                "actual_review_count": actual_count,
+            })
+            deltas[category_id] = [expected_sum - actual_sum, expected_count - actual_count]
+
+    apply_category_deltas(connection, deltas)
+    return drift
+
+
+def _touched_review_ids(session: Session):
+    review_ids = set()
+    for obj in session.new:
+        if isinstance(obj, ReviewHistory):
+            review_ids.add(obj.review_id)
+    for obj in session.deleted:
+        if isinstance(obj, ReviewHistory):
+            review_ids.add(obj.review_id)
+    for obj in session.dirty:
+        if not isinstance(obj, ReviewHistory):
+            continue
+        state = inspect(obj)
+        for name in _TRACKED_ATTRIBUTES:
+            history = state.attrs[name].history
+            if history.has_changes():
+                review_ids.add(obj.review_id)
+                if name == "review_id":
+                    review_ids.update(history.deleted)
+    return review_ids
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_latest_after_flush(session, flush_context):
+    review_ids = _touched_review_ids(session)
+    if review_ids:
+        mark_changed(session, sync_latest(session.connection(), review_ids))
+        if settings.review_history_delta_storage:
+            revisions.compact_revisions(session.connection(), review_ids)
@@ -0,0 +1,307 @@
+"""Versioned response cache for the read endpoints.
+
+Every category has a data-version counter in Redis, plus one counter for
+"any category" and one for the statistics, which also count reviews by
+analysis status. Writes bump the counters after their transaction commits;
+claiming reviews for analysis or marking them failed bumps only the
+statistics counter. On the event loop the bump runs as a task; writers
+whose clients read their own writes await it with ``wait_for_bumps``.
+Cache keys and ETags embed the version that was read *before* querying, so
+a bump makes every dependent entry unreachable without TTL guesswork. An
+``If-None-Match`` that matches the current ETag is answered with ``304``
+from Redis alone.
+An entry can also carry the ids of rows on it that still await analysis;
+they are handed back on every hit, so a cached page keeps triggering the
+analysis a freshly built one would.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import redis
+from fastapi import Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.database.config import get_async_redis, get_redis, settings
+from app.services.metrics import registry as metrics
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "response_cache"
+ALL_CATEGORIES = "all"
+# Any change to the reviews, or to their analysis status
+STATS = "stats"
+
+_CHANGED_CATEGORIES = "response_cache_changed_categories"
+_CHANGED_STATUS = "response_cache_changed_status"
+_SCHEDULED_BUMPS = "response_cache_scheduled_bumps"
+
+# Bumps scheduled from async commits, referenced until they finish
+_pending_bumps: Set[asyncio.Task] = set()
+
+# (body, cost in seconds, ids of rows awaiting analysis)
+Entry = Tuple[bytes, float, Tuple[int, ...]]
+
+
+def version_key(scope) -> str:
+    return f"{KEY_PREFIX}:version:{scope}"
+
+
+def _bump_pipeline(client, category_ids: Set[int]):
+    pipe = client.pipeline(transaction=False)
+    if category_ids:
+        for category_id in sorted(category_ids):
+            pipe.incr(version_key(category_id))
+        pipe.incr(version_key(ALL_CATEGORIES))
+    pipe.incr(version_key(STATS))
+    return pipe
+
+
+def bump_versions(category_ids: Iterable[int], status_changed: bool = False) -> None:
+    """Bump the versions of ``category_ids``, or only the statistics' one for a change of analysis status."""
+    category_ids = set(category_ids)
+    if not (category_ids or status_changed) or not settings.response_cache_enabled:
+        return
+    try:
+        _bump_pipeline(get_redis(), category_ids).execute()
+    except redis.RedisError:
+        logger.warning("Could not bump response cache versions for categories %s", sorted(category_ids), exc_info=True)
+
+
+async def bump_versions_async(category_ids: Iterable[int], status_changed: bool = False) -> None:
+    category_ids = set(category_ids)
+    if not (category_ids or status_changed) or not settings.response_cache_enabled:
+        return
+    try:
+        await _bump_pipeline(get_async_redis(), category_ids).execute()
+    except redis.RedisError:
+        logger.warning("Could not bump response cache versions for categories %s", sorted(category_ids), exc_info=True)
+
+
+def mark_changed(session: Session, category_ids: Iterable[int]) -> None:
+    """Bump the versions of ``category_ids`` once ``session`` commits."""
+    session.info.setdefault(_CHANGED_CATEGORIES, set()).update(category_ids)
+
+
+def mark_status_changed(session: Session) -> None:
+    """Bump the statistics' version once ``session`` commits, for reviews claimed for analysis or marked failed."""
+    session.info[_CHANGED_STATUS] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session):
+    category_ids = session.info.pop(_CHANGED_CATEGORIES, None) or set()
+    status_changed = session.info.pop(_CHANGED_STATUS, False)
+    if not (category_ids or status_changed):
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Celery tasks and scripts
+        bump_versions(category_ids, status_changed)
+        return
+    # An AsyncSession commits on the event loop, which a sync Redis call would block
+    task = loop.create_task(bump_versions_async(category_ids, status_changed))
+    _pending_bumps.add(task)
+    task.add_done_callback(_pending_bumps.discard)
+    session.info.setdefault(_SCHEDULED_BUMPS, []).append(task)
+
+
+async def wait_for_bumps(session) -> None:
+    """Wait for the version bumps ``session``'s commits scheduled on the event loop.
+
+    Until they finish, a read can still be answered from the entries the
+    commits made stale.
+    """
+    tasks = session.info.pop(_SCHEDULED_BUMPS, None)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(_CHANGED_CATEGORIES, None)
+    session.info.pop(_CHANGED_STATUS, None)
+
+
+def cache_digest(name: str, params: Tuple, version: int) -> str:
+    return hashlib.sha1(repr((name, params, version)).encode()).hexdigest()[:20]
+
+
+def _encode_pending(pending: Iterable[int]) -> str:
+    return ",".join(str(review_id) for review_id in pending)
+
+
+def _decode_pending(value: Optional[bytes]) -> Tuple[int, ...]:
+    return tuple(int(review_id) for review_id in value.split(b",")) if value else ()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+class ResponseCache:
+    def __init__(self, ttl: int, local_size: int):
+        self.ttl = ttl
+        self.local_size = local_size
+        self._local: "OrderedDict[str, Entry]" = OrderedDict()
+
+    def _local_get(self, key: str) -> Optional[Entry]:
+        entry = self._local.get(key)
+        if entry is not None:
+            self._local.move_to_end(key)
+        return entry
+
+    def _local_set(self, key: str, entry: Entry) -> None:
+        if not self.local_size:
+            return
+        self._local[key] = entry
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    async def respond(
+        self,
+        name: str,
+        scope,
+        params: Tuple,
+        if_none_match: Optional[str],
+        compute: Callable[[], Awaitable],
+        claim: Optional[Callable[[List[int]], Awaitable[None]]] = None,
+    ) -> Response:
+        """Serve ``name(params)`` from cache, or build it with ``compute`` and store it.
+
+        With ``claim``, ``compute`` returns the body together with the ids of
+        the rows on it that await analysis. They are stored with the entry
+        and passed to ``claim`` on every read: misses, hits and ``304``s.
+        """
+        if not settings.response_cache_enabled:
+            return await self._uncached(compute, claim)
+
+        client = get_async_redis()
+        try:
+            version = int(await client.get(version_key(scope)) or 0)
+        except redis.RedisError:
+            logger.warning("Response cache unavailable; serving %s uncached", name, exc_info=True)
+            return await self._uncached(compute, claim)
+
+        digest = cache_digest(name, params, version)
+        etag = f'"{digest}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        key = f"{KEY_PREFIX}:{name}:{digest}"
+        if etag_matches(if_none_match, etag):
+            metrics.incr("response_cache_not_modified_total", route=name)
+            if claim is not None:
+                # A claim that timed out does not change the ETag, so a polling client must still renew it
+                entry, _ = await self._lookup(client, key)
+                if entry is not None and entry[2]:
+                    await claim(list(entry[2]))
+            return Response(status_code=304, headers=headers)
+
+        entry, tier = await self._lookup(client, key)
+        if entry is not None:
+            body, cost, pending = entry
+            metrics.incr("response_cache_hits_total", route=name, tier=tier)
+            metrics.incr("response_cache_db_seconds_saved_total", cost, route=name)
+            # Claiming rows someone already claimed is a no-op UPDATE
+            if pending and claim is not None:
+                await claim(list(pending))
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        started = time.perf_counter()
+        body, pending = await self._compute(compute, claim is not None)
+        cost = time.perf_counter() - started
+        metrics.incr("response_cache_misses_total", route=name)
+        if pending:
+            await claim(list(pending))
+
+        entry = (body, cost, pending)
+        try:
+            await self._store(client, key, entry)
+        except redis.RedisError:
+            logger.warning("Could not store %s in the response cache", name, exc_info=True)
+        self._local_set(key, entry)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def _lookup(self, client, key: str) -> Tuple[Optional[Entry], str]:
+        """The entry stored under ``key``, from the local tier or Redis, and the tier it came from."""
+        entry = self._local_get(key)
+        if entry is not None:
+            return entry, "local"
+        try:
+            body, cost, pending = await client.hmget(key, "body", "cost", "pending")
+        except redis.RedisError:
+            return None, "redis"
+        if body is None:
+            return None, "redis"
+        entry = (body, float(cost), _decode_pending(pending))
+        self._local_set(key, entry)
+        return entry, "redis"
+
+    async def _uncached(self, compute, claim) -> Response:
+        body, pending = await self._compute(compute, claim is not None)
+        if pending:
+            await claim(list(pending))
+        return Response(content=body, media_type="application/json")
+
+    @staticmethod
+    async def _compute(compute: Callable[[], Awaitable], with_pending: bool) -> Tuple[bytes, Tuple[int, ...]]:
+        if not with_pending:
+            return await compute(), ()
+        body, pending = await compute()
+        return body, tuple(pending)
+
+    async def _store(self, client, key: str, entry: Entry) -> None:
+        body, cost, pending = entry
+        pipe = client.pipeline(transaction=False)
+        pipe.hset(key, mapping={"body": body, "cost": cost, "pending": _encode_pending(pending)})
+        pipe.expire(key, self.ttl)
+        await pipe.execute()
+
+    async def prewarm(
+        self,
+        name: str,
+        scope,
+        params: Tuple,
+        compute: Callable[[], Awaitable],
+        with_pending: bool = False,
+    ) -> bool:
+        """Build and store ``name(params)`` unless its current version is cached; returns whether it was built.
+
+        With ``with_pending``, ``compute`` returns the body and the ids of rows
+        awaiting analysis, as for ``respond(claim=...)``. They are stored for
+        the readers' hits to claim, not claimed here.
+        """
+        if not settings.response_cache_enabled:
+            return False
+
+        client = get_async_redis()
+        version = int(await client.get(version_key(scope)) or 0)
+        key = f"{KEY_PREFIX}:{name}:{cache_digest(name, params, version)}"
+        if await client.exists(key):
+            return False
+
+        started = time.perf_counter()
+        body, pending = await self._compute(compute, with_pending)
+        entry = (body, time.perf_counter() - started, pending)
+        await self._store(client, key, entry)
+        self._local_set(key, entry)
+        return True
+
+
+def hit_ratio(values: Dict[str, float]) -> Optional[float]:
+    hits = sum(value for key, value in values.items() if key.startswith("response_cache_hits_total"))
+    not_modified = sum(value for key, value in values.items() if key.startswith("response_cache_not_modified_total"))
+    misses = sum(value for key, value in values.items() if key.startswith("response_cache_misses_total"))
+    total = hits + not_modified + misses
+    return (hits + not_modified) / total if total else None
+
+
+response_cache = ResponseCache(ttl=settings.response_cache_ttl, local_size=settings.response_cache_local_size)
@@ -0,0 +1,156 @@
+"""Edit history of a review, and delta-encoded storage of superseded revisions.
+
+With ``REVIEW_HISTORY_DELTA_STORAGE=true``, once a review has a newer
+revision, ``compact_revisions`` replaces the ``text`` of each older one with
+``text_delta``: an edit script that rebuilds it from the text of the next
+newer revision, whose id is kept in ``text_delta_base_id``. The script lists
+ranges to copy from that text and literal strings to insert, as JSON, and is
+zlib-compressed when that makes it shorter. An edit that appends a few
+words then costs a few bytes instead of a full copy of the text. A revision
+whose script would not be shorter than its text keeps the text, and so does
+one whose next revision moved the review to another category. A revision
+still waiting for analysis keeps its text too, since analysis reads it;
+``compact_analyzed`` encodes it once the analysis is saved.
+
+The latest revision always keeps its full text, so pages, search and
+analysis never decode anything. ``reconstruct`` rebuilds the texts of a set
+of revisions that includes every revision their deltas are based on, such
+as all revisions of some reviews, or a review's newest ones.
+"""
+import json
+import zlib
+from difflib import SequenceMatcher
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, func, select, update
+
+from app.models.models import STATUS_COMPLETED, STATUS_FAILED, ReviewHistory
+
+RAW = b"j"
+COMPRESSED = b"z"
+
+HISTORY_COLUMNS = [
+    ReviewHistory.id,
+    ReviewHistory.review_id,
+    ReviewHistory.category_id,
+    ReviewHistory.text,
+    ReviewHistory.text_delta,
+    ReviewHistory.text_delta_base_id,
+    ReviewHistory.tone,
+    ReviewHistory.sentiment,
+    ReviewHistory.analysis_status,
+]
+
+
+def _awaiting_analysis(row) -> bool:
+    return (row.tone is None or row.sentiment is None) and row.analysis_status not in (STATUS_COMPLETED, STATUS_FAILED)
+
+
+def encode_delta(text: str, base: str) -> bytes:
+    """Edit script that turns ``base`` into ``text``."""
+    ops: List = []
+    for tag, base_start, base_end, start, end in SequenceMatcher(None, base, text, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append([base_start, base_end])
+        elif end > start:
+            ops.append(text[start:end])
+    raw = json.dumps(ops, separators=(",", ":"), ensure_ascii=False).encode()
+    compressed = zlib.compress(raw, 9)
+    return COMPRESSED + compressed if len(compressed) < len(raw) else RAW + raw
+
+
+def decode_delta(delta: bytes, base: str) -> str:
+    raw = zlib.decompress(delta[1:]) if delta[:1] == COMPRESSED else delta[1:]
+    return "".join(base[op[0]:op[1]] if isinstance(op, list) else op for op in json.loads(raw))
+
+
+def reconstruct(rows) -> Dict[int, Optional[str]]:
+    """Full text per revision id for rows with ``id``, ``text``, ``text_delta`` and ``text_delta_base_id``."""
+    by_id = {row.id: row for row in rows}
+    texts: Dict[int, Optional[str]] = {}
+    for row in rows:
+        chain = []
+        current = row
+        while current.id not in texts and current.text_delta is not None:
+            chain.append(current)
+            current = by_id[current.text_delta_base_id]
+        text = texts.get(current.id, current.text)
+        texts[current.id] = text
+        for revision in reversed(chain):
+            text = decode_delta(revision.text_delta, text)
+            texts[revision.id] = text
+    return texts
+
+
+def history_query(review_id: str, columns, limit: int):
+    """A review's revisions, newest first, with what ``reconstruct`` needs."""
+    return (
+        select(*columns, ReviewHistory.text_delta, ReviewHistory.text_delta_base_id)
+        .where(ReviewHistory.review_id == review_id)
+        .order_by(ReviewHistory.created_at.desc(), ReviewHistory.id.desc())
+        .limit(limit)
+    )
+
+
+def compact_revisions(connection, review_ids: Iterable[str]) -> int:
+    """Delta-encode every superseded revision of ``review_ids`` that still has its full text; returns how many."""
+    review_ids = sorted(set(review_ids))
+    if not review_ids:
+        return 0
+
+    rows = connection.execute(
+        select(*HISTORY_COLUMNS)
+        .where(ReviewHistory.review_id.in_(review_ids))
+        .order_by(ReviewHistory.review_id, ReviewHistory.created_at.desc(), ReviewHistory.id.desc())
+    ).all()
+
+    compacted = []
+    for _, revisions in groupby(rows, key=lambda row: row.review_id):
+        revisions = list(revisions)
+        if len(revisions) < 2:
+            continue
+        texts = reconstruct(revisions)
+        for newer, older in zip(revisions, revisions[1:]):
+            base = texts[newer.id]
+            if older.text_delta is not None or older.text is None or base is None:
+                continue
+            if _awaiting_analysis(older):
+                continue
+            if older.category_id != newer.category_id:
+                # A category's history export would not include the base
+                continue
+            delta = encode_delta(older.text, base)
+            if len(delta) < len(older.text.encode()):
+                compacted.append({"row_id": older.id, "delta": delta, "base_id": newer.id})
+
+    if compacted:
+        connection.execute(
+            update(ReviewHistory.__table__)
+            .where(ReviewHistory.__table__.c.id == bindparam("row_id"))
+            .values(text=None, text_delta=bindparam("delta"), text_delta_base_id=bindparam("base_id")),
+            compacted,
+        )
+    return len(compacted)
+
+
+def compact_analyzed(connection, review_history_ids: Iterable[int]) -> int:
+    """``compact_revisions`` for the reviews of revisions whose analysis was just saved."""
+    review_ids = connection.execute(
+        select(ReviewHistory.review_id).where(ReviewHistory.id.in_(list(review_history_ids))).distinct()
+    ).scalars().all()
+    return compact_revisions(connection, review_ids)
+
+
+def compact_all_revisions(connection, batch_size: int = 1000) -> int:
+    """Run ``compact_revisions`` over every review with more than one revision."""
+    review_ids = connection.execute(
+        select(ReviewHistory.review_id)
+        .group_by(ReviewHistory.review_id)
+        .having(func.count() > 1)
+        .order_by(ReviewHistory.review_id)
+    ).scalars().all()
+    return sum(
+        compact_revisions(connection, review_ids[start:start + batch_size])
+        for start in range(0, len(review_ids), batch_size)
+    )
@@ -0,0 +1,132 @@
+"""Daily per-category rollup of current review revisions.
+
+``category_daily_rollup`` holds, per category and UTC day of a review's
+current revision, the star sum and count, the star histogram and sentiment
+counts. Summing a window's rows therefore answers "last N days" questions
+without touching ``review_history``.
+
+``refresh_daily_rollup`` runs incrementally. It finds every revision whose
+``updated_at`` moved past the stored watermark, collects the days of all
+revisions of those reviews (an edit also changes the day its previous
+revision was counted on) and recomputes just those days. The watermark
+trails the current time by ``lag_seconds``, so transactions that committed
+late, with an earlier ``now()``, are still picked up on the next run.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Float, and_, cast, delete, desc, func, insert, or_, select
+
+from app.database.dialects import utc_date
+from app.models.models import Category, CategoryDailyRollup, ReviewHistory, ReviewLatest
+from app.services.analysis import chunked
+from app.services.checkpoints import load_checkpoint, save_checkpoint
+from app.services.projections import latest_revision_join
+from app.services.stats import STARS
+
+CHECKPOINT = "category_daily_rollup"
+DAYS_PER_STATEMENT = 100
+
+ROLLUP_COLUMNS = [
+    "category_id", "day", "sum_stars", "review_count",
+    *(f"stars_{stars}" for stars in STARS),
+    "positive_count", "neutral_count", "negative_count",
+]
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def day_ranges(days: Iterable[date]) -> List[Tuple[datetime, datetime]]:
+    """Merge ``days`` into half-open ``[start, end)`` timestamp ranges of consecutive days."""
+    ranges = []
+    for day in sorted(set(days)):
+        start, end = _day_start(day), _day_start(day + timedelta(days=1))
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def rollup_query(ranges: Optional[List[Tuple[datetime, datetime]]] = None):
+    day = utc_date(ReviewLatest.created_at)
+    count = func.count()
+    query = (
+        select(
+            ReviewLatest.category_id,
+            day.label("day"),
+            func.sum(ReviewLatest.stars).label("sum_stars"),
+            count.label("review_count"),
+            *(count.filter(ReviewLatest.stars == stars).label(f"stars_{stars}") for stars in STARS),
+            count.filter(ReviewHistory.sentiment == "Positive").label("positive_count"),
+            count.filter(ReviewHistory.sentiment == "Neutral").label("neutral_count"),
+            count.filter(ReviewHistory.sentiment == "Negative").label("negative_count"),
+        )
+        .join(ReviewHistory, latest_revision_join())
+        .group_by(ReviewLatest.category_id, day)
+    )
+    if ranges is not None:
+        query = query.where(or_(*(
+            and_(ReviewLatest.created_at >= start, ReviewLatest.created_at < end) for start, end in ranges
+        )))
+    return query
+
+
+def rebuild_daily_rollup(connection) -> Set[int]:
+    category_ids = set(connection.execute(select(CategoryDailyRollup.category_id).distinct()).scalars())
+    connection.execute(delete(CategoryDailyRollup))
+    connection.execute(insert(CategoryDailyRollup).from_select(ROLLUP_COLUMNS, rollup_query()))
+    category_ids.update(connection.execute(select(CategoryDailyRollup.category_id).distinct()).scalars())
+    return category_ids
+
+
+def refresh_daily_rollup(connection, lag_seconds: float) -> Tuple[Optional[int], Set[int]]:
+    """Bring the rollup up to date; returns the days recomputed (None for a full rebuild) and affected categories."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=lag_seconds)
+    checkpoint = load_checkpoint(connection, CHECKPOINT)
+
+    if checkpoint is None or checkpoint.watermark is None:
+        category_ids = rebuild_daily_rollup(connection)
+        save_checkpoint(connection, CHECKPOINT, watermark=cutoff)
+        return None, category_ids
+
+    touched = (
+        select(ReviewHistory.review_id)
+        .where(ReviewHistory.updated_at > checkpoint.watermark, ReviewHistory.updated_at <= cutoff)
+    )
+    changed = connection.execute(
+        select(utc_date(ReviewHistory.created_at), ReviewHistory.category_id)
+        .where(ReviewHistory.review_id.in_(touched))
+        .distinct()
+    ).all()
+    days = sorted({day for day, _ in changed})
+    category_ids = {category_id for _, category_id in changed}
+
+    for chunk in chunked(days, DAYS_PER_STATEMENT):
+        connection.execute(delete(CategoryDailyRollup).where(CategoryDailyRollup.day.in_(chunk)))
+        connection.execute(insert(CategoryDailyRollup).from_select(ROLLUP_COLUMNS, rollup_query(day_ranges(chunk))))
+
+    save_checkpoint(connection, CHECKPOINT, watermark=cutoff)
+    return len(days), category_ids
+
+
+def windowed_trends_query(start_day: date, limit: int):
+    review_count = func.sum(CategoryDailyRollup.review_count)
+    average_stars = cast(func.sum(CategoryDailyRollup.sum_stars), Float) / review_count
+    return (
+        select(
+            Category.id,
+            Category.name,
+            Category.description,
+            average_stars.label("average_stars"),
+            review_count.label("total_reviews"),
+        )
+        .join(CategoryDailyRollup, CategoryDailyRollup.category_id == Category.id)
+        .where(CategoryDailyRollup.day >= start_day)
+        .group_by(Category.id, Category.name, Category.description)
+        .having(review_count > 0)
+        .order_by(desc("average_stars"), Category.id)
+        .limit(limit)
+    )
@@ -0,0 +1,64 @@
+"""Full-text search over the latest revision of each review.
+
+On PostgreSQL ``q`` is parsed with ``websearch_to_tsquery``, so quoted
+phrases, ``or`` and ``-term`` work, and matches are ranked with
+``ts_rank``. The SQLite fallback matches every word of ``q`` through FTS5
+and ranks with bm25. Either way the index yields only the matching
+revisions, so the work grows with the number of matches rather than with
+the table. Results are ordered by rank, best first, then by id, and pages
+continue from a ``(rank, id)`` keyset.
+"""
+import re
+from typing import Optional, Tuple
+
+from sqlalchemy import column, desc, func, literal_column, select, table, tuple_
+
+from app.database.fulltext import FTS_TABLE, SEARCH_VECTOR, TEXT_SEARCH_CONFIG
+from app.models.models import ReviewHistory, ReviewLatest
+from app.services.projections import latest_revision_join
+
+_WORD = re.compile(r"\w+")
+
+
+def fts5_query(q: str) -> Optional[str]:
+    """Every word of ``q`` as a quoted FTS5 term, so operators and punctuation in ``q`` are not interpreted."""
+    terms = _WORD.findall(q)
+    return " ".join(f'"{term}"' for term in terms) if terms else None
+
+
+def search_query(
+    dialect: str,
+    q: str,
+    columns,
+    category_id: Optional[int] = None,
+    sentiment: Optional[str] = None,
+    cursor_key: Optional[Tuple[float, int]] = None,
+    limit: int = 15,
+):
+    """SELECT of ``columns`` and ``rank`` for matching latest revisions; None if ``q`` has no searchable words."""
+    if dialect == "postgresql":
+        tsquery = func.websearch_to_tsquery(literal_column(f"'{TEXT_SEARCH_CONFIG}'::regconfig"), q)
+        vector = literal_column(f"review_history.{SEARCH_VECTOR}")
+        rank = func.ts_rank(vector, tsquery)
+        query = select(*columns, rank.label("rank")).where(vector.op("@@")(tsquery))
+    else:
+        match = fts5_query(q)
+        if match is None:
+            return None
+        fts = table(FTS_TABLE, column("rowid"), column("rank"))
+        # FTS5's rank is bm25, where lower is better
+        rank = -fts.c.rank
+        query = (
+            select(*columns, rank.label("rank"))
+            .join(fts, fts.c.rowid == ReviewHistory.id)
+            .where(literal_column(FTS_TABLE).match(match))
+        )
+
+    query = query.join(ReviewLatest, latest_revision_join())
+    if category_id is not None:
+        query = query.where(ReviewLatest.category_id == category_id)
+    if sentiment is not None:
+        query = query.where(ReviewHistory.sentiment == sentiment)
+    if cursor_key is not None:
+        query = query.where(tuple_(rank, ReviewHistory.id) < tuple_(*cursor_key))
+    return query.order_by(desc(rank), desc(ReviewHistory.id)).limit(limit)
@@ -0,0 +1,113 @@
+"""Review statistics computed in two aggregate queries.
+
+One query groups ``review_history`` by category and computes every count
+with ``FILTER`` clauses in a single pass. The other applies the same
+aggregates to the whole table. Unique reviews and the average over current
+revisions come from the ``category_stats`` projection rather than a
+``COUNT(DISTINCT review_id)``, so a category's unique reviews are those
+whose current revision is in it. ``edits`` is the number of revisions
+beyond each review's first, not the number of edited reviews; per category
+it also counts revisions of reviews that have since moved elsewhere.
+"""
+from typing import Dict
+
+from sqlalchemy import Float, and_, cast, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.models import Category, CategoryStats, ReviewHistory
+from app.schemas.schemas import (
+    AnalysisBacklog,
+    CategoryReviewStats,
+    ReviewStats,
+    ReviewStatsResponse,
+    SentimentCounts,
+)
+from app.services.analysis import STATUS_FAILED, STATUS_PENDING
+
+STARS = range(1, 11)
+SENTIMENTS = ("Positive", "Neutral", "Negative")
+
+
+def _aggregates():
+    count = func.count(ReviewHistory.id)
+    unanalyzed = and_(
+        or_(ReviewHistory.tone.is_(None), ReviewHistory.sentiment.is_(None)),
+        ReviewHistory.text.isnot(None),
+        ReviewHistory.text != "",
+        ReviewHistory.analysis_status.is_(None),
+    )
+    return [
+        count.label("history_entries"),
+        func.avg(ReviewHistory.stars).label("average_stars"),
+        *(count.filter(ReviewHistory.stars == stars).label(f"stars_{stars}") for stars in STARS),
+        *(count.filter(ReviewHistory.sentiment == sentiment).label(f"sentiment_{sentiment.lower()}") for sentiment in SENTIMENTS),
+        count.filter(ReviewHistory.sentiment.is_(None)).label("sentiment_missing"),
+        count.filter(ReviewHistory.tone.is_(None)).label("tone_missing"),
+        count.filter(unanalyzed).label("unanalyzed"),
+        count.filter(ReviewHistory.analysis_status == STATUS_PENDING).label("pending"),
+        count.filter(ReviewHistory.analysis_status == STATUS_FAILED).label("failed"),
+    ]
+
+
+def category_stats_query():
+    return (
+        select(
+            Category.id,
+            Category.name,
+            Category.description,
+            func.coalesce(CategoryStats.review_count, 0).label("unique_reviews"),
+            CategoryStats.average_stars.label("current_average_stars"),
+            *_aggregates(),
+        )
+        .outerjoin(ReviewHistory, ReviewHistory.category_id == Category.id)
+        .outerjoin(CategoryStats, CategoryStats.category_id == Category.id)
+        .group_by(Category.id, Category.name, Category.description, CategoryStats.review_count, CategoryStats.average_stars)
+        .order_by(Category.id)
+    )
+
+
+def overall_stats_query():
+    unique_reviews = select(func.coalesce(func.sum(CategoryStats.review_count), 0)).scalar_subquery()
+    current_average_stars = select(
+        cast(func.sum(CategoryStats.sum_stars), Float) / func.nullif(func.sum(CategoryStats.review_count), 0)
+    ).scalar_subquery()
+    return select(
+        unique_reviews.label("unique_reviews"),
+        current_average_stars.label("current_average_stars"),
+        *_aggregates(),
+    ).select_from(ReviewHistory)
+
+
+def _review_stats(row) -> Dict:
+    sentiment_counts = {sentiment.lower(): getattr(row, f"sentiment_{sentiment.lower()}") for sentiment in SENTIMENTS}
+    history_entries = row.history_entries
+    unique_reviews = int(row.unique_reviews)
+    return {
+        "history_entries": history_entries,
+        "unique_reviews": unique_reviews,
+        "edits": max(history_entries - unique_reviews, 0),
+        "average_stars": float(row.average_stars) if row.average_stars is not None else None,
+        "current_average_stars": row.current_average_stars,
+        "star_histogram": {stars: getattr(row, f"stars_{stars}") for stars in STARS},
+        "sentiments": SentimentCounts(
+            **sentiment_counts,
+            missing=row.sentiment_missing,
+            other=history_entries - row.sentiment_missing - sum(sentiment_counts.values()),
+        ),
+        "analysis": AnalysisBacklog(
+            unanalyzed=row.unanalyzed,
+            pending=row.pending,
+            failed=row.failed,
+            missing_tone=row.tone_missing,
+            missing_sentiment=row.sentiment_missing,
+        ),
+    }
+
+
+def collect_stats(db: Session) -> ReviewStatsResponse:
+    categories = [
+        CategoryReviewStats(id=row.id, name=row.name, description=row.description, **_review_stats(row))
+        for row in db.execute(category_stats_query())
+    ]
+    overall = ReviewStats(**_review_stats(db.execute(overall_stats_query()).one()))
+    return ReviewStatsResponse(overall=overall, categories=categories)
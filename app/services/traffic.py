@@ -0,0 +1,127 @@
+"""Per-minute request counts aggregated from ``access_logs``.
+
+Access log entries are free text such as ``GET /reviews/?category_id=3``.
+They are parsed into an endpoint (method and path) and a category, and
+counted in ``access_log_rollup``, one row per minute, endpoint and category
+(``NO_CATEGORY`` when the request names none).
+
+``refresh_access_log_rollup`` runs incrementally from a ``created_at``
+watermark. The watermark trails the current time by ``lag_seconds``, so
+entries still waiting in an API process's buffer are counted on a later
+run. With ``ACCESS_LOG_STORE_RAW=false`` the buffer adds its entries to the
+rollup directly and no raw rows are written at all.
+"""
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from sqlalchemy import desc, func, select
+
+from app.database.dialects import upsert, utc_minute
+from app.models.models import AccessLog, AccessLogRollup, Category
+from app.services.analysis import chunked
+from app.services.checkpoints import load_checkpoint, save_checkpoint
+
+CHECKPOINT = "access_log_rollup"
+NO_CATEGORY = 0
+ROWS_PER_STATEMENT = 1000
+
+
+def parse_access_log(text: str) -> Tuple[str, Dict[str, str]]:
+    """Split an entry into its endpoint, e.g. ``GET /reviews/``, and query parameters."""
+    method, _, target = text.partition(" ")
+    parts = urlsplit(target)
+    return f"{method} {parts.path}", dict(parse_qsl(parts.query))
+
+
+def category_of(params: Dict[str, str]) -> int:
+    try:
+        return int(params.get("category_id", NO_CATEGORY))
+    except ValueError:
+        return NO_CATEGORY
+
+
+def minute_bucket(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(second=0, microsecond=0)
+
+
+def count_entries(entries: Iterable[Tuple[str, datetime, int]]) -> Counter:
+    """Count ``(text, created_at, count)`` entries per ``(bucket, endpoint, category_id)``."""
+    counts = Counter()
+    for text, created_at, count in entries:
+        endpoint, params = parse_access_log(text)
+        counts[(minute_bucket(created_at), endpoint, category_of(params))] += count
+    return counts
+
+
+def add_counts(connection, counts: Dict[Tuple[datetime, str, int], int]) -> None:
+    # Sorted so concurrent writers lock rows in the same order
+    rows = [
+        {"bucket": bucket, "endpoint": endpoint, "category_id": category_id, "count": count}
+        for (bucket, endpoint, category_id), count in sorted(counts.items())
+    ]
+    for chunk in chunked(rows, ROWS_PER_STATEMENT):
+        stmt = upsert(connection, AccessLogRollup.__table__).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AccessLogRollup.bucket, AccessLogRollup.endpoint, AccessLogRollup.category_id],
+            set_={"count": AccessLogRollup.count + stmt.excluded.count},
+        )
+        connection.execute(stmt)
+
+
+def refresh_access_log_rollup(connection, lag_seconds: float) -> int:
+    """Count the entries logged since the watermark into the rollup; returns how many there were."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=lag_seconds)
+    checkpoint = load_checkpoint(connection, CHECKPOINT)
+
+    # Grouping by the raw text first leaves only a handful of rows per minute to parse
+    minute = utc_minute(AccessLog.created_at)
+    query = (
+        select(AccessLog.text, minute, func.count())
+        .where(AccessLog.created_at <= cutoff)
+        .group_by(AccessLog.text, minute)
+    )
+    if checkpoint is not None and checkpoint.watermark is not None:
+        query = query.where(AccessLog.created_at > checkpoint.watermark)
+
+    counts = count_entries(connection.execute(query))
+    add_counts(connection, counts)
+    save_checkpoint(connection, CHECKPOINT, watermark=cutoff)
+    return sum(counts.values())
+
+
+def traffic_query(
+    start: datetime,
+    end: datetime,
+    endpoint: Optional[str] = None,
+    category_id: Optional[int] = None,
+    limit: int = 100,
+):
+    requests = func.sum(AccessLogRollup.count)
+    query = (
+        select(AccessLogRollup.endpoint, AccessLogRollup.category_id, requests.label("requests"))
+        .where(AccessLogRollup.bucket >= start, AccessLogRollup.bucket < end)
+        .group_by(AccessLogRollup.endpoint, AccessLogRollup.category_id)
+        .order_by(desc("requests"), AccessLogRollup.endpoint, AccessLogRollup.category_id)
+        .limit(limit)
+    )
+    if endpoint is not None:
+        query = query.where(AccessLogRollup.endpoint == endpoint)
+    if category_id is not None:
+        query = query.where(AccessLogRollup.category_id == category_id)
+    return query
+
+
+def hot_categories_query(since: datetime, limit: int):
+    requests = func.sum(AccessLogRollup.count)
+    return (
+        select(AccessLogRollup.category_id)
+        .join(Category, Category.id == AccessLogRollup.category_id)
+        .where(AccessLogRollup.bucket >= since)
+        .group_by(AccessLogRollup.category_id)
+        .order_by(desc(requests), AccessLogRollup.category_id)
+        .limit(limit)
+    )
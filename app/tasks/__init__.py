@@ -1,3 +1,3 @@
-from app.tasks.tasks import log_access, analyze_sentiment_and_tone
+from app.tasks.tasks import analyze_sentiment_and_tone, analyze_sentiment_batch, backfill_analysis, reconcile_category_stats, refresh_category_daily_rollup, refresh_access_log_rollup, maintain_partitions
 
-__all__ = ["log_access", "analyze_sentiment_and_tone"]
+__all__ = ["analyze_sentiment_and_tone", "analyze_sentiment_batch", "backfill_analysis", "reconcile_category_stats", "refresh_category_daily_rollup", "refresh_access_log_rollup", "maintain_partitions"]
@@ -1,16 +1,97 @@
-from app.celery_app import celery_app
+from app.celery_app import QUEUE_BULK, celery_app
 from app.database.config import SessionLocal
-from app.models.models import AccessLog, ReviewHistory
 from app.database.config import settings
-import anthropic
+from app.services import analysis, backfill, dispatcher, partitions, projections, response_cache, revisions, rollups, traffic
+from app.services.analysis_cache import get_analysis_cache
+from celery.utils.log import get_task_logger
+from typing import List
+
+logger = get_task_logger(__name__)
+
+
+def _analyze(db, reviews: List[analysis.ReviewInput], from_backfill: bool = False) -> List[int]:
+    """Analyze ``reviews`` concurrently through the dispatcher and save the results; returns the deferred ids."""
+    outcome = dispatcher.run(lambda llm: analysis.run_analysis_async(
+        llm,
+        reviews,
+        settings.analysis_batch_size,
+        cache=get_analysis_cache(llm.model),
+    ))
+
+    analysis.save_analysis(db, outcome.results)
+    if from_backfill:
+        backfill.record_saved(db.connection(), len(outcome.results))
+    if outcome.failed:
+        analysis.mark_failed(db, outcome.failed)
+    if settings.review_history_delta_storage:
+        # Superseded revisions keep their text until their analysis is saved
+        revisions.compact_analyzed(db.connection(), [*outcome.results, *outcome.failed])
+    db.commit()
+    return outcome.deferred
+
+
+def _retry_deferred(task, review_history_ids: List[int], args: list) -> None:
+    """Retry ``task`` for reviews the LLM was unavailable for, or mark them failed once retries run out."""
+    if task.request.retries < task.max_retries:
+        # Spaced so the circuit breaker has half-opened by the time the retry runs
+        raise task.retry(args=args, countdown=settings.llm_circuit_reset_timeout * (task.request.retries + 1))
+
+    db = SessionLocal()
+    try:
+        analysis.mark_failed(db, review_history_ids)
+        db.commit()
+    finally:
+        db.close()
+
+
+@celery_app.task(bind=True, max_retries=settings.analysis_task_max_retries)
+def analyze_sentiment_and_tone(self, review_history_id: int, text: str, stars: int):
+    db = SessionLocal()
+    try:
+        deferred = _analyze(db, [analysis.ReviewInput(review_history_id, text, stars)])
+
+    except Exception as e:
+        db.rollback()
+        analysis.mark_failed(db, [review_history_id])
+        db.commit()
+        raise e
+    finally:
+        db.close()
+
+    if deferred:
+        _retry_deferred(self, deferred, [review_history_id, text, stars])
+
+
+@celery_app.task(bind=True, max_retries=settings.analysis_task_max_retries)
+def analyze_sentiment_batch(self, review_history_ids: List[int], from_backfill: bool = False):
+    db = SessionLocal()
+    try:
+        deferred = _analyze(db, analysis.load_review_inputs(db, review_history_ids), from_backfill)
+
+    except Exception as e:
+        db.rollback()
+        analysis.mark_failed(db, review_history_ids)
+        db.commit()
+        raise e
+    finally:
+        db.close()
+
+    if deferred:
+        _retry_deferred(self, deferred, [deferred])
 
 
 @celery_app.task
-def log_access(endpoint: str):
+def backfill_analysis():
     db = SessionLocal()
     try:
-        access_log = AccessLog(text=endpoint)
-        db.add(access_log)
+        progress = backfill.run_backfill(
+            db.connection(),
+            settings.backfill_rows_per_minute,
+            settings.backfill_chunk_size,
+            settings.analysis_pending_timeout,
+        )
+        if progress.claimed:
+            response_cache.mark_status_changed(db)
         db.commit()
     except Exception as e:
         db.rollback()
@@ -18,48 +99,101 @@ def log_access(endpoint: str):
     finally:
         db.close()
 
+    for batch in analysis.chunked(progress.claimed, settings.analysis_batch_size):
+        analyze_sentiment_batch.apply_async(args=[list(batch)], kwargs={"from_backfill": True}, queue=QUEUE_BULK)
+
+    logger.info(
+        "Analysis backfill enqueued %d rows up to id %d; backlog %d, %s rows/s, ETA %s s",
+        len(progress.claimed), progress.position, progress.backlog, progress.rows_per_second, progress.eta_seconds,
+    )
+    return {
+        "enqueued": len(progress.claimed),
+        "position": progress.position,
+        "backlog": progress.backlog,
+        "rows_per_second": progress.rows_per_second,
+        "eta_seconds": progress.eta_seconds,
+    }
+
 
 @celery_app.task
-def analyze_sentiment_and_tone(review_history_id: int, text: str, stars: int):
+def reconcile_category_stats():
     db = SessionLocal()
     try:
-        client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+        drift = projections.reconcile_category_stats(db.connection())
+        response_cache.mark_changed(db, (entry["category_id"] for entry in drift))
+        db.commit()
+
+        for entry in drift:
+            logger.warning("category_stats drift corrected: %s", entry)
+        return drift
 
-        prompt = f"""Analyze the following review and provide both the tone and sentiment.
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
 
-Review Text: "{text}"
-Star Rating: {stars}/10
 
-Please respond in the following exact format:
-Tone: [one word describing the tone, e.g., Professional, Casual, Enthusiastic, Disappointed, Angry, Happy, Neutral]
-Sentiment: [one word: Positive, Negative, or Neutral]
+@celery_app.task
+def refresh_category_daily_rollup():
+    db = SessionLocal()
+    try:
+        days, category_ids = rollups.refresh_daily_rollup(db.connection(), settings.rollup_watermark_lag)
+        response_cache.mark_changed(db, category_ids)
+        db.commit()
 
-Keep your response concise with just these two lines."""
+        if days is None:
+            logger.info("Rebuilt category_daily_rollup for %d categories", len(category_ids))
+        elif days:
+            logger.info("Refreshed category_daily_rollup for %d days in %d categories", days, len(category_ids))
+        return days
 
-        message = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=100,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+
+@celery_app.task
+def refresh_access_log_rollup():
+    db = SessionLocal()
+    try:
+        counted = traffic.refresh_access_log_rollup(db.connection(), settings.access_log_rollup_lag)
+        db.commit()
+        return counted
+
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
 
-        response_text = message.content[0].text
 
-        tone = None
-        sentiment = None
+@celery_app.task
+def maintain_partitions():
+    db = SessionLocal()
+    try:
+        connection = db.connection()
+        result = {"created": [], "expired": []}
+        for table in partitions.PARTITIONED_TABLES:
+            if partitions.is_partitioned(connection, table):
+                result["created"] += partitions.ensure_partitions(connection, table, settings.partition_premake_months)
 
-        for line in response_text.strip().split('\n'):
-            if line.startswith('Tone:'):
-                tone = line.split(':', 1)[1].strip()
-            elif line.startswith('Sentiment:'):
-                sentiment = line.split(':', 1)[1].strip()
+        if settings.access_log_retention_days is not None and partitions.is_partitioned(connection, "access_logs"):
+            result["expired"] = partitions.drop_expired_partitions(
+                connection,
+                "access_logs",
+                settings.access_log_retention_days,
+                detach_only=settings.access_log_retention_detach_only,
+            )
+        db.commit()
 
-        review = db.query(ReviewHistory).filter(ReviewHistory.id == review_history_id).first()
-        if review:
-            review.tone = tone
-            review.sentiment = sentiment
-            db.commit()
+        for name in result["created"]:
+            logger.info("Created partition %s", name)
+        for name in result["expired"]:
+            logger.info("%s expired partition %s", "Detached" if settings.access_log_retention_detach_only else "Dropped", name)
+        return result
 
     except Exception as e:
         db.rollback()
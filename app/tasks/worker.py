@@ -0,0 +1,92 @@
+"""Per-process resource setup and teardown for Celery workers.
+
+Prefork children must not share the parent's database connections, so each
+child disposes the inherited pool and builds its own, sized by the
+``worker_db_*`` settings. The analysis dispatcher, with its async LLM
+client and event loop thread, is created once per child and shared by
+every task. Task runtime, queue wait (from the ``enqueued_at`` header
+stamped at publish time), failures and retries are recorded per task name.
+Pool and task metrics are published to Redis so the API's ``/metrics`` can
+export them.
+"""
+import logging
+import os
+import socket
+import time
+
+import redis
+from celery.signals import (
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_retry,
+    worker_process_init,
+    worker_process_shutdown,
+)
+
+from app.database import config
+from app.database.config import get_redis, settings
+from app.database.pool import record_pool_gauges
+from app.services import metrics
+from app.services.dispatcher import close_dispatcher, reset_dispatcher
+
+logger = logging.getLogger(__name__)
+
+_last_published = 0.0
+_task_started = {}
+
+
+def publish_metrics(force: bool = False) -> None:
+    global _last_published
+    now = time.monotonic()
+    if not force and now - _last_published < settings.metrics_publish_interval:
+        return
+    _last_published = now
+
+    record_pool_gauges(config.engine)
+    process = f"worker:{socket.gethostname()}:{os.getpid()}"
+    try:
+        metrics.publish(get_redis(), process, metrics.registry.snapshot(), settings.metrics_publish_ttl)
+    except redis.RedisError:
+        logger.warning("Could not publish worker metrics", exc_info=True)
+
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    config.reconfigure_engine("worker", settings.worker_db_pool_size, settings.worker_db_max_overflow)
+    reset_dispatcher()
+
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    publish_metrics(force=True)
+    close_dispatcher()
+    config.engine.dispose()
+
+
+@task_prerun.connect
+def record_task_start(task_id=None, task=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+    enqueued_at = getattr(task.request, "enqueued_at", None)
+    if enqueued_at is not None:
+        metrics.registry.observe("celery_task_queue_wait_seconds", max(0.0, time.time() - enqueued_at), task=task.name)
+
+
+@task_postrun.connect
+def publish_after_task(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        metrics.registry.observe(
+            "celery_task_duration_seconds", time.perf_counter() - started, task=task.name, state=state,
+        )
+    publish_metrics()
+
+
+@task_failure.connect
+def record_task_failure(sender=None, exception=None, **kwargs):
+    metrics.registry.incr("celery_task_failures_total", task=sender.name, exception=type(exception).__name__)
+
+
+@task_retry.connect
+def record_task_retry(sender=None, **kwargs):
+    metrics.registry.incr("celery_task_retries_total", task=sender.name)
@@ -0,0 +1,78 @@
+"""LLM call count and throughput of batched vs per-review analysis.
+
+Runs ``run_analysis_async`` over synthetic reviews against the fake LLM
+client, with a simulated per-call latency, for several batch sizes. The
+dispatcher runs one call at a time by default, so the numbers show what
+batching alone saves; see benchmarks.dispatcher for concurrency:
+
+    python -m benchmarks.analysis_batching --reviews 1000 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from app.services.analysis import ReviewInput, run_analysis_async
+from app.services.dispatcher import AnalysisDispatcher, CircuitBreaker
+from app.services.llm import FakeLLMClient
+
+TEXTS = [
+    "Excellent product! Highly recommend.",
+    "Average product, nothing special.",
+    "Broke after a week of use.",
+    "Works as described.",
+    "Waste of money.",
+]
+
+
+async def run(reviews, batch_size, latency, concurrency):
+    client = FakeLLMClient(latency=latency)
+    dispatcher = AnalysisDispatcher(
+        client,
+        concurrency=concurrency,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        max_retries=0,
+        retry_base_delay=0.0,
+        retry_max_delay=0.0,
+        breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.0),
+    )
+
+    started = time.perf_counter()
+    outcome = await run_analysis_async(dispatcher, reviews, batch_size)
+    elapsed = time.perf_counter() - started
+    analyzed = len(outcome.results)
+    return {
+        "batch_size": batch_size,
+        "reviews": analyzed,
+        "llm_calls": client.calls,
+        "calls_per_1000_reviews": round(client.calls * 1000 / len(reviews), 1),
+        "reviews_per_sec": round(analyzed / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per LLM call")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 5, 10, 20, 50])
+    parser.add_argument("--concurrency", type=int, default=1, help="LLM calls in flight at once")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Distinct texts, so identical content is not collapsed into one analysis
+    reviews = [
+        ReviewInput(id=i + 1, text=f"{rng.choice(TEXTS)} (#{i + 1})", stars=rng.randint(1, 10))
+        for i in range(args.reviews)
+    ]
+    results = [
+        asyncio.run(run(reviews, batch_size, args.latency, args.concurrency))
+        for batch_size in args.batch_sizes
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
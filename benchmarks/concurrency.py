@@ -0,0 +1,88 @@
+"""Concurrency benchmark for a running API server.
+
+Drives /reviews/trends and /reviews/?category_id= with many concurrent
+clients and reports requests/sec and latency percentiles. Run it once
+against a server started with API_ASYNC_DB=false (queries on the sync
+engine) and once with the default async engine to compare:
+
+    API_ASYNC_DB=false uvicorn app.main:app --port 8000
+    python -m benchmarks.concurrency --base-url http://localhost:8000 --concurrency 64
+
+Against a database on the same host the async engine has no network wait
+to overlap; run the API through benchmarks.delay_proxy to add one. The
+README lists results for both.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def worker(client, paths, deadline, latencies, errors):
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            errors.append(path)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(base_url, concurrency, duration, category_ids):
+    paths = ["/reviews/trends"] + [f"/reviews/?category_id={cid}" for cid in category_ids]
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(client, paths, deadline, latencies, errors) for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds to run")
+    parser.add_argument("--category-ids", type=int, nargs="+", default=[1, 2, 3, 4, 5, 6])
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.base_url, args.concurrency, args.duration, args.category_ids))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Analysis throughput of the async dispatcher at several concurrency levels.
+
+Analyzes synthetic reviews with ``run_analysis_async`` against the fake
+LLM client, which sleeps ``--latency`` seconds per call and can fail a
+fraction of calls with 429 or 503. Throughput should grow roughly linearly
+with concurrency until the request or token limits bind:
+
+    python -m benchmarks.dispatcher --reviews 2000 --latency 0.05 --concurrency 1 4 16 64
+    python -m benchmarks.dispatcher --failure-rate 0.2 --requests-per-minute 6000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from app.services.analysis import ReviewInput, run_analysis_async
+from app.services.dispatcher import AnalysisDispatcher, CircuitBreaker
+from app.services.llm import FakeLLMClient
+
+TEXTS = [
+    "Excellent product! Highly recommend.",
+    "Average product, nothing special.",
+    "Broke after a week of use.",
+    "Works as described.",
+    "Waste of money.",
+]
+
+
+async def run(reviews, concurrency, args):
+    client = FakeLLMClient(latency=args.latency, failure_rate=args.failure_rate, seed=args.seed)
+    dispatcher = AnalysisDispatcher(
+        client,
+        concurrency=concurrency,
+        requests_per_minute=args.requests_per_minute,
+        tokens_per_minute=args.tokens_per_minute,
+        max_retries=args.max_retries,
+        retry_base_delay=args.retry_base_delay,
+        retry_max_delay=args.retry_base_delay * 10,
+        breaker=CircuitBreaker(args.circuit_failure_threshold, args.circuit_reset_timeout),
+    )
+
+    started = time.perf_counter()
+    outcome = await run_analysis_async(dispatcher, reviews, args.batch_size)
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "analyzed": len(outcome.results),
+        "deferred": len(outcome.deferred),
+        "failed": len(outcome.failed),
+        "llm_calls": client.calls,
+        "injected_failures": client.failures,
+        "seconds": round(elapsed, 3),
+        "reviews_per_sec": round(len(outcome.results) / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per LLM call")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of calls failing with 429 or 503")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--requests-per-minute", type=float, help="Request limit; none by default")
+    parser.add_argument("--tokens-per-minute", type=float, help="Token limit; none by default")
+    parser.add_argument("--max-retries", type=int, default=4)
+    parser.add_argument("--retry-base-delay", type=float, default=0.01)
+    parser.add_argument("--circuit-failure-threshold", type=int, default=20)
+    parser.add_argument("--circuit-reset-timeout", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Distinct texts, so identical content is not collapsed into one analysis
+    reviews = [
+        ReviewInput(id=i + 1, text=f"{rng.choice(TEXTS)} (#{i + 1})", stars=rng.randint(1, 10))
+        for i in range(args.reviews)
+    ]
+
+    results = [asyncio.run(run(reviews, concurrency, args)) for concurrency in args.concurrency]
+    for result in results:
+        result["speedup"] = round(result["reviews_per_sec"] / results[0]["reviews_per_sec"], 1) if results[0]["reviews_per_sec"] else None
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
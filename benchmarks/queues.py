@@ -0,0 +1,211 @@
+"""Interactive analysis and maintenance latency while a backfill is queued.
+
+Starts real Celery workers against a Redis broker and a fresh database of
+unanalyzed reviews, using the fake LLM client with ``--latency`` seconds
+per call. Each run queues a backfill of ``--backfill-reviews`` reviews in
+analysis batches. It then enqueues one page of analysis every ``--interval`` seconds, the way
+``GET /reviews/`` does, and records the time from publishing each page to
+its result. With each page it also enqueues ``refresh_access_log_rollup``,
+a short maintenance task, and records its latency the same way. Two
+topologies are compared:
+
+- ``single``: every task on one queue, consumed by a single worker with all
+  pools' processes and Celery's default prefetch, as before the queues were split
+- ``routed``: the queues and pools of ``app.celery_app.WORKER_POOLS``,
+  started like run_workers.py
+
+    python -m benchmarks.queues --redis-url redis://localhost:6379/15
+    python -m benchmarks.queues --backfill-reviews 40000 --latency 0.1 --topologies routed
+
+The Redis database is flushed before each run, so --redis-url must point at
+one used only for benchmarking. With many worker processes SQLite can
+report "database is locked"; pass a PostgreSQL --database-url for larger
+runs.
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.concurrency import percentile
+from benchmarks.endpoints import DATA_DIR, configure_environment
+
+SINGLE_QUEUE = "celery"
+# Celery's default prefetch multiplier
+SINGLE_PREFETCH_MULTIPLIER = 4
+
+
+def reset_database(reviews):
+    from sqlalchemy import insert
+
+    from app.database.config import Base, engine
+    from app.models import Category, ReviewHistory
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    created_at = datetime.now(timezone.utc) - timedelta(days=1)
+    with engine.begin() as conn:
+        category_id = conn.execute(
+            insert(Category).values(name="Benchmark", description="Queue benchmark").returning(Category.id)
+        ).scalar_one()
+        # Distinct texts, so no two reviews in a task share one analysis
+        conn.execute(insert(ReviewHistory), [
+            {
+                "text": f"Works as described, mostly. (#{i})",
+                "stars": i % 10 + 1,
+                "review_id": str(i),
+                "category_id": category_id,
+                "created_at": created_at,
+            }
+            for i in range(1, reviews + 1)
+        ])
+    return list(range(1, reviews + 1))
+
+
+def worker_commands(topology, loglevel):
+    from app.celery_app import WORKER_POOLS
+    from run_workers import worker_command
+
+    if topology == "routed":
+        return [worker_command(pool, loglevel=loglevel) for pool in WORKER_POOLS]
+    return [[
+        sys.executable, "-m", "celery", "-A", "app.celery_app", "worker",
+        "--hostname", "single@%h",
+        "--queues", SINGLE_QUEUE,
+        "--concurrency", str(sum(pool["concurrency"] for pool in WORKER_POOLS.values())),
+        "--prefetch-multiplier", str(SINGLE_PREFETCH_MULTIPLIER),
+        "--loglevel", loglevel,
+    ]]
+
+
+def wait_for_workers(count, timeout=60):
+    from app.celery_app import celery_app
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if len(celery_app.control.ping(timeout=1.0)) >= count:
+            return
+    raise RuntimeError(f"{count} workers did not start within {timeout}s")
+
+
+def finished_at(result):
+    done = result.date_done
+    if isinstance(done, str):
+        done = datetime.fromisoformat(done)
+    if done.tzinfo is None:
+        done = done.replace(tzinfo=timezone.utc)
+    return done.timestamp()
+
+
+def wait_for(results, timeout):
+    deadline = time.monotonic() + timeout
+    while not all(result.ready() for result in results):
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Tasks did not finish within {timeout}s")
+        time.sleep(0.2)
+    failed = [result for result in results if result.failed()]
+    if failed:
+        raise RuntimeError(f"{len(failed)} tasks failed, e.g.: {failed[0].result!r}")
+
+
+def run(topology, args):
+    import redis
+
+    from app.celery_app import QUEUE_BULK, QUEUE_INTERACTIVE, QUEUE_MAINTENANCE
+    from app.database.config import settings
+    from app.services.analysis import chunked
+    from app.tasks.tasks import analyze_sentiment_batch, refresh_access_log_rollup
+
+    queues = {
+        name: SINGLE_QUEUE if topology == "single" else name
+        for name in (QUEUE_INTERACTIVE, QUEUE_BULK, QUEUE_MAINTENANCE)
+    }
+    ids = reset_database(args.backfill_reviews + args.pages * args.page_size)
+    backfill_ids, page_ids = ids[:args.backfill_reviews], ids[args.backfill_reviews:]
+    redis.Redis.from_url(args.redis_url).flushdb()
+
+    commands = worker_commands(topology, args.loglevel)
+    workers = [subprocess.Popen(command) for command in commands]
+    try:
+        wait_for_workers(len(commands))
+
+        started = time.time()
+        backfill = [
+            analyze_sentiment_batch.apply_async(args=[list(batch)], queue=queues[QUEUE_BULK])
+            for batch in chunked(backfill_ids, settings.analysis_batch_size)
+        ]
+
+        pages, maintenance = [], []
+        for batch in chunked(page_ids, args.page_size):
+            pages.append((time.time(), analyze_sentiment_batch.apply_async(args=[list(batch)], queue=queues[QUEUE_INTERACTIVE])))
+            maintenance.append((time.time(), refresh_access_log_rollup.apply_async(queue=queues[QUEUE_MAINTENANCE])))
+            time.sleep(args.interval)
+
+        wait_for([result for _, result in pages + maintenance] + backfill, args.timeout)
+        latencies = [finished_at(result) - published for published, result in pages]
+        maintenance_latencies = [finished_at(result) - published for published, result in maintenance]
+        backfill_seconds = max(finished_at(result) for result in backfill) - started
+        return {
+            "topology": topology,
+            "workers": len(commands),
+            "interactive_latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 1),
+                "p95": round(percentile(latencies, 95) * 1000, 1),
+                "max": round(max(latencies) * 1000, 1),
+            },
+            "maintenance_latency_ms": {
+                "p50": round(percentile(maintenance_latencies, 50) * 1000, 1),
+                "p95": round(percentile(maintenance_latencies, 95) * 1000, 1),
+                "max": round(max(maintenance_latencies) * 1000, 1),
+            },
+            "backfill_seconds": round(backfill_seconds, 2),
+            "backfill_reviews_per_sec": round(args.backfill_reviews / backfill_seconds, 1),
+        }
+    finally:
+        for worker in workers:
+            worker.send_signal(signal.SIGTERM)
+        for worker in workers:
+            worker.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15", help="Broker and result backend")
+    parser.add_argument("--database-url", default=f"sqlite:///{os.path.join(DATA_DIR, 'queues.db')}")
+    parser.add_argument("--topologies", nargs="+", choices=["single", "routed"], default=["single", "routed"])
+    parser.add_argument("--backfill-reviews", type=int, default=20000)
+    parser.add_argument("--pages", type=int, default=40, help="Interactive analysis tasks")
+    parser.add_argument("--page-size", type=int, default=15)
+    parser.add_argument("--interval", type=float, default=0.25, help="Seconds between interactive tasks")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per LLM call")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--loglevel", default="warning")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(DATA_DIR), "results", "queues.json"))
+    args = parser.parse_args()
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    configure_environment(args.database_url)
+    # Inherited by the worker processes
+    os.environ["REDIS_URL"] = args.redis_url
+    os.environ["FAKE_LLM_LATENCY"] = str(args.latency)
+    os.environ["LLM_REQUESTS_PER_MINUTE"] = ""
+    os.environ["LLM_TOKENS_PER_MINUTE"] = ""
+
+    results = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "runs": [run(topology, args) for topology in args.topologies],
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Generate large, reproducible review datasets for load tests and benchmarks.
+
+Reviews are spread over ``--categories`` categories and written in batches
+of ``--batch-size`` rows, with ``COPY`` on PostgreSQL and executemany
+INSERTs elsewhere. A review's edits are further revisions under the same
+``review_id``. Timestamps are relative to ``--end``, not to the current
+time, so the same arguments and ``--seed`` always produce the same rows.
+The projections are rebuilt once at the end rather than per batch.
+
+    python generate_data.py --reviews 1000000 --edit-rate 0.3 --seed 7
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from sqlalchemy import insert, select
+
+from app.database.config import SessionLocal, settings
+from app.models.models import Category, ReviewHistory
+from app.services.analysis import STATUS_COMPLETED
+from app.services.projections import rebuild_latest, reconcile_category_stats
+from app.services.response_cache import mark_changed
+from app.services.revisions import compact_all_revisions
+from seed_data import (
+    CATEGORIES,
+    NEGATIVE_REVIEWS,
+    NEGATIVE_TONES,
+    NEUTRAL_REVIEWS,
+    NEUTRAL_TONES,
+    POSITIVE_REVIEWS,
+    POSITIVE_TONES,
+)
+
+COLUMNS = ("text", "stars", "review_id", "category_id", "tone", "sentiment", "analysis_status", "created_at")
+
+SENTIMENTS = {
+    "Positive": (POSITIVE_REVIEWS, POSITIVE_TONES),
+    "Neutral": (NEUTRAL_REVIEWS, NEUTRAL_TONES),
+    "Negative": (NEGATIVE_REVIEWS, NEGATIVE_TONES),
+}
+
+# Roughly J-shaped, like most public review datasets
+DEFAULT_STAR_WEIGHTS = "4,2,2,3,4,5,8,14,20,38"
+
+
+def sentiment_for(stars: int) -> str:
+    if stars >= 8:
+        return "Positive"
+    if stars >= 5:
+        return "Neutral"
+    return "Negative"
+
+
+def category_names(count: int):
+    names = [cat["name"] for cat in CATEGORIES[:count]]
+    names.extend(f"Category {i + 1}" for i in range(len(names), count))
+    return names
+
+
+def ensure_categories(db, count: int):
+    names = category_names(count)
+    existing = {name: category_id for category_id, name in db.query(Category.id, Category.name)}
+    descriptions = {cat["name"]: cat["description"] for cat in CATEGORIES}
+    missing = [name for name in names if name not in existing]
+    if missing:
+        db.add_all(Category(name=name, description=descriptions.get(name, f"Generated category {name}")) for name in missing)
+        db.commit()
+        existing = {name: category_id for category_id, name in db.query(Category.id, Category.name)}
+    return [existing[name] for name in names]
+
+
+class ReviewGenerator:
+    def __init__(self, args, category_ids):
+        self.rng = random.Random(args.seed)
+        self.args = args
+        self.category_ids = category_ids
+        self.end = args.end
+        self.span_seconds = int(timedelta(days=args.days).total_seconds())
+
+        star_weights = [float(weight) for weight in args.star_weights.split(",")]
+        if len(star_weights) != 10:
+            raise ValueError("--star-weights needs exactly 10 comma-separated weights")
+        self.star_cum_weights = list(accumulate(star_weights))
+        self.category_cum_weights = list(accumulate(
+            1 / (rank ** args.category_skew) for rank in range(1, len(category_ids) + 1)
+        ))
+        self.edit_count = 0
+
+    def analysis(self, stars: int):
+        if self.rng.random() >= self.args.analyzed_fraction:
+            return None, None, None
+        sentiment = sentiment_for(stars)
+        if self.rng.random() < self.args.sentiment_noise:
+            sentiment = self.rng.choice(list(SENTIMENTS))
+        return self.rng.choice(SENTIMENTS[sentiment][1]), sentiment, STATUS_COMPLETED
+
+    def review(self, number: int):
+        rng = self.rng
+        review_id = f"{self.args.prefix}_{number}"
+        category_id = rng.choices(self.category_ids, cum_weights=self.category_cum_weights)[0]
+        stars = rng.choices(range(1, 11), cum_weights=self.star_cum_weights)[0]
+        text = rng.choice(SENTIMENTS[sentiment_for(stars)][0])
+        if self.args.unique_text:
+            text = f"{text} Ref {review_id}."
+        created_at = self.end - timedelta(seconds=rng.randint(0, self.span_seconds))
+
+        rows = [(text, stars, review_id, category_id, *self.analysis(stars), created_at)]
+
+        if rng.random() < self.args.edit_rate:
+            for _ in range(rng.randint(1, self.args.max_edits)):
+                stars = max(1, min(10, stars + rng.randint(-self.args.edit_star_drift, self.args.edit_star_drift)))
+                created_at = min(self.end, created_at + timedelta(seconds=rng.randint(3600, 10 * 86400)))
+                text = text + " (Edited)"
+                rows.append((text, stars, review_id, category_id, *self.analysis(stars), created_at))
+                self.edit_count += 1
+        return rows
+
+    def batches(self, batch_size: int):
+        batch = []
+        for number in range(1, self.args.reviews + 1):
+            batch.extend(self.review(number))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def copy_rows(db, rows) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        # Unquoted empty fields are NULL in COPY's CSV format
+        writer.writerow(row[:7] + (row[7].isoformat(),))
+    buffer.seek(0)
+    cursor = db.connection().connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {ReviewHistory.__tablename__} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def insert_rows(db, rows) -> None:
+    db.execute(insert(ReviewHistory.__table__), [dict(zip(COLUMNS, row)) for row in rows])
+
+
+def generate(args):
+    db = SessionLocal()
+
+    try:
+        method = args.method
+        if method == "auto":
+            method = "copy" if db.get_bind().dialect.name == "postgresql" else "insert"
+        write_rows = copy_rows if method == "copy" else insert_rows
+
+        category_ids = ensure_categories(db, args.categories)
+        taken = db.execute(
+            select(ReviewHistory.id).where(ReviewHistory.review_id.like(f"{args.prefix}\\_%", escape="\\")).limit(1)
+        ).first()
+        if taken:
+            raise SystemExit(f"Reviews with prefix '{args.prefix}' already exist; pick another --prefix")
+
+        generator = ReviewGenerator(args, category_ids)
+        written = 0
+        started = time.perf_counter()
+        for rows in generator.batches(args.batch_size):
+            write_rows(db, rows)
+            db.commit()
+            written += len(rows)
+            elapsed = time.perf_counter() - started
+            print(f"  {written:,} rows written ({written / elapsed:,.0f} rows/sec)")
+
+        elapsed = time.perf_counter() - started
+        print(
+            f"Wrote {written:,} history rows ({args.reviews:,} reviews, {generator.edit_count:,} edits) "
+            f"via {method} in {elapsed:.1f}s: {written / elapsed:,.0f} rows/sec"
+        )
+
+        if args.skip_projections:
+            print("Skipped projection rebuild; run rebuild_projections.py before serving traffic")
+            return
+
+        started = time.perf_counter()
+        latest_count = rebuild_latest(db.connection())
+        reconcile_category_stats(db.connection())
+        mark_changed(db, category_ids)
+        db.commit()
+        print(f"Rebuilt projections for {latest_count:,} reviews in {time.perf_counter() - started:.1f}s")
+
+        if settings.review_history_delta_storage:
+            started = time.perf_counter()
+            compacted = compact_all_revisions(db.connection())
+            db.commit()
+            print(f"Delta-encoded {compacted:,} superseded revisions in {time.perf_counter() - started:.1f}s")
+
+    except Exception as e:
+        db.rollback()
+        print(f"Error generating data: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reviews", type=int, default=10_000, help="distinct review_ids to create")
+    parser.add_argument("--categories", type=int, default=len(CATEGORIES))
+    parser.add_argument("--category-skew", type=float, default=0.0,
+                        help="Zipf exponent for reviews per category; 0 spreads them evenly")
+    parser.add_argument("--edit-rate", type=float, default=0.2, help="fraction of reviews that get edits")
+    parser.add_argument("--max-edits", type=int, default=3)
+    parser.add_argument("--edit-star-drift", type=int, default=1, help="max star change per edit")
+    parser.add_argument("--star-weights", default=DEFAULT_STAR_WEIGHTS, help="relative weights of 1..10 stars")
+    parser.add_argument("--sentiment-noise", type=float, default=0.05,
+                        help="fraction of analyzed rows whose sentiment disagrees with their stars")
+    parser.add_argument("--analyzed-fraction", type=float, default=1.0,
+                        help="fraction of rows that already have tone and sentiment")
+    parser.add_argument("--unique-text", action="store_true", help="make every review's text distinct")
+    parser.add_argument("--days", type=int, default=365, help="spread created_at over this many days")
+    parser.add_argument("--end", type=datetime.fromisoformat, default=datetime(2026, 1, 1, tzinfo=timezone.utc),
+                        help="latest created_at (ISO 8601)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefix", default="gen", help="review_id prefix")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--method", choices=("auto", "copy", "insert"), default="auto")
+    parser.add_argument("--skip-projections", action="store_true")
+    args = parser.parse_args(argv)
+    if args.end.tzinfo is None:
+        args.end = args.end.replace(tzinfo=timezone.utc)
+    return args
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    print(f"Generating {arguments.reviews:,} reviews with seed {arguments.seed}...")
+    generate(arguments)
@@ -1,128 +1,134 @@
+import argparse
+import json
 
 from app.database.config import SessionLocal
 from app.models.models import ReviewHistory, Category, AccessLog
-from sqlalchemy import func
-
-def inspect_database():
-    db = SessionLocal()
-
+from app.services.stats import collect_stats
+
+BAR_WIDTH = 50
+
+
+def recent_reviews(db, limit=5):
+    rows = (
+        db.query(ReviewHistory, Category.name)
+        .join(Category, ReviewHistory.category_id == Category.id)
+        .order_by(ReviewHistory.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "id": review.id,
+            "review_id": review.review_id,
+            "stars": review.stars,
+            "text": review.text,
+            "tone": review.tone,
+            "sentiment": review.sentiment,
+            "category": category_name,
+            "created_at": review.created_at.isoformat(),
+        }
+        for review, category_name in rows
+    ]
+
+
+def recent_access_logs(db, limit=10):
+    logs = db.query(AccessLog).order_by(AccessLog.created_at.desc()).limit(limit).all()
+    return [{"created_at": log.created_at.isoformat(), "text": log.text} for log in logs]
+
+
+def print_report(stats, reviews, logs):
     print("\n" + "="*60)
     print("DATABASE INSPECTION REPORT")
     print("="*60)
 
     print("\nCATEGORIES")
     print("-" * 60)
-    categories = db.query(Category).all()
-    for cat in categories:
-        review_count = db.query(ReviewHistory).filter(
-            ReviewHistory.category_id == cat.id
-        ).count()
-
-        latest_reviews_subquery = (
-            db.query(
-                ReviewHistory.review_id,
-                func.max(ReviewHistory.created_at).label("max_created_at")
-            )
-            .filter(ReviewHistory.category_id == cat.id)
-            .group_by(ReviewHistory.review_id)
-            .subquery()
-        )
-
-        unique_review_count = db.query(latest_reviews_subquery).count()
-
-        avg_stars = db.query(func.avg(ReviewHistory.stars)).filter(
-            ReviewHistory.category_id == cat.id
-        ).scalar()
-
+    for cat in stats.categories:
         print(f"  {cat.id}. {cat.name}")
         print(f"     Description: {cat.description}")
-        print(f"     Total history entries: {review_count}")
-        print(f"     Unique reviews: {unique_review_count}")
-        print(f"     Avg stars: {avg_stars:.2f}" if avg_stars is not None else "     Avg stars: 0")
+        print(f"     Total history entries: {cat.history_entries}")
+        print(f"     Reviews currently in category: {cat.unique_reviews}")
+        print(f"     Avg stars: {cat.average_stars:.2f}" if cat.average_stars is not None else "     Avg stars: 0")
+        print(f"     Analysis backlog: {cat.analysis.unanalyzed} unanalyzed, {cat.analysis.pending} pending, {cat.analysis.failed} failed")
         print()
 
-    
+    overall = stats.overall
     print("\nREVIEW STATISTICS")
     print("-" * 60)
-    total_reviews = db.query(ReviewHistory).count()
-    unique_reviews = db.query(ReviewHistory.review_id).distinct().count()
+    print(f"  Total review history entries: {overall.history_entries}")
+    print(f"  Unique reviews (by review_id): {overall.unique_reviews}")
+    print(f"  Edit revisions (beyond each review's first): {overall.edits}")
 
-    print(f"  Total review history entries: {total_reviews}")
-    print(f"  Unique reviews (by review_id): {unique_reviews}")
-    print(f"  Reviews with edits: {total_reviews - unique_reviews}")
+    print(f"\n  Reviews missing tone: {overall.analysis.missing_tone}")
+    print(f"  Reviews missing sentiment: {overall.analysis.missing_sentiment}")
+    print(f"  Analysis backlog: {overall.analysis.unanalyzed} unanalyzed, "
+          f"{overall.analysis.pending} pending, {overall.analysis.failed} failed")
 
-    
-    missing_tone = db.query(ReviewHistory).filter(
-        ReviewHistory.tone.is_(None)
-    ).count()
-    missing_sentiment = db.query(ReviewHistory).filter(
-        ReviewHistory.sentiment.is_(None)
-    ).count()
-
-    print(f"\n  Reviews missing tone: {missing_tone}")
-    print(f"  Reviews missing sentiment: {missing_sentiment}")
-
-    
     print("\nRECENT REVIEWS (Latest 5)")
     print("-" * 60)
-    recent = db.query(ReviewHistory).order_by(
-        ReviewHistory.created_at.desc()
-    ).limit(5).all()
-
-    for review in recent:
-        print(f"  ID: {review.id} | review_id: {review.review_id}")
-        print(f"  Stars: {review.stars}/10")
-        print(f"  Text: {review.text[:60]}..." if review.text and len(review.text) > 60 else f"  Text: {review.text}")
-        print(f"  Tone: {review.tone} | Sentiment: {review.sentiment}")
-        print(f"  Category: {review.category.name}")
-        print(f"  Created: {review.created_at}")
+    for review in reviews:
+        text = review["text"]
+        print(f"  ID: {review['id']} | review_id: {review['review_id']}")
+        print(f"  Stars: {review['stars']}/10")
+        print(f"  Text: {text[:60]}..." if text and len(text) > 60 else f"  Text: {text}")
+        print(f"  Tone: {review['tone']} | Sentiment: {review['sentiment']}")
+        print(f"  Category: {review['category']}")
+        print(f"  Created: {review['created_at']}")
         print()
 
-    
     print("\n ACCESS LOGS (Latest 10)")
     print("-" * 60)
-    logs = db.query(AccessLog).order_by(
-        AccessLog.created_at.desc()
-    ).limit(10).all()
-
     if logs:
         for log in logs:
-            print(f"  [{log.created_at}] {log.text}")
+            print(f"  [{log['created_at']}] {log['text']}")
     else:
         print("  No access logs yet. Make some API requests!")
 
-    
     print("\nSTARS DISTRIBUTION")
     print("-" * 60)
-    for stars in range(1, 11):
-        count = db.query(ReviewHistory).filter(
-            ReviewHistory.stars == stars
-        ).count()
-        bar = "█" * (count // 2) if count > 0 else ""
+    largest = max(overall.star_histogram.values(), default=0)
+    for stars, count in overall.star_histogram.items():
+        bar = "█" * (count * BAR_WIDTH // largest) if count > 0 else ""
         print(f"  {stars:2d} stars: {bar} ({count})")
 
-    
     print("\nSENTIMENT DISTRIBUTION")
     print("-" * 60)
-    sentiments = db.query(
-        ReviewHistory.sentiment,
-        func.count(ReviewHistory.id)
-    ).group_by(ReviewHistory.sentiment).all()
-
-    for sentiment, count in sentiments:
-        sentiment_display = sentiment if sentiment else "None (pending)"
-        print(f"  {sentiment_display}: {count}")
+    sentiments = overall.sentiments
+    print(f"  Positive: {sentiments.positive}")
+    print(f"  Neutral: {sentiments.neutral}")
+    print(f"  Negative: {sentiments.negative}")
+    if sentiments.other:
+        print(f"  Other: {sentiments.other}")
+    print(f"  None (pending): {sentiments.missing}")
 
     print("\n" + "="*60)
     print("End of report")
     print("="*60 + "\n")
 
-    db.close()
+
+def inspect_database(output_format="text"):
+    db = SessionLocal()
+
+    try:
+        stats = collect_stats(db)
+        reviews = recent_reviews(db)
+        logs = recent_access_logs(db)
+    finally:
+        db.close()
+
+    if output_format == "json":
+        print(json.dumps({"stats": stats.model_dump(), "recent_reviews": reviews, "access_logs": logs}, indent=2))
+    else:
+        print_report(stats, reviews, logs)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print review, analysis and access log statistics")
+    parser.add_argument("--format", choices=("text", "json"), default="text")
+    args = parser.parse_args()
+
     try:
-        inspect_database()
+        inspect_database(args.format)
     except Exception as e:
         print(f"\nError: {e}")
         print("\nMake sure:")
@@ -0,0 +1,44 @@
+from app.database.config import SessionLocal, settings
+from app.models.models import Category
+from app.services.projections import rebuild_latest, reconcile_category_stats
+from app.services.response_cache import mark_changed
+from app.services.revisions import compact_all_revisions
+
+
+def rebuild_projections():
+    db = SessionLocal()
+
+    try:
+        latest_count = rebuild_latest(db.connection())
+        drift = reconcile_category_stats(db.connection())
+        mark_changed(db, (category_id for category_id, in db.query(Category.id)))
+        db.commit()
+        print(f"Rebuilt review_latest with {latest_count} reviews")
+
+        if drift:
+            print(f"Corrected category_stats drift in {len(drift)} categories:")
+            for entry in drift:
+                print(
+                    f"  category {entry['category_id']}: "
+                    f"sum {entry['actual_sum_stars']} -> {entry['expected_sum_stars']}, "
+                    f"count {entry['actual_review_count']} -> {entry['expected_review_count']}"
+                )
+        else:
+            print("category_stats is consistent")
+
+        if settings.review_history_delta_storage:
+            compacted = compact_all_revisions(db.connection())
+            db.commit()
+            print(f"Delta-encoded {compacted} superseded revisions")
+
+    except Exception as e:
+        db.rollback()
+        print(f"Error rebuilding projections: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    print("Rebuilding projections from review_history...")
+    rebuild_projections()
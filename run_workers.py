@@ -0,0 +1,91 @@
+"""Start one Celery worker per pool in app.celery_app.WORKER_POOLS.
+
+Each worker consumes only its pool's queues, with its own concurrency and
+prefetch multiplier, so a backlog in one queue never occupies the processes
+serving another:
+
+    python run_workers.py
+    python run_workers.py --pools interactive bulk --beat
+    python run_workers.py --concurrency interactive=8 bulk=1 --loglevel debug
+
+SIGINT and SIGTERM are passed on to every worker, which finish their
+current tasks before exiting. If one worker exits, the others are stopped
+too, and the first non-zero exit code is returned.
+"""
+import argparse
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+from app.celery_app import WORKER_POOLS
+
+
+def worker_command(pool: str, concurrency: Optional[int] = None, loglevel: str = "info") -> List[str]:
+    config = WORKER_POOLS[pool]
+    return [
+        sys.executable, "-m", "celery", "-A", "app.celery_app", "worker",
+        "--hostname", f"{pool}@%h",
+        "--queues", ",".join(config["queues"]),
+        "--concurrency", str(concurrency or config["concurrency"]),
+        "--prefetch-multiplier", str(config["prefetch_multiplier"]),
+        "--loglevel", loglevel,
+    ]
+
+
+def beat_command(loglevel: str = "info") -> List[str]:
+    return [sys.executable, "-m", "celery", "-A", "app.celery_app", "beat", "--loglevel", loglevel]
+
+
+def parse_concurrency(values: List[str]) -> Dict[str, int]:
+    overrides = {}
+    for value in values:
+        pool, _, count = value.partition("=")
+        if pool not in WORKER_POOLS or not count.isdigit():
+            raise argparse.ArgumentTypeError(f"Expected <pool>=<processes> with a pool from {list(WORKER_POOLS)}: {value}")
+        overrides[pool] = int(count)
+    return overrides
+
+
+def run_workers(commands: List[List[str]]) -> int:
+    processes = [subprocess.Popen(command) for command in commands]
+
+    def stop(signum=signal.SIGTERM, frame=None):
+        for process in processes:
+            if process.poll() is None:
+                process.send_signal(signum)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        while all(process.poll() is None for process in processes):
+            time.sleep(0.5)
+    finally:
+        stop()
+    returncodes = [process.wait() for process in processes]
+    return next((code for code in returncodes if code), 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pools", nargs="+", choices=list(WORKER_POOLS), default=list(WORKER_POOLS))
+    parser.add_argument("--concurrency", nargs="+", default=[], metavar="POOL=PROCESSES",
+                        help="Override a pool's number of processes")
+    parser.add_argument("--beat", action="store_true", help="Also run Celery beat")
+    parser.add_argument("--loglevel", default="info")
+    args = parser.parse_args()
+
+    try:
+        overrides = parse_concurrency(args.concurrency)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    commands = [worker_command(pool, overrides.get(pool), args.loglevel) for pool in args.pools]
+    if args.beat:
+        commands.append(beat_command(args.loglevel))
+    sys.exit(run_workers(commands))
+
+
+if __name__ == "__main__":
+    main()
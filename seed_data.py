@@ -3,23 +3,52 @@ from app.models.models import Category, ReviewHistory
 from datetime import datetime, timedelta
 import random
 
+CATEGORIES = [
+    {"name": "Electronics", "description": "Electronic products and gadgets"},
+    {"name": "Books", "description": "Books and literature"},
+    {"name": "Clothing", "description": "Apparel and fashion"},
+    {"name": "Home & Kitchen", "description": "Home and kitchen items"},
+    {"name": "Sports", "description": "Sports and outdoor equipment"},
+    {"name": "Toys", "description": "Toys and games"},
+]
+
+POSITIVE_REVIEWS = [
+    "Excellent product! Highly recommend.",
+    "Great quality and fast shipping.",
+    "Love it! Exactly what I needed.",
+    "Outstanding! Will buy again.",
+    "Perfect! Exceeded my expectations.",
+]
+
+NEUTRAL_REVIEWS = [
+    "It's okay, does the job.",
+    "Average product, nothing special.",
+    "Decent for the price.",
+    "Works as described.",
+    "Fine, but could be better.",
+]
+
+NEGATIVE_REVIEWS = [
+    "Disappointed with the quality.",
+    "Not what I expected.",
+    "Poor quality, would not recommend.",
+    "Broke after a week of use.",
+    "Waste of money.",
+]
+
+POSITIVE_TONES = ["Enthusiastic", "Happy", "Satisfied"]
+NEUTRAL_TONES = ["Neutral", "Professional", "Casual"]
+NEGATIVE_TONES = ["Disappointed", "Angry", "Frustrated"]
+
+
 def seed_database():
     db = SessionLocal()
 
     try:
-        categories_data = [
-            {"name": "Electronics", "description": "Electronic products and gadgets"},
-            {"name": "Books", "description": "Books and literature"},
-            {"name": "Clothing", "description": "Apparel and fashion"},
-            {"name": "Home & Kitchen", "description": "Home and kitchen items"},
-            {"name": "Sports", "description": "Sports and outdoor equipment"},
-            {"name": "Toys", "description": "Toys and games"},
-        ]
-
         existing_categories = {c.name for c in db.query(Category).all()}
 
         new_categories = []
-        for cat in categories_data:
+        for cat in CATEGORIES:
             if cat["name"] not in existing_categories:
                 new_categories.append(Category(**cat))
 
@@ -33,30 +62,6 @@ def seed_database():
 
         categories = db.query(Category).all()
 
-        positive_reviews = [
-            "Excellent product! Highly recommend.",
-            "Great quality and fast shipping.",
-            "Love it! Exactly what I needed.",
-            "Outstanding! Will buy again.",
-            "Perfect! Exceeded my expectations.",
-        ]
-
-        neutral_reviews = [
-            "It's okay, does the job.",
-            "Average product, nothing special.",
-            "Decent for the price.",
-            "Works as described.",
-            "Fine, but could be better.",
-        ]
-
-        negative_reviews = [
-            "Disappointed with the quality.",
-            "Not what I expected.",
-            "Poor quality, would not recommend.",
-            "Broke after a week of use.",
-            "Waste of money.",
-        ]
-
         existing_review_ids = {
             r.review_id for r in db.query(ReviewHistory.review_id).distinct()
         }
@@ -72,19 +77,19 @@ def seed_database():
 
                 review_type = random.choice(['positive', 'neutral', 'negative'])
                 if review_type == 'positive':
-                    text = random.choice(positive_reviews)
+                    text = random.choice(POSITIVE_REVIEWS)
                     stars = random.randint(8, 10)
-                    tone = random.choice(["Enthusiastic", "Happy", "Satisfied"])
+                    tone = random.choice(POSITIVE_TONES)
                     sentiment = "Positive"
                 elif review_type == 'neutral':
-                    text = random.choice(neutral_reviews)
+                    text = random.choice(NEUTRAL_REVIEWS)
                     stars = random.randint(5, 7)
-                    tone = random.choice(["Neutral", "Professional", "Casual"])
+                    tone = random.choice(NEUTRAL_TONES)
                     sentiment = "Neutral"
                 else:
-                    text = random.choice(negative_reviews)
+                    text = random.choice(NEGATIVE_REVIEWS)
                     stars = random.randint(1, 4)
-                    tone = random.choice(["Disappointed", "Angry", "Frustrated"])
+                    tone = random.choice(NEGATIVE_TONES)
                     sentiment = "Negative"
 
                 created_time = datetime.now() - timedelta(days=random.randint(1, 90))
@@ -105,17 +110,15 @@ def seed_database():
 
                 if random.random() < 0.2:
                     num_edits = random.randint(1, 3)
+                    edit_time = created_time
                     for j in range(num_edits):
-                        edit_time = created_time + timedelta(days=random.randint(1, 10))
-                        edited_id = f"{review_id}_edit{j+1}"
-
-                        if edited_id in existing_review_ids:
-                            continue
+                        # Edits are new revisions of the same review_id
+                        edit_time = edit_time + timedelta(days=random.randint(1, 10))
 
                         edited_review = ReviewHistory(
                             text=text + " (Edited)",
-                            stars=min(10, stars + random.randint(-1, 1)),
-                            review_id=edited_id,
+                            stars=max(1, min(10, stars + random.randint(-1, 1))),
+                            review_id=review_id,
                             category_id=category.id,
                             tone=tone,
                             sentiment=sentiment,
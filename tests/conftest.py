@@ -0,0 +1,128 @@
+import os
+import tempfile
+
+# Settings are read when app.database.config is imported, so the test
+# environment has to be in place before any test module imports the app.
+_data_dir = tempfile.mkdtemp(prefix="reviews-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_data_dir, 'tests.db')}")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/15")
+os.environ.setdefault("ANTHROPIC_API_KEY", "unused")
+os.environ["LLM_BACKEND"] = "fake"
+# Tests that need the response cache turn it on, together with the redis_client fixture
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+os.environ["CACHE_PREWARM_INTERVAL"] = "0"
+
+from datetime import datetime, timedelta, timezone  # noqa: E402
+
+import pytest  # noqa: E402
+
+BASE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db():
+    """A session on a freshly created schema, dropped again afterwards."""
+    import app.models  # noqa: F401
+    from app.database.config import Base, SessionLocal, engine
+
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+        Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def add_reviews(db):
+    """Insert revisions, given as dicts of ``ReviewHistory`` columns, and commit.
+
+    ``created_at`` defaults to one minute apart from ``BASE_TIME`` in the
+    order given, and the categories the revisions use are created as needed.
+    The projections are kept in step by the session's after_flush listener.
+    """
+    from sqlalchemy import select
+
+    from app.models.models import Category, ReviewHistory
+
+    def add(*revisions):
+        existing = set(db.scalars(select(Category.id)))
+        for category_id in sorted({revision["category_id"] for revision in revisions} - existing):
+            db.add(Category(id=category_id, name=f"Category {category_id}", description=None))
+        offset = db.query(ReviewHistory).count()
+        rows = [
+            ReviewHistory(**{"created_at": BASE_TIME + timedelta(minutes=offset + i), "stars": 5, **revision})
+            for i, revision in enumerate(revisions)
+        ]
+        db.add_all(rows)
+        db.commit()
+        return [row.id for row in rows]
+
+    return add
+
+
+@pytest.fixture
+def redis_client():
+    """The Redis at REDIS_URL, emptied before and after the test; skips the test if it is not reachable."""
+    import redis
+
+    from app.database.config import get_redis
+
+    client = get_redis()
+    try:
+        client.ping()
+    except redis.RedisError:
+        pytest.skip("Redis is not reachable at REDIS_URL")
+    client.flushdb()
+    yield client
+    client.flushdb()
+
+
+@pytest.fixture
+def cache_enabled(redis_client, monkeypatch):
+    """The response cache, turned on against the emptied Redis of ``redis_client``."""
+    from app.services.response_cache import settings
+
+    monkeypatch.setattr(settings, "response_cache_enabled", True)
+
+
+@pytest.fixture
+def delta_storage(monkeypatch):
+    """``REVIEW_HISTORY_DELTA_STORAGE=true``: superseded revisions are delta-encoded when a newer one is flushed."""
+    from app.database.config import settings
+
+    monkeypatch.setattr(settings, "review_history_delta_storage", True)
+
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    """Analysis batches the API enqueued, recorded instead of published to the broker."""
+    from app.tasks import tasks
+
+    batches = []
+    monkeypatch.setattr(tasks.analyze_sentiment_batch, "delay", lambda ids: batches.append(list(ids)))
+    monkeypatch.setattr(
+        tasks.analyze_sentiment_batch, "apply_async", lambda args, **options: batches.append(list(args[0]))
+    )
+    return batches
+
+
+@pytest.fixture
+def api(db, enqueued):
+    """A TestClient for the app, running its startup and shutdown hooks."""
+    from fastapi.testclient import TestClient
+
+    from app.database.config import async_engine, get_async_redis
+    from app.main import app
+    from app.services.response_cache import response_cache
+
+    # Async clients, pooled async connections and the local cache tier must not outlive the test's event loop
+    get_async_redis.cache_clear()
+    async_engine.sync_engine.dispose(close=False)
+    response_cache._local.clear()
+    with TestClient(app) as client:
+        yield client
+    get_async_redis.cache_clear()
+    async_engine.sync_engine.dispose(close=False)
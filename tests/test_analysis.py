@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event, select
+
+from app.database.config import engine
+from app.models.models import Category, ReviewHistory
+from app.services import analysis
+from app.services.analysis import STATUS_COMPLETED, STATUS_PENDING, ReviewInput, save_analysis
+from app.services.dispatcher import LLMUnavailable
+from app.services.llm import LLMStatusError
+from app.tasks import tasks
+
+
+@pytest.fixture
+def reviews(db):
+    db.add(Category(id=1, name="Books", description="Books"))
+    db.add_all(ReviewHistory(id=i, review_id=f"r{i}", text=f"review {i}", stars=5, category_id=1) for i in range(1, 5))
+    db.flush()
+
+
+def test_save_analysis_writes_complete_results_in_one_statement(db, reviews):
+    updates = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE"):
+            updates.append(executemany)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        save_analysis(db, {1: ("Happy", "Positive"), 2: ("Angry", "Negative"), 3: (None, "Neutral")})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert updates == [False]
+    rows = db.execute(
+        select(ReviewHistory.id, ReviewHistory.tone, ReviewHistory.sentiment, ReviewHistory.analysis_status)
+        .order_by(ReviewHistory.id)
+    ).all()
+    assert [tuple(row) for row in rows] == [
+        (1, "Happy", "Positive", STATUS_COMPLETED),
+        (2, "Angry", "Negative", STATUS_COMPLETED),
+        (3, None, None, None),
+        (4, None, None, None),
+    ]
+
+
+def test_save_analysis_ignores_an_empty_batch(db, reviews):
+    save_analysis(db, {})
+    assert db.execute(select(ReviewHistory.id).where(ReviewHistory.analysis_status.isnot(None))).first() is None
+
+
+class ScriptedDispatcher:
+    """Stands in for the analysis dispatcher, answering each prompt with the next scripted reply."""
+
+    model = "test-model"
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+
+    async def complete(self, prompt, max_tokens):
+        reply = self.replies.pop(0)
+        if isinstance(reply, BaseException):
+            raise reply
+        return reply
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    monkeypatch.setattr(tasks.settings, "analysis_cache_enabled", False)
+
+    def script(*replies):
+        scripted = ScriptedDispatcher(*replies)
+        monkeypatch.setattr(tasks.dispatcher, "run", lambda work: asyncio.run(work(scripted)))
+        return scripted
+
+    return script
+
+
+def _claim(db, ids):
+    db.execute(analysis.claim_statement(ids, pending_timeout=300))
+    return analysis.load_review_inputs(db, ids)
+
+
+def _status(db, review_history_id):
+    return tuple(db.execute(
+        select(ReviewHistory.tone, ReviewHistory.sentiment, ReviewHistory.analysis_status)
+        .where(ReviewHistory.id == review_history_id)
+    ).one())
+
+
+def test_analyze_defers_a_malformed_reply_instead_of_completing_it(db, reviews, llm):
+    llm("I'm not sure how to rate this one.")
+
+    deferred = tasks._analyze(db, _claim(db, [1]))
+
+    assert deferred == [1]
+    assert _status(db, 1) == (None, None, STATUS_PENDING)
+
+
+def test_analyze_saves_complete_batch_items_and_defers_incomplete_ones(db, reviews, llm):
+    llm('[{"id": 1, "tone": "Happy", "sentiment": "Positive"}, {"id": 2, "tone": "Calm"}]')
+
+    deferred = tasks._analyze(db, _claim(db, [1, 2]))
+
+    assert deferred == [2]
+    assert _status(db, 1) == ("Happy", "Positive", STATUS_COMPLETED)
+    assert _status(db, 2) == (None, None, STATUS_PENDING)
+
+
+def test_per_review_fallback_keeps_the_analyses_that_succeeded():
+    reviews = [ReviewInput(i, f"review {i}", 5) for i in range(1, 5)]
+    llm = ScriptedDispatcher(
+        '[{"id": 1, "tone": "Happy", "sentiment": "Positive"}]',
+        LLMUnavailable("gave up"),
+        "Tone: Calm\nSentiment: Neutral",
+        LLMStatusError(400),
+    )
+
+    outcome = asyncio.run(analysis.run_analysis_async(llm, reviews, batch_size=4))
+
+    assert outcome.results == {1: ("Happy", "Positive"), 3: ("Calm", "Neutral")}
+    assert outcome.deferred == [2]
+    assert outcome.failed == [4]
+    assert llm.replies == []
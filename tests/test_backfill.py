@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from app.models.models import JobCheckpoint, ReviewHistory
+from app.services import backfill
+from app.services.analysis import STATUS_COMPLETED, save_analysis
+
+
+def _run(db):
+    return backfill.run_backfill(db.connection(), rows_per_run=10, chunk_size=5, pending_timeout=300)
+
+
+def test_backfill_skips_rows_without_text(db, add_reviews):
+    with_text, empty, missing = add_reviews(
+        {"review_id": "r1", "category_id": 1, "text": "Worth analyzing"},
+        {"review_id": "r2", "category_id": 1, "text": ""},
+        {"review_id": "r3", "category_id": 1, "text": None},
+    )
+
+    progress = _run(db)
+
+    assert progress.claimed == [with_text]
+    assert progress.backlog == 1
+    statuses = dict(db.execute(select(ReviewHistory.id, ReviewHistory.analysis_status)).all())
+    assert statuses[empty] is None and statuses[missing] is None
+
+
+def test_rows_per_second_counts_only_the_analyses_saved_for_the_backfill(db, add_reviews):
+    claimed_id, read_id = add_reviews(
+        {"review_id": "r1", "category_id": 1, "text": "Claimed by the backfill"},
+        {"review_id": "r2", "category_id": 1, "text": "Analyzed after a page read"},
+    )
+    assert _run(db).rows_per_second is None
+    # Pretend the previous run was ten seconds ago
+    db.execute(
+        update(JobCheckpoint)
+        .where(JobCheckpoint.name == backfill.CHECKPOINT)
+        .values(watermark=datetime.now(timezone.utc) - timedelta(seconds=10))
+    )
+
+    save_analysis(db, {claimed_id: ("Calm", "Neutral"), read_id: ("Happy", "Positive")})
+    backfill.record_saved(db.connection(), 1)
+    # Later writes to completed rows, such as an edit's compaction, are not analyses
+    db.execute(update(ReviewHistory).where(ReviewHistory.analysis_status == STATUS_COMPLETED).values(stars=4))
+
+    progress = _run(db)
+
+    assert progress.rows_per_second == pytest.approx(0.1, rel=0.05)
+    assert progress.backlog == 0
+    assert _run(db).rows_per_second == 0
@@ -0,0 +1,308 @@
+import asyncio
+
+import pytest
+
+from app.services import dispatcher as dispatcher_module
+from app.services.dispatcher import (
+    AnalysisDispatcher,
+    CircuitBreaker,
+    CircuitOpenError,
+    LLMUnavailable,
+    TokenBucket,
+)
+from app.services.llm import LLMStatusError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def sleeps(monkeypatch, clock):
+    """Replace asyncio.sleep in the dispatcher with one that advances the fake clock instantly."""
+    calls = []
+
+    async def sleep(seconds):
+        calls.append(seconds)
+        clock.advance(seconds)
+
+    monkeypatch.setattr(dispatcher_module.asyncio, "sleep", sleep)
+    return calls
+
+
+class ScriptedClient:
+    """Raises or returns the scripted outcomes in order."""
+
+    model = "scripted"
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    async def complete(self, prompt, max_tokens):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+def make_dispatcher(client, breaker, max_retries=3, retry_max_delay=30.0):
+    return AnalysisDispatcher(
+        client,
+        concurrency=4,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        max_retries=max_retries,
+        retry_base_delay=1.0,
+        retry_max_delay=retry_max_delay,
+        breaker=breaker,
+    )
+
+
+# Circuit breaker
+
+
+def test_breaker_opens_after_threshold_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.before_call() is False
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_breaker_lets_one_probe_through_after_reset_timeout(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+
+    clock.advance(29)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.advance(1)
+    assert breaker.state == "half_open"
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_closes_when_the_probe_succeeds(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.advance(30)
+    breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.before_call() is False
+
+
+def test_breaker_reopens_for_a_full_timeout_when_the_probe_fails(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.advance(30)
+    breaker.before_call()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.advance(29)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.advance(1)
+    assert breaker.before_call() is True
+
+
+def test_breaker_allows_a_new_probe_after_one_is_released(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.advance(30)
+    breaker.before_call()
+
+    breaker.release_probe()
+    assert breaker.state == "half_open"
+    assert breaker.before_call() is True
+
+
+def test_cancelled_probe_does_not_keep_the_breaker_open(clock):
+    class HangingClient:
+        model = "hanging"
+
+        async def complete(self, prompt, max_tokens):
+            await asyncio.Event().wait()
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.advance(30)
+    dispatcher = make_dispatcher(HangingClient(), breaker)
+
+    async def cancel_probe():
+        probe = asyncio.create_task(dispatcher.complete("prompt", 10))
+        await asyncio.sleep(0)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    asyncio.run(cancel_probe())
+    assert breaker.before_call() is True
+
+
+# Token buckets
+
+
+def test_bucket_starts_full_and_serves_without_waiting(clock, sleeps):
+    bucket = TokenBucket(rate_per_minute=60, clock=clock)
+
+    async def take():
+        for _ in range(60):
+            await bucket.acquire(1)
+
+    asyncio.run(take())
+    assert sleeps == []
+    assert bucket.available == pytest.approx(0)
+
+
+def test_bucket_waits_for_the_refill_when_empty(clock, sleeps):
+    bucket = TokenBucket(rate_per_minute=60, clock=clock)
+
+    async def take():
+        await bucket.acquire(60)
+        await bucket.acquire(3)
+
+    asyncio.run(take())
+    # One unit per second
+    assert sleeps == [pytest.approx(3)]
+    assert bucket.available == pytest.approx(0)
+
+
+def test_bucket_refill_is_capped_at_one_minute(clock, sleeps):
+    bucket = TokenBucket(rate_per_minute=60, clock=clock)
+
+    async def take():
+        await bucket.acquire(60)
+        clock.advance(600)
+        await bucket.acquire(0)
+
+    asyncio.run(take())
+    assert bucket.available == pytest.approx(60)
+
+
+def test_bucket_caps_requests_larger_than_its_capacity(clock, sleeps):
+    bucket = TokenBucket(rate_per_minute=100, clock=clock)
+
+    async def take():
+        await bucket.acquire(250)
+
+    asyncio.run(take())
+    assert sleeps == []
+    assert bucket.available == pytest.approx(0)
+
+
+# Retries
+
+
+def test_retryable_errors_are_retried_until_success(clock, sleeps):
+    client = ScriptedClient(LLMStatusError(503), LLMStatusError(429), "ok")
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30, clock=clock)
+    dispatcher = make_dispatcher(client, breaker)
+
+    assert asyncio.run(dispatcher.complete("prompt", 10)) == "ok"
+    assert client.calls == 3
+    assert len(sleeps) == 2
+    # Full jitter: up to base * 2^attempt
+    assert 0 <= sleeps[0] <= 1.0
+    assert 0 <= sleeps[1] <= 2.0
+    assert breaker.state == "closed"
+
+
+def test_retries_give_up_with_llm_unavailable(clock, sleeps):
+    client = ScriptedClient(*(LLMStatusError(503) for _ in range(3)))
+    breaker = CircuitBreaker(failure_threshold=10, reset_timeout=30, clock=clock)
+    dispatcher = make_dispatcher(client, breaker, max_retries=2)
+
+    with pytest.raises(LLMUnavailable):
+        asyncio.run(dispatcher.complete("prompt", 10))
+    assert client.calls == 3
+    assert breaker.failures == 3
+
+
+def test_non_retryable_errors_are_raised_at_once(clock, sleeps):
+    client = ScriptedClient(LLMStatusError(400))
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    dispatcher = make_dispatcher(client, breaker)
+
+    with pytest.raises(LLMStatusError):
+        asyncio.run(dispatcher.complete("prompt", 10))
+    assert client.calls == 1
+    assert sleeps == []
+    # The backend answered, so the breaker stays closed
+    assert breaker.state == "closed"
+
+
+def test_error_status_from_the_probe_closes_the_breaker(clock, sleeps):
+    client = ScriptedClient(LLMStatusError(400))
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.advance(30)
+    dispatcher = make_dispatcher(client, breaker)
+
+    with pytest.raises(LLMStatusError):
+        asyncio.run(dispatcher.complete("prompt", 10))
+    assert breaker.state == "closed"
+
+
+def test_local_error_in_the_probe_leaves_the_breaker_half_open(clock, sleeps):
+    client = ScriptedClient(RuntimeError("bug in the client wrapper"))
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.advance(30)
+    dispatcher = make_dispatcher(client, breaker)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(dispatcher.complete("prompt", 10))
+    assert breaker.state == "half_open"
+    # The probe was released, so the next call may probe again
+    assert breaker.before_call() is True
+
+
+def test_retry_after_is_honored_and_capped(clock, sleeps):
+    client = ScriptedClient(LLMStatusError(429, retry_after=2.5), LLMStatusError(429, retry_after=3600), "ok")
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30, clock=clock)
+    dispatcher = make_dispatcher(client, breaker, retry_max_delay=30.0)
+
+    assert asyncio.run(dispatcher.complete("prompt", 10)) == "ok"
+    assert sleeps == [2.5, 30.0]
+
+
+def test_open_breaker_rejects_calls_without_reaching_the_client(clock, sleeps):
+    client = ScriptedClient(LLMStatusError(503), LLMStatusError(503))
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    dispatcher = make_dispatcher(client, breaker, max_retries=5)
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(dispatcher.complete("prompt", 10))
+    assert client.calls == 2
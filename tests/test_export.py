@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.models import ReviewHistory
+from app.services import export
+
+BASE_TEXT = "The battery lasts two full days, and charging from empty takes under an hour."
+
+
+@pytest.fixture
+def edited_reviews(db, add_reviews, delta_storage, monkeypatch):
+    """Category 1 holds r1 with three revisions, r2 with two and r3 with one; category 2 holds r4.
+
+    Returns the texts of category 1's revisions by id.
+    """
+    # Two rows per partition, so a review's revisions and their delta bases span partitions
+    monkeypatch.setattr(export.settings, "export_batch_size", 2)
+    analyzed = {"tone": "Calm", "sentiment": "Neutral"}
+    texts = {}
+    for revision in (
+        {"review_id": "r1", "category_id": 1, "text": BASE_TEXT},
+        {"review_id": "r2", "category_id": 1, "text": "Arrived late, but \"well\" packed,\nwith a note."},
+        {"review_id": "r1", "category_id": 1, "text": BASE_TEXT + " (Edited)"},
+        {"review_id": "r3", "category_id": 1, "text": "Fine."},
+        {"review_id": "r4", "category_id": 2, "text": "Another category."},
+        {"review_id": "r2", "category_id": 1, "text": "Arrived late, but \"well\" packed,\nwith a note. (Edited)"},
+        {"review_id": "r1", "category_id": 1, "text": BASE_TEXT + " (Edited) (Edited again)"},
+    ):
+        review_history_id, = add_reviews({**revision, **analyzed})
+        if revision["category_id"] == 1:
+            texts[review_history_id] = revision["text"]
+    return texts
+
+
+def _export(api, **params):
+    response = api.get("/reviews/export", params=params)
+    assert response.status_code == 200
+    return response
+
+
+def test_history_export_rebuilds_delta_encoded_texts(db, api, edited_reviews):
+    compacted = db.scalar(select(func.count()).where(ReviewHistory.text_delta.isnot(None)))
+    assert compacted == 3
+
+    response = _export(api, category_id=1, include_history="true")
+
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert {record["id"]: record["text"] for record in records} == edited_reviews
+    # By review, oldest revision first
+    keys = [(record["review_id"], record["id"]) for record in records]
+    assert keys == sorted(keys)
+    assert [review_id for review_id, _ in keys] == ["r1", "r1", "r1", "r2", "r2", "r3"]
+
+
+def test_export_lists_current_revisions_newest_first(api, edited_reviews):
+    records = [json.loads(line) for line in _export(api, category_id=1).text.splitlines()]
+
+    assert [record["review_id"] for record in records] == ["r1", "r2", "r3"]
+    assert [record["text"] for record in records] == [edited_reviews[record["id"]] for record in records]
+    assert records[0]["text"].endswith("(Edited again)")
+
+
+def test_csv_export_round_trips_quotes_and_newlines(api, edited_reviews):
+    response = _export(api, category_id=1, format="csv", include_history="true")
+
+    assert response.headers["content-disposition"] == 'attachment; filename="reviews_category_1.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(rows[0]) == export.FIELD_NAMES
+    assert {int(row["id"]): row["text"] for row in rows} == edited_reviews
+
+
+def test_export_of_an_empty_category_is_empty(api, db):
+    assert _export(api, category_id=1).content == b""
+    assert _export(api, category_id=1, format="csv").text.strip() == ",".join(export.FIELD_NAMES)
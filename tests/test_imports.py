@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+import pytest
+
+# app.models registers the projection listeners, whose module chain leads back
+# into app.services; every entry point has to import cleanly on its own.
+MODULES = [
+    "app.models",
+    "app.services.analysis",
+    "app.services.projections",
+    "app.services.revisions",
+    "app.services.stats",
+    "app.services.backfill",
+    "app.tasks",
+    "app.main",
+]
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_module_imports_first(module):
+    result = subprocess.run([sys.executable, "-c", f"import {module}"], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
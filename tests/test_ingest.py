@@ -0,0 +1,88 @@
+import asyncio
+
+from sqlalchemy import select
+
+from app.models.models import ReviewHistory
+from app.services.ingest import iter_csv_records
+
+
+def _parse(parse_records, body, chunk_size=7):
+    async def chunks():
+        # Small chunks split lines and UTF-8 sequences the way a streamed body can
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+
+    async def collect():
+        return [record async for record in parse_records(chunks())]
+
+    return asyncio.run(collect())
+
+
+def test_csv_records_carry_the_line_they_start_on():
+    body = (
+        'review_id,stars,category_id,text\n'
+        'r1,5,1,"Fine"\n'
+        'r2,4,1,"Spans\n'
+        'three\n'
+        'lines"\n'
+        '\n'
+        'r3,3,1\n'
+        'r4,2,1,"Café"\n'
+        'r5,1,1,"Never closed\n'
+    ).encode()
+
+    records = _parse(iter_csv_records, body)
+
+    assert records == [
+        (2, {"review_id": "r1", "stars": "5", "category_id": "1", "text": "Fine"}, None),
+        (3, {"review_id": "r2", "stars": "4", "category_id": "1", "text": "Spans\nthree\nlines"}, None),
+        (7, None, "Expected 4 columns, got 3"),
+        (8, {"review_id": "r4", "stars": "2", "category_id": "1", "text": "Café"}, None),
+        (9, None, "Unterminated quoted field"),
+    ]
+
+
+def test_bulk_ndjson_reports_each_rejected_line(db, add_reviews, api, enqueued):
+    add_reviews({"review_id": "existing", "category_id": 1, "text": "Already here", "tone": "Calm", "sentiment": "Neutral"})
+    body = "\n".join([
+        '{"review_id": "n1", "stars": 7, "category_id": 1, "text": "Great"}',
+        '{"review_id": "n2", "stars": 7',
+        '',
+        '[1, 2]',
+        '{"review_id": "n3", "stars": 11, "category_id": 1}',
+        '{"review_id": "n4", "stars": 3, "category_id": 99}',
+        '{"review_id": "n5", "stars": 2, "category_id": 1, "tone": "Sad", "sentiment": "Negative"}',
+    ])
+
+    response = api.post("/reviews/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["accepted"], result["rejected"], result["analysis_enqueued"]) == (2, 4, 1)
+    errors = {error["line"]: error["error"] for error in result["errors"]}
+    assert sorted(errors) == [2, 4, 5, 6]
+    assert errors[2].startswith("Invalid JSON")
+    assert errors[4] == "Expected a JSON object"
+    assert errors[5].startswith("stars:")
+    assert errors[6] == "category_id: unknown category 99"
+    stored = set(db.scalars(select(ReviewHistory.review_id)))
+    assert stored == {"existing", "n1", "n5"}
+    n1 = db.scalar(select(ReviewHistory.id).where(ReviewHistory.review_id == "n1"))
+    assert enqueued == [[n1]]
+
+
+def test_bulk_csv_errors_point_past_multiline_fields(db, add_reviews, api):
+    add_reviews({"review_id": "existing", "category_id": 1, "text": "Already here"})
+    body = (
+        'review_id,stars,category_id,text\n'
+        'c1,5,1,"First line\n'
+        'second line"\n'
+        'c2,0,1,Too few stars\n'
+    )
+
+    response = api.post("/reviews/bulk", params={"format": "csv"}, content=body)
+
+    result = response.json()
+    assert (result["accepted"], result["rejected"]) == (1, 1)
+    assert [error["line"] for error in result["errors"]] == [4]
+    assert db.scalar(select(ReviewHistory.text).where(ReviewHistory.review_id == "c1")) == "First line\nsecond line"
@@ -0,0 +1,32 @@
+from app.services.metrics import MetricsRegistry, render_prometheus, with_label
+
+
+def test_render_prometheus_types_each_family():
+    registry = MetricsRegistry()
+    registry.observe("http_request_duration_seconds", 0.2, buckets=(0.1, 1.0), route="/a")
+    registry.incr("llm_requests_total", outcome="ok")
+    registry.set("db_pool_size", 5, pool="api")
+    registry.set("custom_gauge", 1.5)
+    values = registry.snapshot()
+    values[with_label("celery_task_retries_total", "process", "worker-1")] = 2
+
+    assert render_prometheus(values).splitlines() == [
+        "# HELP celery_task_retries_total Celery task retries, by task",
+        "# TYPE celery_task_retries_total counter",
+        'celery_task_retries_total{process="worker-1"} 2',
+        "# TYPE custom_gauge gauge",
+        "custom_gauge 1.5",
+        "# HELP db_pool_size Configured pool size",
+        "# TYPE db_pool_size gauge",
+        'db_pool_size{pool="api"} 5',
+        "# HELP http_request_duration_seconds HTTP request latency, by method, route and status",
+        "# TYPE http_request_duration_seconds histogram",
+        'http_request_duration_seconds_bucket{le="0.1",route="/a"} 0',
+        'http_request_duration_seconds_bucket{le="1.0",route="/a"} 1',
+        'http_request_duration_seconds_bucket{le="+Inf",route="/a"} 1',
+        'http_request_duration_seconds_count{route="/a"} 1',
+        'http_request_duration_seconds_sum{route="/a"} 0.2',
+        "# HELP llm_requests_total LLM calls, by outcome",
+        "# TYPE llm_requests_total counter",
+        'llm_requests_total{outcome="ok"} 1',
+    ]
@@ -0,0 +1,54 @@
+import base64
+
+import pytest
+
+from conftest import BASE_TIME
+
+
+def _pages(api, **params):
+    pages, cursor = [], None
+    while True:
+        response = api.get("/reviews/", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        page = response.json()
+        pages.append([review["id"] for review in page["reviews"]])
+        cursor = page["next_cursor"]
+        assert page["has_more"] == (cursor is not None)
+        if cursor is None:
+            return pages
+
+
+@pytest.fixture
+def five_reviews(add_reviews):
+    """Five current revisions in category 1, two sharing a timestamp, plus a superseded one and another category."""
+    ids = add_reviews(*(
+        {"review_id": f"r{i}", "category_id": 1, "text": f"Review {i}", "tone": "Calm", "sentiment": "Neutral"}
+        for i in range(1, 5)
+    ))
+    tied = add_reviews({"review_id": "r5", "category_id": 1, "text": "Review 5", "created_at": BASE_TIME,
+                        "tone": "Calm", "sentiment": "Neutral"})
+    edit = add_reviews({"review_id": "r2", "category_id": 1, "text": "Review 2, edited", "tone": "Calm",
+                        "sentiment": "Neutral"})
+    add_reviews({"review_id": "other", "category_id": 2, "text": "Elsewhere", "tone": "Calm", "sentiment": "Neutral"})
+    # By (created_at, id): r1 and r5 share BASE_TIME, then r3, r4 and r2's edit
+    return [ids[0], *tied, ids[2], ids[3], *edit]
+
+
+def test_pages_walk_current_revisions_in_keyset_order(api, five_reviews):
+    newest_first = five_reviews[::-1]
+    assert _pages(api, category_id=1, page_size=2) == [newest_first[0:2], newest_first[2:4], newest_first[4:]]
+    assert _pages(api, category_id=1, page_size=2, direction="asc") == [five_reviews[0:2], five_reviews[2:4], five_reviews[4:]]
+    assert _pages(api, category_id=1, page_size=5) == [newest_first]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    base64.urlsafe_b64encode(b'["2026-01-01T00:00:00"]').decode(),
+    base64.urlsafe_b64encode(b'["yesterday", 1]').decode(),
+    base64.urlsafe_b64encode(b'{"id": 1}').decode(),
+])
+def test_malformed_cursor_is_a_bad_request(api, cursor):
+    response = api.get("/reviews/", params={"category_id": 1, "cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Invalid cursor")
@@ -0,0 +1,75 @@
+import asyncio
+
+from sqlalchemy import select
+
+from app.database.config import AsyncSessionLocal, get_async_redis
+from app.models.models import ReviewHistory
+
+
+def _status(db, review_history_id):
+    db.expire_all()
+    return db.scalar(select(ReviewHistory.analysis_status).where(ReviewHistory.id == review_history_id))
+
+
+def test_prewarm_renders_the_page_without_claiming_its_reviews(db, add_reviews, redis_client, enqueued, monkeypatch):
+    from app.api.routes import prewarm_reviews_page
+    from app.services.response_cache import settings
+
+    monkeypatch.setattr(settings, "response_cache_enabled", True)
+    review_history_id, = add_reviews({"review_id": "r1", "category_id": 1, "text": "Still waiting for analysis"})
+
+    async def prewarm():
+        try:
+            async with AsyncSessionLocal() as session:
+                return await prewarm_reviews_page(session, 1)
+        finally:
+            await get_async_redis().aclose()
+            get_async_redis.cache_clear()
+
+    assert asyncio.run(prewarm()) is True
+    assert _status(db, review_history_id) is None
+    assert enqueued == []
+
+
+def test_reading_a_page_claims_and_enqueues_its_unanalyzed_reviews(db, add_reviews, api, enqueued):
+    review_history_id, = add_reviews({"review_id": "r1", "category_id": 1, "text": "Still waiting for analysis"})
+
+    response = api.get("/reviews/", params={"category_id": 1})
+
+    assert response.status_code == 200
+    assert _status(db, review_history_id) == "pending"
+    assert enqueued == [[review_history_id]]
+
+
+def test_reading_a_prewarmed_page_claims_and_enqueues_its_unanalyzed_reviews(
+    db, add_reviews, cache_enabled, api, enqueued
+):
+    from app.api.routes import prewarm_reviews_page
+    from app.services.response_cache import response_cache
+
+    review_history_id, = add_reviews({"review_id": "r1", "category_id": 1, "text": "Still waiting for analysis"})
+
+    async def prewarm():
+        get_async_redis.cache_clear()
+        try:
+            async with AsyncSessionLocal() as session:
+                return await prewarm_reviews_page(session, 1)
+        finally:
+            await get_async_redis().aclose()
+            get_async_redis.cache_clear()
+
+    assert asyncio.run(prewarm()) is True
+    # Served from Redis, so the ids have to survive the round trip
+    response_cache._local.clear()
+    assert enqueued == []
+
+    response = api.get("/reviews/", params={"category_id": 1})
+
+    assert response.status_code == 200
+    assert response.json()["reviews"][0]["id"] == review_history_id
+    assert _status(db, review_history_id) == "pending"
+    assert enqueued == [[review_history_id]]
+
+    # Later hits find the review already claimed
+    api.get("/reviews/", params={"category_id": 1})
+    assert enqueued == [[review_history_id]]
@@ -0,0 +1,107 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.database.config import SessionLocal, engine
+from app.models.models import Category, CategoryStats, ReviewHistory, ReviewLatest
+from app.services import projections
+
+
+def _add_review_and_edit(db):
+    """Flush a review, then an edit of it that moves it to another category; returns the edit's id."""
+    db.add_all([Category(id=1, name="Books", description=None), Category(id=2, name="Games", description=None)])
+    original = ReviewHistory(review_id="r1", category_id=1, stars=2, text="Original", created_at=datetime(2026, 1, 1, tzinfo=timezone.utc))
+    db.add(original)
+    db.flush()
+    edit = ReviewHistory(review_id="r1", category_id=2, stars=8, text="Edited", created_at=datetime(2026, 1, 2, tzinfo=timezone.utc))
+    db.add(edit)
+    db.flush()
+    db.commit()
+    return edit.id
+
+
+def test_an_edit_moves_review_latest_to_the_newest_revision(db):
+    edit_id = _add_review_and_edit(db)
+
+    latest = db.scalars(select(ReviewLatest)).one()
+    assert (latest.review_id, latest.review_history_id, latest.category_id, latest.stars) == ("r1", edit_id, 2, 8)
+    assert set(db.execute(select(CategoryStats.category_id, CategoryStats.sum_stars, CategoryStats.review_count))) == {
+        (1, 0, 0),
+        (2, 8, 1),
+    }
+
+
+def test_reads_see_only_the_newest_revision(db, api):
+    edit_id = _add_review_and_edit(db)
+
+    assert api.get("/reviews/", params={"category_id": 1}).json()["reviews"] == []
+    assert [review["id"] for review in api.get("/reviews/", params={"category_id": 2}).json()["reviews"]] == [edit_id]
+    trends = api.get("/reviews/trends").json()
+    assert [(trend["id"], trend["average_stars"], trend["total_reviews"]) for trend in trends] == [(2, 8.0, 1)]
+
+
+@pytest.mark.skipif(engine.dialect.name != "postgresql", reason="SQLite serializes writers, so inserts cannot race")
+def test_losing_the_insert_race_keeps_the_newer_revision(db):
+    db.add(Category(id=1, name="Books", description=None))
+    db.commit()
+    winner, loser = SessionLocal(), SessionLocal()
+    try:
+        newer = ReviewHistory(review_id="r1", category_id=1, stars=8, text="Newer", created_at=datetime(2026, 1, 2, tzinfo=timezone.utc))
+        winner.add(newer)
+        winner.flush()
+        newer_id = newer.id
+
+        def flush_older():
+            # Blocks in sync_latest's insert until the winner commits its review_latest row
+            loser.add(ReviewHistory(review_id="r1", category_id=1, stars=2, text="Older", created_at=datetime(2026, 1, 1, tzinfo=timezone.utc)))
+            loser.flush()
+
+        thread = threading.Thread(target=flush_older)
+        thread.start()
+        time.sleep(0.5)
+        assert thread.is_alive()
+        winner.commit()
+        thread.join(timeout=10)
+        loser.commit()
+    finally:
+        winner.close()
+        loser.close()
+
+    assert db.scalar(select(ReviewLatest.review_history_id).where(ReviewLatest.review_id == "r1")) == newer_id
+    assert tuple(db.execute(select(CategoryStats.sum_stars, CategoryStats.review_count)).one()) == (8, 1)
+
+
+def test_a_review_committed_during_reconcile_is_not_taken_for_drift(db, monkeypatch):
+    db.add(Category(id=1, name="Books", description=None))
+    db.add(ReviewHistory(review_id="r1", category_id=1, stars=4, text="First", created_at=datetime(2026, 1, 1, tzinfo=timezone.utc)))
+    db.commit()
+    writer = SessionLocal()
+
+    def write():
+        writer.add(ReviewHistory(review_id="r2", category_id=1, stars=6, text="Second", created_at=datetime(2026, 1, 2, tzinfo=timezone.utc)))
+        writer.commit()
+
+    thread = threading.Thread(target=write)
+    expected_category_stats = projections._expected_category_stats
+
+    def write_between_the_reads(connection):
+        expected = expected_category_stats(connection)
+        thread.start()
+        # Blocked by the reconcile's lock; without it the review would commit here
+        thread.join(timeout=0.5)
+        assert thread.is_alive()
+        return expected
+
+    monkeypatch.setattr(projections, "_expected_category_stats", write_between_the_reads)
+    try:
+        drift = projections.reconcile_category_stats(db.connection())
+        db.commit()
+        thread.join(timeout=10)
+    finally:
+        writer.close()
+
+    assert drift == []
+    assert tuple(db.execute(select(CategoryStats.sum_stars, CategoryStats.review_count)).one()) == (10, 2)
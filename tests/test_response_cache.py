@@ -0,0 +1,98 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from app.database.config import engine
+from app.models.models import ReviewHistory
+from app.services import response_cache
+from app.services.response_cache import etag_matches
+
+
+def _page(api, category_id, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return api.get("/reviews/", params={"category_id": category_id}, headers=headers)
+
+
+def _texts(response):
+    return [review["text"] for review in response.json()["reviews"]]
+
+
+def test_matching_etag_gets_not_modified(db, add_reviews, cache_enabled, api):
+    add_reviews({"review_id": "r1", "category_id": 1, "text": "Cached", "tone": "Calm", "sentiment": "Neutral"})
+
+    first = _page(api, 1)
+    etag = first.headers["ETag"]
+
+    assert first.status_code == 200
+    for if_none_match in (etag, f"W/{etag}", f'"stale", {etag}', "*"):
+        response = _page(api, 1, if_none_match)
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+    assert _page(api, 1, '"stale"').status_code == 200
+
+
+def test_not_modified_renews_expired_claims_on_the_page(db, add_reviews, cache_enabled, api, enqueued):
+    review_history_id, = add_reviews({"review_id": "r1", "category_id": 1, "text": "Still waiting for analysis"})
+    etag = _page(api, 1).headers["ETag"]
+    assert enqueued == [[review_history_id]]
+
+    # Still claimed: the 304 enqueues nothing
+    assert _page(api, 1, etag).status_code == 304
+    assert enqueued == [[review_history_id]]
+
+    # The claim's task was lost; expiring it changes no cache version
+    expired = datetime.now(timezone.utc) - timedelta(days=1)
+    with engine.begin() as conn:
+        conn.execute(update(ReviewHistory).where(ReviewHistory.id == review_history_id).values(analysis_requested_at=expired))
+
+    assert _page(api, 1, etag).status_code == 304
+    assert enqueued == [[review_history_id], [review_history_id]]
+
+
+def test_cached_body_is_served_until_its_version_is_bumped(db, add_reviews, cache_enabled, api):
+    first_id, _ = add_reviews(
+        {"review_id": "r1", "category_id": 1, "text": "First", "tone": "Calm", "sentiment": "Neutral"},
+        {"review_id": "r2", "category_id": 2, "text": "Elsewhere", "tone": "Calm", "sentiment": "Neutral"},
+    )
+    etags = {category_id: _page(api, category_id).headers["ETag"] for category_id in (1, 2)}
+
+    # Written behind the cache's back: no session, so no version bump
+    with engine.begin() as conn:
+        conn.execute(update(ReviewHistory).where(ReviewHistory.id == first_id).values(text="Changed"))
+    assert _texts(_page(api, 1)) == ["First"]
+
+    add_reviews({"review_id": "r3", "category_id": 1, "text": "Second", "tone": "Calm", "sentiment": "Neutral"})
+
+    refreshed = _page(api, 1, etags[1])
+    assert refreshed.status_code == 200
+    assert refreshed.headers["ETag"] != etags[1]
+    assert _texts(refreshed) == ["Second", "Changed"]
+    # Other categories' versions are untouched
+    assert _page(api, 2, etags[2]).status_code == 304
+
+
+def test_bulk_ingested_reviews_are_visible_to_the_next_read(db, add_reviews, cache_enabled, api, monkeypatch):
+    add_reviews({"review_id": "r1", "category_id": 1, "text": "First", "tone": "Calm", "sentiment": "Neutral"})
+    etag = _page(api, 1).headers["ETag"]
+    bump_versions_async = response_cache.bump_versions_async
+
+    async def slow_bump(*args, **kwargs):
+        await asyncio.sleep(0.5)
+        await bump_versions_async(*args, **kwargs)
+
+    monkeypatch.setattr(response_cache, "bump_versions_async", slow_bump)
+    body = json.dumps({"review_id": "r2", "stars": 3, "category_id": 1, "text": "Second", "tone": "Calm", "sentiment": "Neutral"})
+    assert api.post("/reviews/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}).json()["accepted"] == 1
+
+    refreshed = _page(api, 1, etag)
+    assert refreshed.status_code == 200
+    assert _texts(refreshed) == ["Second", "First"]
+
+
+def test_etag_matching():
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert not etag_matches('"abcd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
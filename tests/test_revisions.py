@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from app.models.models import ReviewHistory
+from app.services.revisions import COMPRESSED, RAW, compact_revisions, decode_delta, encode_delta, reconstruct
+
+LONG = "The headphones sound great and the battery lasts all week. " * 4
+ANALYZED = {"tone": "Happy", "sentiment": "Positive"}
+
+
+@pytest.mark.parametrize("text, base", [
+    (LONG + "Update: the left ear cup cracked.", LONG),
+    (LONG[40:], LONG),
+    ("", LONG),
+    ("Brand new text", ""),
+    ("Café ☕ — naïve résumé", "Cafe - naive resume"),
+])
+def test_delta_round_trips(text, base):
+    assert decode_delta(encode_delta(text, base), base) == text
+
+
+def test_delta_is_compressed_only_when_that_is_shorter():
+    assert encode_delta("short", "shorter")[:1] == RAW
+    assert encode_delta("word " * 200, "")[:1] == COMPRESSED
+
+
+def test_reconstruct_follows_chains_in_any_row_order():
+    texts = ["first draft", "first draft, edited", "first draft, edited twice"]
+    rows = [SimpleNamespace(id=3, text=texts[2], text_delta=None, text_delta_base_id=None)]
+    for row_id in (2, 1):
+        rows.append(SimpleNamespace(
+            id=row_id, text=None, text_delta=encode_delta(texts[row_id - 1], texts[row_id]), text_delta_base_id=row_id + 1
+        ))
+
+    assert reconstruct(rows) == {1: texts[0], 2: texts[1], 3: texts[2]}
+    assert reconstruct(list(reversed(rows))) == {1: texts[0], 2: texts[1], 3: texts[2]}
+
+
+def _stored(db):
+    db.expire_all()
+    return {
+        row.id: row for row in db.execute(
+            select(ReviewHistory.id, ReviewHistory.text, ReviewHistory.text_delta, ReviewHistory.text_delta_base_id)
+        )
+    }
+
+
+def test_compaction_encodes_older_revisions_against_the_next_newer_one(db, add_reviews):
+    texts = [LONG, LONG + "Update: one ear cup cracked.", LONG + "Update: replaced under warranty."]
+    ids = add_reviews(*({"review_id": "r1", "category_id": 1, "text": text, **ANALYZED} for text in texts))
+
+    assert compact_revisions(db.connection(), ["r1"]) == 2
+    stored = _stored(db)
+    assert [stored[row_id].text_delta_base_id for row_id in ids] == [ids[1], ids[2], None]
+    assert [stored[row_id].text for row_id in ids] == [None, None, texts[2]]
+    assert reconstruct(stored.values()) == dict(zip(ids, texts))
+    # Already encoded revisions are left alone
+    assert compact_revisions(db.connection(), ["r1"]) == 0
+
+
+@pytest.mark.parametrize("older, newer", [
+    pytest.param({"text": LONG}, {"text": LONG + "Edited.", **ANALYZED}, id="awaiting analysis"),
+    pytest.param({"text": LONG, **ANALYZED}, {"text": LONG + "Edited.", "category_id": 2, **ANALYZED}, id="moved category"),
+    pytest.param({"text": "Too loud.", **ANALYZED}, {"text": "Quiet enough after all.", **ANALYZED}, id="not shorter"),
+])
+def test_compaction_keeps_the_text_of_revisions_it_must_not_encode(db, add_reviews, older, newer):
+    ids = add_reviews({"review_id": "r1", "category_id": 1, **older}, {"review_id": "r1", "category_id": 1, **newer})
+
+    assert compact_revisions(db.connection(), ["r1"]) == 0
+    assert _stored(db)[ids[0]].text == older["text"]
+
+
+def test_compacting_nothing_is_a_no_op(db):
+    assert compact_revisions(db.connection(), []) == 0
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+
+from app.models.models import CategoryDailyRollup, ReviewHistory
+from app.services import rollups
+from app.services.checkpoints import save_checkpoint
+from conftest import BASE_TIME
+
+DAY = timedelta(days=1)
+
+
+def _stored(db):
+    rows = db.execute(
+        select(CategoryDailyRollup.category_id, CategoryDailyRollup.day, CategoryDailyRollup.sum_stars,
+               CategoryDailyRollup.review_count, CategoryDailyRollup.positive_count)
+        .order_by(CategoryDailyRollup.category_id, CategoryDailyRollup.day)
+    ).all()
+    return [(category_id, str(day), sum_stars, count, positive) for category_id, day, sum_stars, count, positive in rows]
+
+
+def _expected(db):
+    query = rollups.rollup_query().subquery()
+    rows = db.execute(
+        select(query.c.category_id, query.c.day, query.c.sum_stars, query.c.review_count, query.c.positive_count)
+        .order_by(query.c.category_id, query.c.day)
+    ).all()
+    return [(category_id, str(day), sum_stars, count, positive) for category_id, day, sum_stars, count, positive in rows]
+
+
+def _refresh(db, lag_seconds=0):
+    result = rollups.refresh_daily_rollup(db.connection(), lag_seconds)
+    db.commit()
+    return result
+
+
+def _settle(db):
+    """Pretend every revision so far was written two hours ago and the last refresh ran an hour ago."""
+    now = datetime.now(timezone.utc)
+    db.execute(update(ReviewHistory).values(updated_at=now - timedelta(hours=2)))
+    save_checkpoint(db.connection(), rollups.CHECKPOINT, watermark=now - timedelta(hours=1))
+    db.commit()
+
+
+def test_first_refresh_rebuilds_and_later_ones_recompute_touched_days(db, add_reviews):
+    add_reviews(
+        {"review_id": "r1", "category_id": 1, "stars": 4, "created_at": BASE_TIME, "sentiment": "Positive"},
+        {"review_id": "r2", "category_id": 1, "stars": 8, "created_at": BASE_TIME + DAY},
+        {"review_id": "r3", "category_id": 2, "stars": 6, "created_at": BASE_TIME + 2 * DAY},
+    )
+    assert _refresh(db) == (None, {1, 2})
+    assert _stored(db) == _expected(db) == [
+        (1, "2026-01-01", 4, 1, 1), (1, "2026-01-02", 8, 1, 0), (2, "2026-01-03", 6, 1, 0),
+    ]
+    _settle(db)
+
+    # An edit moves r1 from the first day to the third; both days change
+    add_reviews({"review_id": "r1", "category_id": 1, "stars": 10, "created_at": BASE_TIME + 2 * DAY})
+
+    assert _refresh(db) == (2, {1})
+    assert _stored(db) == _expected(db) == [
+        (1, "2026-01-02", 8, 1, 0), (1, "2026-01-03", 10, 1, 0), (2, "2026-01-03", 6, 1, 0),
+    ]
+
+
+def test_lag_picks_up_revisions_that_committed_behind_the_watermark(db, add_reviews):
+    add_reviews({"review_id": "r1", "category_id": 1, "stars": 4, "created_at": BASE_TIME})
+    _refresh(db)
+    _settle(db)
+    # Committed just now by a transaction that started 30s ago, so its updated_at is 30s old
+    late_id, = add_reviews({"review_id": "r2", "category_id": 1, "stars": 8, "created_at": BASE_TIME + DAY})
+    db.execute(
+        update(ReviewHistory)
+        .where(ReviewHistory.id == late_id)
+        .values(updated_at=datetime.now(timezone.utc) - timedelta(seconds=30))
+    )
+    db.commit()
+
+    # A refresh that ran 30s ago, with a 60s lag, did not cover the late revision yet; the next one does
+    assert _refresh(db, lag_seconds=60) == (0, set())
+    assert _refresh(db, lag_seconds=0) == (1, {1})
+    assert _stored(db) == _expected(db) == [(1, "2026-01-01", 4, 1, 0), (1, "2026-01-02", 8, 1, 0)]
@@ -0,0 +1,71 @@
+import pytest
+
+
+def _search(api, **params):
+    response = api.get("/reviews/search", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def _ids(page):
+    return [review["id"] for review in page["reviews"]]
+
+
+@pytest.fixture
+def catalog(add_reviews):
+    """Review ids by name; every review is analyzed, so searches enqueue nothing."""
+    names = ["dead_battery", "weak_battery", "screen", "other_category"]
+    ids = add_reviews(
+        {"review_id": "a", "category_id": 1, "text": "Battery died, battery swollen, battery gone.", "sentiment": "Negative", "tone": "Upset"},
+        {"review_id": "b", "category_id": 1, "text": "The battery is fine, the case is scratched.", "sentiment": "Neutral", "tone": "Calm"},
+        {"review_id": "c", "category_id": 1, "text": "Bright screen and a broken hinge.", "sentiment": "Negative", "tone": "Upset"},
+        {"review_id": "d", "category_id": 2, "text": "Spare batteries included.", "sentiment": "Positive", "tone": "Happy"},
+    )
+    return dict(zip(names, ids))
+
+
+def test_results_are_ranked_by_relevance(api, catalog):
+    page = _search(api, q="battery")
+
+    assert _ids(page)[0] == catalog["dead_battery"]
+    # Stemming matches the plural too
+    assert set(_ids(page)) == {catalog["dead_battery"], catalog["weak_battery"], catalog["other_category"]}
+    ranks = [review["rank"] for review in page["reviews"]]
+    assert ranks == sorted(ranks, reverse=True)
+
+
+def test_filters_and_current_revisions_only(api, add_reviews, catalog):
+    assert _ids(_search(api, q="battery", category_id=2)) == [catalog["other_category"]]
+    assert _ids(_search(api, q="battery", sentiment="Neutral")) == [catalog["weak_battery"]]
+
+    # Once edited, the old wording no longer matches
+    edit, = add_reviews({"review_id": "c", "category_id": 1, "text": "Bright screen, hinge replaced.", "sentiment": "Positive"})
+    assert _ids(_search(api, q="broken")) == []
+    assert _ids(_search(api, q="hinge")) == [edit]
+
+
+def test_pages_continue_from_the_rank_and_id_keyset(api, add_reviews):
+    # Identical texts rank the same, so their order falls back to id
+    ids = add_reviews(*(
+        {"review_id": f"r{i}", "category_id": 1, "text": "Solid keyboard.", "sentiment": "Positive", "tone": "Happy"} for i in range(5)
+    ))
+    seen, cursor = [], None
+    while True:
+        page = _search(api, q="keyboard", page_size=2, **({"cursor": cursor} if cursor else {}))
+        seen.append(_ids(page))
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [ids[:2:-1], ids[2:0:-1], ids[:1]]
+
+
+@pytest.mark.parametrize("q", ["!!!", 'battery OR "', "NEAR(battery screen)"])
+def test_operators_and_punctuation_are_not_interpreted_as_query_syntax(api, catalog, q):
+    _search(api, q=q)
+
+
+def test_malformed_cursor_is_a_bad_request(api):
+    response = api.get("/reviews/search", params={"q": "battery", "cursor": "nope"})
+
+    assert response.status_code == 400
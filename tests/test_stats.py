@@ -0,0 +1,37 @@
+from app.services import analysis
+
+
+def _backlog(api):
+    response = api.get("/reviews/stats")
+    assert response.status_code == 200
+    return response.json()["overall"]["analysis"]
+
+
+def test_cached_stats_follow_claims_and_failures(db, add_reviews, cache_enabled, api):
+    review_history_id, = add_reviews({"review_id": "r1", "category_id": 1, "text": "Waiting for analysis"})
+    assert _backlog(api)["unanalyzed"] == 1
+
+    # Reading the page claims the review for analysis
+    api.get("/reviews/", params={"category_id": 1})
+    assert (_backlog(api)["unanalyzed"], _backlog(api)["pending"]) == (0, 1)
+
+    analysis.mark_failed(db, [review_history_id])
+    db.commit()
+    assert (_backlog(api)["pending"], _backlog(api)["failed"]) == (0, 1)
+
+
+def test_stats_count_current_revisions_per_category(db, add_reviews):
+    from app.services.stats import collect_stats
+
+    add_reviews(
+        {"review_id": "r1", "category_id": 1, "text": "first", "stars": 2},
+        {"review_id": "r2", "category_id": 1, "text": "other", "stars": 8},
+    )
+    # An edit that moves r1 to category 2
+    add_reviews({"review_id": "r1", "category_id": 2, "text": "edited", "stars": 4})
+
+    stats = collect_stats(db)
+    assert (stats.overall.history_entries, stats.overall.unique_reviews, stats.overall.edits) == (3, 2, 1)
+    by_id = {category.id: category for category in stats.categories}
+    assert (by_id[1].history_entries, by_id[1].unique_reviews, by_id[1].current_average_stars) == (2, 1, 8.0)
+    assert (by_id[2].history_entries, by_id[2].unique_reviews, by_id[2].current_average_stars) == (1, 1, 4.0)
@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select
+
+from app.database.config import async_engine
+from app.models.models import AccessLog, AccessLogRollup
+from app.services import traffic
+from app.services.access_log import AccessLogBuffer
+
+
+def _minutes_ago(minutes, seconds=0):
+    return (datetime.now(timezone.utc) - timedelta(minutes=minutes, seconds=seconds)).replace(microsecond=0)
+
+
+def _rollup(db):
+    rows = db.execute(
+        select(AccessLogRollup.bucket, AccessLogRollup.endpoint, AccessLogRollup.category_id, AccessLogRollup.count)
+        .order_by(AccessLogRollup.bucket, AccessLogRollup.endpoint, AccessLogRollup.category_id)
+    ).all()
+    return [(traffic.minute_bucket(bucket), endpoint, category_id, count) for bucket, endpoint, category_id, count in rows]
+
+
+def test_entries_are_parsed_into_endpoint_and_category():
+    assert traffic.parse_access_log("GET /reviews/?category_id=3&page_size=5") == (
+        "GET /reviews/", {"category_id": "3", "page_size": "5"}
+    )
+    assert traffic.parse_access_log("POST /reviews/bulk") == ("POST /reviews/bulk", {})
+    assert traffic.category_of({"category_id": "3"}) == 3
+    assert traffic.category_of({"category_id": "three"}) == traffic.NO_CATEGORY
+    assert traffic.category_of({}) == traffic.NO_CATEGORY
+
+
+def test_entries_are_counted_per_minute_endpoint_and_category():
+    minute = datetime(2026, 1, 1, 12, 30, tzinfo=timezone.utc)
+
+    counts = traffic.count_entries([
+        ("GET /reviews/?category_id=3", minute + timedelta(seconds=5), 1),
+        ("GET /reviews/?category_id=3&cursor=abc", minute + timedelta(seconds=59), 2),
+        # Naive timestamps are UTC
+        ("GET /reviews/?category_id=3", minute.replace(tzinfo=None) + timedelta(seconds=10), 1),
+        ("GET /reviews/?category_id=4", minute, 1),
+        ("GET /reviews/trends", minute + timedelta(minutes=1), 1),
+    ])
+
+    assert counts == {
+        (minute, "GET /reviews/", 3): 4,
+        (minute, "GET /reviews/", 4): 1,
+        (minute + timedelta(minutes=1), "GET /reviews/trends", traffic.NO_CATEGORY): 1,
+    }
+
+
+def test_refresh_counts_each_entry_once_and_leaves_recent_ones_for_later(db):
+    settled, recent = traffic.minute_bucket(_minutes_ago(10)), _minutes_ago(0, seconds=30)
+    db.execute(insert(AccessLog), [
+        {"text": "GET /reviews/?category_id=1", "created_at": settled},
+        {"text": "GET /reviews/?category_id=1", "created_at": settled + timedelta(seconds=20)},
+        {"text": "GET /reviews/trends", "created_at": settled},
+        {"text": "GET /reviews/?category_id=1", "created_at": recent},
+    ])
+    db.commit()
+
+    assert traffic.refresh_access_log_rollup(db.connection(), lag_seconds=60) == 3
+    assert traffic.refresh_access_log_rollup(db.connection(), lag_seconds=60) == 0
+    assert _rollup(db) == [
+        (settled, "GET /reviews/", 1, 2),
+        (settled, "GET /reviews/trends", traffic.NO_CATEGORY, 1),
+    ]
+
+    assert traffic.refresh_access_log_rollup(db.connection(), lag_seconds=0) == 1
+    assert _rollup(db)[-1] == (traffic.minute_bucket(recent), "GET /reviews/", 1, 1)
+
+
+def test_buffer_without_raw_rows_counts_straight_into_the_rollup(db):
+    buffer = AccessLogBuffer(max_size=10, batch_size=2, flush_interval=1, store_raw=False)
+    for text in ("GET /reviews/?category_id=2", "GET /reviews/?category_id=2", "GET /traffic"):
+        buffer.record(text)
+
+    async def flush():
+        try:
+            return await buffer.flush()
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(flush()) == 3
+    assert db.scalar(select(AccessLog.id)) is None
+    assert sorted((endpoint, category_id, count) for _, endpoint, category_id, count in _rollup(db)) == [
+        ("GET /reviews/", 2, 2),
+        ("GET /traffic", traffic.NO_CATEGORY, 1),
+    ]
+
+
+def test_stopping_the_buffer_writes_the_entries_still_waiting(db):
+    # Neither the interval nor the batch size triggers a flush during the test
+    buffer = AccessLogBuffer(max_size=10, batch_size=10, flush_interval=3600)
+
+    async def run():
+        try:
+            buffer.start()
+            for text in ("GET /reviews/?category_id=1", "GET /reviews/trends", "GET /traffic"):
+                buffer.record(text)
+            await asyncio.sleep(0)
+            waiting = len(buffer)
+            await buffer.stop()
+            return waiting
+        finally:
+            await async_engine.dispose()
+
+    assert asyncio.run(run()) == 3
+    assert len(buffer) == 0
+    assert db.scalars(select(AccessLog.text).order_by(AccessLog.id)).all() == [
+        "GET /reviews/?category_id=1",
+        "GET /reviews/trends",
+        "GET /traffic",
+    ]
+
+
+def test_traffic_endpoint_sums_the_rollup(db, api):
+    now = datetime.now(timezone.utc)
+    traffic.add_counts(db.connection(), {
+        (traffic.minute_bucket(now - timedelta(minutes=5)), "GET /reviews/", 1): 3,
+        (traffic.minute_bucket(now - timedelta(minutes=4)), "GET /reviews/", 1): 2,
+        (traffic.minute_bucket(now - timedelta(minutes=4)), "GET /reviews/trends", traffic.NO_CATEGORY): 4,
+        (traffic.minute_bucket(now - timedelta(hours=3)), "GET /reviews/", 1): 100,
+    })
+    db.commit()
+
+    response = api.get("/traffic")
+
+    assert response.status_code == 200
+    assert response.json()["entries"] == [
+        {"endpoint": "GET /reviews/", "category_id": 1, "requests": 5},
+        {"endpoint": "GET /reviews/trends", "category_id": None, "requests": 4},
+    ]
+    assert api.get("/traffic", params={"category_id": 1}).json()["entries"] == [
+        {"endpoint": "GET /reviews/", "category_id": 1, "requests": 5},
+    ]